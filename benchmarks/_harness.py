@@ -0,0 +1,85 @@
+"""
+Shared setup and result output for the himalog benchmarks.
+
+Importing this module puts the repository root on ``sys.path``, so each
+benchmark runs as ``python benchmarks/<name>.py`` from a checkout without
+installing himalog or setting ``PYTHONPATH``. ``add_json_argument`` and
+``write_json`` give every benchmark a ``--json PATH`` option that writes its
+results, with the interpreter and platform they were measured on, as one
+JSON document for comparing releases.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+from typing import Any, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def add_json_argument(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the ``--json PATH`` option to a benchmark's argument parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The benchmark's parser.
+    """
+    parser.add_argument(
+        "--json",
+        metavar="PATH",
+        help="also write the results as JSON to PATH ('-' for stdout)",
+    )
+
+
+def _version() -> str:
+    from importlib import metadata
+
+    try:
+        return metadata.version("himalog")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def write_json(
+    path: Optional[str],
+    benchmark: str,
+    parameters: dict[str, Any],
+    results: list[dict[str, Any]],
+) -> None:
+    """
+    Write benchmark results as a JSON document.
+
+    Args:
+        path (Optional[str]): Output file, '-' for stdout; None does
+            nothing.
+        benchmark (str): Benchmark name.
+        parameters (dict[str, Any]): The options the benchmark ran with.
+        results (list[dict[str, Any]]): One flat mapping per measured row.
+    """
+    if not path:
+        return
+    document = {
+        "benchmark": benchmark,
+        "himalog": _version(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(
+            timespec="seconds"
+        ),
+        "parameters": parameters,
+        "results": results,
+    }
+    if path == "-":
+        json.dump(document, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,151 @@
+"""
+Local stand-in servers used by the himalog benchmarks.
+
+The servers only acknowledge and count what they receive so that the
+numbers reflect the cost of the logging pipeline, not of a real collector.
+"""
+
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+class CountingHTTPServer(ThreadingHTTPServer):
+    """
+    HTTP/1.1 keep-alive server that counts requests, connections and
+    received records (one per line for NDJSON, one per request otherwise).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0) -> None:
+        super().__init__(("127.0.0.1", port), _CountingRequestHandler)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.records = 0
+        self.clients: set[Any] = set()
+
+    @property
+    def host(self) -> str:
+        return f"127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "CountingHTTPServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _CountingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: CountingHTTPServer
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        content_type = self.headers.get("Content-Type", "")
+        if content_type == "application/x-ndjson":
+            count = body.count(b"\n")
+        elif content_type == "application/json":
+            count = body.count(b'"msg":')
+        else:
+            count = 1
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.records += count
+            self.server.clients.add(self.client_address)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class CountingSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal SMTP server that accepts every command and counts connections
+    and messages.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _CountingSMTPHandler)
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.connections = 0
+
+    @property
+    def mailhost(self) -> tuple[str, int]:
+        return ("127.0.0.1", self.server_address[1])
+
+    def start(self) -> "CountingSMTPServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _CountingSMTPHandler(socketserver.StreamRequestHandler):
+    server: CountingSMTPServer
+
+    def reply(self, line: bytes) -> None:
+        self.wfile.write(line + b"\r\n")
+
+    def handle(self) -> None:
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply(b"220 stand-in ESMTP")
+        while True:
+            command = self.rfile.readline()[:4].upper()
+            if not command or command == b"QUIT":
+                self.reply(b"221 bye")
+                return
+            if command == b"DATA":
+                self.reply(b"354 end with .")
+                for _ in iter(self.rfile.readline, b".\r\n"):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+            self.reply(b"250 ok")
+
+
+class CountingTCPServer(socketserver.ThreadingTCPServer):
+    """
+    TCP server that counts newline-delimited records.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _CountingTCPHandler)
+        self.lock = threading.Lock()
+        self.records = 0
+
+    @property
+    def port(self) -> int:
+        return int(self.server_address[1])
+
+    def start(self) -> "CountingTCPServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _CountingTCPHandler(socketserver.StreamRequestHandler):
+    server: CountingTCPServer
+
+    def handle(self) -> None:
+        for _ in self.rfile:
+            with self.server.lock:
+                self.server.records += 1
@@ -0,0 +1,70 @@
+"""
+Throughput benchmark for AsyncHTTPHandler against a local HTTP server.
+
+Compares the per-record mode (one connection per record) with the batching
+mode (one keep-alive connection, many records per POST).
+
+Usage:
+    python benchmarks/bench_async_http.py [--records N]
+"""
+
+import argparse
+import logging
+import time
+
+from _harness import add_json_argument, write_json
+from _servers import CountingHTTPServer
+
+from himalog.handlers.async_http import AsyncHTTPHandler
+
+
+def run(records: int, **options: object) -> tuple[float, int, int]:
+    server = CountingHTTPServer().start()
+    handler = AsyncHTTPHandler(
+        server.host, "/log", queue_size=records, **options  # type: ignore
+    )
+    logger = logging.getLogger(f"bench-async-http-{id(handler)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    start = time.perf_counter()
+    for i in range(records):
+        logger.info("benchmark record %d", i)
+    while server.records < records:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    handler.close()
+    server.stop()
+    return records / elapsed, server.requests, len(server.clients)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=2000)
+    add_json_argument(parser)
+    args = parser.parse_args()
+    modes: dict[str, dict[str, object]] = {
+        "per-record": {},
+        "batch-json": {"batch_size": 500, "batch_format": "json"},
+        "batch-ndjson": {"batch_size": 500, "batch_format": "ndjson"},
+    }
+    results = []
+    for mode, options in modes.items():
+        rate, requests, connections = run(args.records, **options)
+        print(
+            f"{mode:>14}: {rate:>10.0f} records/s "
+            f"({requests} requests, {connections} connections)"
+        )
+        results.append(
+            {
+                "mode": mode,
+                "records_per_sec": round(rate),
+                "requests": requests,
+                "connections": connections,
+            }
+        )
+    write_json(args.json, "async_http", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark for the cost of a disabled ``logger.debug`` call.
+
+The logger level is DEBUG but the only handler accepts WARNING and above,
+so every call is discarded. A plain ``logging.Logger`` builds and filters a
+record for each call; a himalog logger rejects it in ``isEnabledFor``.
+Each logger is measured both detached and with the default
+``propagate=True``, where the rejection also depends on the (stock) root
+logger's handlers.
+
+Usage:
+    python benchmarks/bench_disabled_level.py [--calls N]
+"""
+
+import argparse
+import logging
+import timeit
+
+from _harness import add_json_argument, write_json
+
+from himalog.core import HimaLog
+
+
+def _configure(logger: logging.Logger, propagate: bool) -> logging.Logger:
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = propagate
+    handler = logging.NullHandler()
+    handler.setLevel(logging.WARNING)
+    logger.addHandler(handler)
+    return logger
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200_000)
+    add_json_argument(parser)
+    args = parser.parse_args()
+    results = []
+    for propagate in (False, True):
+        loggers = {
+            "logging.Logger": logging.getLogger(f"bench-plain-{propagate}"),
+            "himalog": HimaLog(
+                f"bench-himalog-{propagate}", level="DEBUG"
+            ).get_logger(),
+        }
+        for label, logger in loggers.items():
+            _configure(logger, propagate)
+            elapsed = timeit.timeit(
+                lambda: logger.debug("disabled %s", "call"),
+                number=args.calls,
+            )
+            ns_per_call = elapsed / args.calls * 1e9
+            print(
+                f"{label:>15} (propagate={propagate!s:>5}): "
+                f"{ns_per_call:8.1f} ns/call"
+            )
+            results.append(
+                {
+                    "logger": label,
+                    "propagate": propagate,
+                    "ns_per_call": round(ns_per_call, 1),
+                }
+            )
+    write_json(args.json, "disabled_level", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Throughput benchmark for file handlers.
+
+Writes the same INFO lines through ``logging.FileHandler``, the buffered
+handlers and the memory-mapped binary log, and reports lines per second and the number of ``write`` system
+calls (read from ``/proc/self/io`` on Linux; shown as ``n/a`` elsewhere).
+
+Usage:
+    python benchmarks/bench_file_handlers.py [--lines N]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Callable, Optional
+
+from _harness import add_json_argument, write_json
+
+from himalog.handlers.buffered import BufferedFileHandler
+from himalog.handlers.mmap_log import MmapLogHandler
+
+
+def _write_syscalls() -> Optional[int]:
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("syscw:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _run(
+    label: str, factory: Callable[[str], logging.Handler], lines: int
+) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = factory(os.path.join(tmp, "bench.log"))
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger = logging.getLogger(f"bench-file-{label}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        before = _write_syscalls()
+        start = time.perf_counter()
+        for i in range(lines):
+            logger.info("benchmark line %d", i)
+        handler.close()
+        elapsed = time.perf_counter() - start
+        after = _write_syscalls()
+        logger.removeHandler(handler)
+    syscalls = None if before is None or after is None else after - before
+    print(
+        f"{label:>10}: {lines / elapsed:12,.0f} lines/s  "
+        f"{'n/a' if syscalls is None else syscalls} write syscalls"
+    )
+    return {
+        "handler": label,
+        "lines_per_sec": round(lines / elapsed),
+        "write_syscalls": syscalls,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=200_000)
+    add_json_argument(parser)
+    args = parser.parse_args()
+    results = [
+        _run("stdlib", logging.FileHandler, args.lines),
+        _run("buffered", BufferedFileHandler, args.lines),
+        _run(
+            "writev",
+            lambda path: BufferedFileHandler(path, use_writev=True),
+            args.lines,
+        ),
+        _run("mmap", MmapLogHandler, args.lines),
+    ]
+    write_json(args.json, "file_handlers", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Import-time budget for ``himalog.logger``.
+
+Runs ``python -X importtime -c "import logging, himalog.logger"`` in fresh
+interpreters and reports the median cumulative import time of
+``himalog.logger``. ``logging`` is imported first so its own cost (which
+every application pays anyway) is not counted. The run fails when the
+median exceeds the checked-in budget, or when any module in
+``DEFERRED_MODULES`` was imported: handler and parser modules are only
+imported once a configuration uses them.
+
+Usage:
+    python benchmarks/bench_import_time.py [--runs N] [--budget-ms MS]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from _harness import ROOT, add_json_argument, write_json
+
+# Median cumulative import time of himalog.logger, in milliseconds.
+BUDGET_MS = 40.0
+
+# Modules that must stay off the import path of himalog.logger.
+DEFERRED_MODULES = (
+    "logging.handlers",
+    "smtplib",
+    "http.client",
+    "ssl",
+    "email",
+    "asyncio",
+    "yaml",
+    "toml",
+)
+
+
+def measure() -> tuple[float, set[str]]:
+    """
+    Import himalog.logger in a fresh interpreter.
+
+    Returns:
+        tuple[float, set[str]]: Cumulative import time of himalog.logger in
+        milliseconds, and the names of all modules imported.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [ROOT, env.get("PYTHONPATH")])
+    )
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import logging, himalog.logger",
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        modules.add(name)
+        if name == "himalog.logger":
+            total_us = int(cumulative)
+    return total_us / 1000, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    add_json_argument(parser)
+    args = parser.parse_args()
+    timings = []
+    modules: set[str] = set()
+    for _ in range(args.runs):
+        elapsed, modules = measure()
+        timings.append(elapsed)
+    median = statistics.median(timings)
+    print(
+        f"himalog.logger: {median:.1f} ms median over {args.runs} runs "
+        f"(budget {args.budget_ms:.1f} ms)"
+    )
+    eager = sorted(
+        name
+        for name in modules
+        if name in DEFERRED_MODULES or name.split(".")[0] in DEFERRED_MODULES
+    )
+    failed = False
+    if eager:
+        print(f"imported eagerly: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print("over budget")
+        failed = True
+    write_json(
+        args.json,
+        "import_time",
+        vars(args),
+        [
+            {
+                "module": "himalog.logger",
+                "median_ms": round(median, 2),
+                "budget_ms": args.budget_ms,
+                "eager_imports": eager,
+            }
+        ],
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Throughput benchmark for multi-process logging through one aggregator.
+
+Starts a ``LogAggregator`` in this process with a counting handler, then
+8, 16 and 32 producer processes that each log ``--records`` INFO lines
+through a ``SocketShipperHandler``. Reports aggregate records per second
+from the first producer start until the aggregator has received every
+record.
+
+Usage:
+    python benchmarks/bench_multiprocess.py [--records N] [--producers 8 16 32]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Any
+
+from _harness import add_json_argument, write_json
+
+from himalog.handlers.multiprocess import LogAggregator, SocketShipperHandler
+
+
+class _CountingHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        pass
+
+
+def _produce(path: str, worker: int, records: int) -> None:
+    handler = SocketShipperHandler(path, queue_size=records)
+    logger = logging.getLogger(f"bench-producer-{worker}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    for i in range(records):
+        logger.info("producer %d record %d", worker, i)
+    handler.close()
+
+
+def _run(path: str, producers: int, records: int) -> dict[str, Any]:
+    aggregator = LogAggregator(path, _CountingHandler())
+    aggregator.start()
+    ctx = multiprocessing.get_context("fork")
+    procs = [
+        ctx.Process(target=_produce, args=(path, w, records))
+        for w in range(producers)
+    ]
+    expected = producers * records
+    start = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    while aggregator.received < expected:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    aggregator.stop()
+    print(
+        f"{producers:>3} producers: {expected / elapsed:12,.0f} records/s "
+        f"({expected:,} records in {elapsed:.2f}s)"
+    )
+    return {
+        "producers": producers,
+        "records": expected,
+        "records_per_sec": round(expected / elapsed),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument(
+        "--producers", type=int, nargs="+", default=[8, 16, 32]
+    )
+    add_json_argument(parser)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "himalog.sock")
+        results = [
+            _run(path, producers, args.records) for producers in args.producers
+        ]
+    write_json(args.json, "multiprocess", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Producer-side cost of a logging call in queue mode.
+
+Measures how long ``logger.info`` takes on the calling thread behind an
+``OverflowQueueHandler``, with the standard ``QueueHandler.prepare``
+(message merged on the caller) and with ``defer_format=True`` (template and
+args enqueued, formatted by the consumer). The consumer starts only after
+the timed calls; its sink formats with ``JsonFormatter`` and discards the
+result.
+
+Usage:
+    python benchmarks/bench_queue_producer.py [--calls N]
+"""
+
+import argparse
+import logging
+import timeit
+
+from _harness import add_json_argument, write_json
+
+from himalog.formatters import JsonFormatter
+from himalog.handlers.queueing import (
+    FanoutQueueListener,
+    OverflowQueue,
+    OverflowQueueHandler,
+)
+
+
+class _DiscardHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        self.format(record)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=100_000)
+    add_json_argument(parser)
+    args = parser.parse_args()
+    results = []
+    for defer in (False, True):
+        sink = _DiscardHandler()
+        sink.setFormatter(JsonFormatter())
+        queue = OverflowQueue(args.calls, policy="block")
+        listener = FanoutQueueListener(
+            queue, sink, sink_queue_size=args.calls, overflow_policy="block"
+        )
+        handler = OverflowQueueHandler(
+            queue, listener=listener, defer_format=defer
+        )
+        logger = logging.getLogger(f"bench-producer-{defer}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        # Start the consumer afterwards so it does not compete for the GIL
+        # while the calling thread is timed.
+        elapsed = timeit.timeit(
+            lambda: logger.info(
+                "user %s bought %d items for %.2f", "alice", 3, 9.99
+            ),
+            number=args.calls,
+        )
+        listener.start()
+        handler.close()
+        label = "deferred" if defer else "eager"
+        us_per_call = elapsed / args.calls * 1e6
+        print(f"{label:>9}: {us_per_call:8.2f} us/call")
+        results.append({"mode": label, "us_per_call": round(us_per_call, 2)})
+    write_json(args.json, "queue_producer", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
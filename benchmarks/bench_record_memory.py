@@ -0,0 +1,71 @@
+"""
+Memory per queued record at a given queue depth.
+
+Fills a ``queue.Queue`` with ``--depth`` records the way a backlog builds
+up behind a slow consumer: once as ``LogRecord`` objects (what the
+standard ``QueueHandler`` enqueues) and once as himalog ``CompactRecord``
+objects. Reports bytes per queued record measured with ``tracemalloc``;
+message arguments and the context mapping are shared (as ``ContextFilter``
+shares them), so only per-record overhead is counted.
+
+Usage:
+    python benchmarks/bench_record_memory.py [--depth N]
+"""
+
+import argparse
+import gc
+import logging
+import tracemalloc
+from queue import Queue
+from typing import Any, Callable
+
+from _harness import add_json_argument, write_json
+
+from himalog.records import compact
+
+_CONTEXT = {"request_id": "abc"}
+
+
+def _measure(depth: int, convert: Callable[[logging.LogRecord], Any]) -> float:
+    logger = logging.getLogger("bench-record-memory")
+    queue: "Queue[Any]" = Queue()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(depth):
+        record = logger.makeRecord(
+            logger.name,
+            logging.INFO,
+            __file__,
+            42,
+            "request %s handled in %d ms",
+            ("GET /", 12),
+            None,
+            func="handle",
+            extra={"context": _CONTEXT},
+        )
+        queue.put(convert(record))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / depth
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=100_000)
+    add_json_argument(parser)
+    args = parser.parse_args()
+    plain = _measure(args.depth, lambda record: record)
+    slim = _measure(args.depth, compact)
+    print(f"    LogRecord: {plain:8.0f} bytes/record")
+    print(f"CompactRecord: {slim:8.0f} bytes/record ({slim / plain:.0%})")
+    results = [
+        {"record": "LogRecord", "bytes_per_record": round(plain)},
+        {"record": "CompactRecord", "bytes_per_record": round(slim)},
+    ]
+    write_json(args.json, "record_memory", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
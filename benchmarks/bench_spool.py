@@ -0,0 +1,128 @@
+"""
+Benchmark for the disk spool behind durable AsyncHTTPHandler delivery.
+
+Measures raw DiskSpool append and replay (read + commit) rates, with and
+without fsync, and the end-to-end recovery of an AsyncHTTPHandler whose
+collector is down while records are logged: how long the spooled backlog
+takes to reach the collector once it is back.
+
+Usage:
+    python benchmarks/bench_spool.py [--records N] [--batch-size N]
+"""
+
+import argparse
+import logging
+import socket
+import tempfile
+import time
+
+from _harness import add_json_argument, write_json
+from _servers import CountingHTTPServer
+
+from himalog.handlers.async_http import AsyncHTTPHandler
+from himalog.handlers.spool import DiskSpool
+
+_PAYLOAD = b'{"name":"bench","levelname":"INFO","msg":"benchmark record"}'
+
+
+def run_spool(records: int, batch_size: int, fsync: bool) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        spool = DiskSpool(directory, fsync=fsync)
+        batch = [_PAYLOAD] * batch_size
+        start = time.perf_counter()
+        for _ in range(0, records, batch_size):
+            spool.append(batch)
+        appended = time.perf_counter() - start
+        start = time.perf_counter()
+        while True:
+            payloads = spool.read(batch_size)
+            if not payloads:
+                break
+            spool.commit(len(payloads))
+        replayed = time.perf_counter() - start
+        spool.close()
+    return {
+        "append_per_sec": records / appended,
+        "replay_per_sec": records / replayed,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def run_recovery(records: int, batch_size: int) -> dict[str, float]:
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        handler = AsyncHTTPHandler(
+            f"127.0.0.1:{port}",
+            "/log",
+            queue_size=records,
+            batch_size=batch_size,
+            spool_dir=directory,
+            retry_initial=0.01,
+            retry_max=0.05,
+        )
+        logger = logging.getLogger(f"bench-spool-{id(handler)}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        start = time.perf_counter()
+        for i in range(records):
+            logger.info("benchmark record %d", i)
+        while handler.spooled < records:
+            time.sleep(0.001)
+        spooled = time.perf_counter() - start
+        server = CountingHTTPServer(port).start()
+        start = time.perf_counter()
+        while server.records < records:
+            time.sleep(0.001)
+        recovered = time.perf_counter() - start
+        handler.close()
+        server.stop()
+    return {
+        "spooled_per_sec": records / spooled,
+        "recovery_seconds": recovered,
+        "replayed_per_sec": records / recovered,
+        "retries": handler.retries,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    add_json_argument(parser)
+    args = parser.parse_args()
+    results = []
+    for fsync in (False, True):
+        row = run_spool(args.records, args.batch_size, fsync)
+        mode = "spool-fsync" if fsync else "spool"
+        print(
+            f"{mode:>12}: append {row['append_per_sec']:>10.0f} records/s, "
+            f"replay {row['replay_per_sec']:>10.0f} records/s"
+        )
+        results.append({"mode": mode, **{k: round(v) for k, v in row.items()}})
+    row = run_recovery(args.records, args.batch_size)
+    print(
+        f"{'recovery':>12}: spooled {row['spooled_per_sec']:>9.0f} records/s, "
+        f"backlog delivered in {row['recovery_seconds']:.3f}s "
+        f"({row['replayed_per_sec']:.0f} records/s, "
+        f"{row['retries']:.0f} retries)"
+    )
+    results.append(
+        {
+            "mode": "recovery",
+            "spooled_per_sec": round(row["spooled_per_sec"]),
+            "recovery_seconds": round(row["recovery_seconds"], 4),
+            "replayed_per_sec": round(row["replayed_per_sec"]),
+            "retries": row["retries"],
+        }
+    )
+    write_json(args.json, "spool", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""
+Throughput, latency and allocation benchmark for every himalog sink,
+formatter and delivery mode.
+
+Each scenario builds its handlers with the public ``add_*_handler`` helper
+(or ``compile_pipeline`` for the queue, memory and metrics modes) on a fresh logger,
+then 1, 4 and 16 producer threads log ``--records`` INFO records between
+them. Network sinks talk to the local stand-in HTTP, SMTP and TCP servers
+in ``_servers.py``; the multi-process shipper talks to an in-process
+``LogAggregator``. For every scenario and thread count the suite reports:
+
+* ``records_per_sec``: records per second on the calling threads, until the
+  last producer returns;
+* ``delivered_per_sec``: the same, including closing the handlers, which
+  drains queues and background workers;
+* ``p50_us``/``p99_us``/``max_us``: per-call emit latency on the calling
+  thread;
+* ``peak_alloc_bytes``: the mean peak of Python memory allocated during one
+  logging call (``tracemalloc``, single producer only).
+
+Slow synchronous network sinks (one connection per record) run
+``--network-scale`` times as many records.
+
+Usage:
+    python benchmarks/bench_suite.py [--records N] [--threads 1 4 16]
+        [--scenarios NAME ...] [--json PATH]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+from _harness import add_json_argument, write_json
+from _servers import CountingHTTPServer, CountingSMTPServer, CountingTCPServer
+
+from himalog.formatters import ColorFormatter, JsonFormatter
+from himalog.handlers.aio import (
+    add_asyncio_http_handler,
+    add_asyncio_tcp_handler,
+)
+from himalog.handlers.async_http import add_async_http_handler
+from himalog.handlers.async_smtp import add_async_smtp_handler
+from himalog.handlers.console import add_console_handler
+from himalog.handlers.file import add_file_handler
+from himalog.handlers.http import add_http_handler
+from himalog.handlers.mmap_log import add_mmap_log_handler
+from himalog.handlers.multiprocess import (
+    LogAggregator,
+    add_socket_shipper_handler,
+)
+from himalog.handlers.rotating_file import add_rotating_file_handler
+from himalog.handlers.smtp import add_smtp_handler
+from himalog.handlers.timed_rotating_file import (
+    add_timed_rotating_file_handler,
+)
+from himalog.pipeline import compile_pipeline, detach
+
+# Records sampled for the allocation measurement.
+_ALLOC_SAMPLES = 500
+
+
+class _NullHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        pass
+
+
+class _FormattingHandler(logging.Handler):
+    # Formats every record and discards the result: the cost of the
+    # formatter alone.
+    def emit(self, record: logging.LogRecord) -> None:
+        self.format(record)
+
+
+class _Env:
+    """
+    Stand-in servers, scratch directory and event loop shared by all
+    scenarios.
+    """
+
+    def __init__(self, records: int) -> None:
+        self.records = records
+        self.tmp = tempfile.TemporaryDirectory()
+        self.http = CountingHTTPServer().start()
+        self.smtp = CountingSMTPServer().start()
+        self.tcp = CountingTCPServer().start()
+        self.aggregator = LogAggregator(
+            os.path.join(self.tmp.name, "aggregator.sock"), _NullHandler()
+        )
+        self.aggregator.start()
+        self.devnull = open(os.devnull, "w")
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self._files = 0
+
+    def path(self, name: str) -> str:
+        self._files += 1
+        return os.path.join(self.tmp.name, f"{self._files}-{name}")
+
+    def close(self) -> None:
+        self.aggregator.stop(5.0)
+        self.http.stop()
+        self.smtp.stop()
+        self.tcp.stop()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.devnull.close()
+        self.tmp.cleanup()
+
+
+# A scenario adds its handlers to the logger and returns the function that
+# flushes and closes them.
+Scenario = Callable[[logging.Logger, _Env], Callable[[], None]]
+
+
+def _closer(logger: logging.Logger) -> Callable[[], None]:
+    def close() -> None:
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+            handler.close()
+
+    return close
+
+
+def _helper(
+    add: Callable[..., None], options: Callable[[_Env], dict[str, Any]]
+) -> Scenario:
+    def setup(logger: logging.Logger, env: _Env) -> Callable[[], None]:
+        add(logger, **options(env))
+        return _closer(logger)
+
+    return setup
+
+
+def _console(logger: logging.Logger, env: _Env) -> Callable[[], None]:
+    # StreamHandler binds sys.stderr when it is created.
+    with contextlib.redirect_stderr(env.devnull):
+        add_console_handler(logger)
+    return _closer(logger)
+
+
+def _asyncio(add: Callable[..., None], **options: Any) -> Scenario:
+    def setup(logger: logging.Logger, env: _Env) -> Callable[[], None]:
+        endpoint: dict[str, Any]
+        if add is add_asyncio_tcp_handler:
+            endpoint = {"host": "127.0.0.1", "port": env.tcp.port}
+        else:
+            endpoint = {"host": env.http.host, "url": "/log"}
+        add(logger, queue_size=env.records, **endpoint, **options)
+        logger.handlers[-1].start(env.loop)  # type: ignore[attr-defined]
+        return _closer(logger)
+
+    return setup
+
+
+def _formatter(formatter: logging.Formatter) -> Scenario:
+    def setup(logger: logging.Logger, env: _Env) -> Callable[[], None]:
+        handler = _FormattingHandler()
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+        return _closer(logger)
+
+    return setup
+
+
+def _pipeline(**options: Any) -> Scenario:
+    def setup(logger: logging.Logger, env: _Env) -> Callable[[], None]:
+        pipeline = compile_pipeline(
+            {"console": False, "file": env.path("pipeline.log"), **options}
+        )
+        pipeline.attach(logger)
+
+        def close() -> None:
+            detach(logger)
+            pipeline.stop(5.0)
+
+        return close
+
+    return setup
+
+
+def _async_options(env: _Env) -> dict[str, Any]:
+    return {"queue_size": env.records, "overflow_policy": "block"}
+
+
+_SMTP = {
+    "fromaddr": "bench@example.com",
+    "toaddrs": ["ops@example.com"],
+    "subject": "bench",
+}
+
+# Name -> (scenario, uses a slow synchronous network sink).
+SCENARIOS: dict[str, tuple[Scenario, bool]] = {
+    "console": (_console, False),
+    "file": (
+        _helper(add_file_handler, lambda env: {"filename": env.path("f")}),
+        False,
+    ),
+    "file_buffered": (
+        _helper(
+            add_file_handler,
+            lambda env: {"filename": env.path("fb"), "buffer": {}},
+        ),
+        False,
+    ),
+    "rotating_file": (
+        _helper(
+            add_rotating_file_handler,
+            lambda env: {"filename": env.path("r"), "max_bytes": 1 << 24},
+        ),
+        False,
+    ),
+    "timed_rotating_file": (
+        _helper(
+            add_timed_rotating_file_handler,
+            lambda env: {"filename": env.path("t")},
+        ),
+        False,
+    ),
+    "mmap_log": (
+        _helper(
+            add_mmap_log_handler,
+            lambda env: {
+                "filename": env.path("m"),
+                "segment_size": 1 << 24,
+            },
+        ),
+        False,
+    ),
+    "smtp": (
+        _helper(
+            add_smtp_handler,
+            lambda env: {"mailhost": env.smtp.mailhost, **_SMTP},
+        ),
+        True,
+    ),
+    "async_smtp": (
+        _helper(
+            add_async_smtp_handler,
+            lambda env: {
+                "mailhost": env.smtp.mailhost,
+                "batch_size": 100,
+                "batch_interval": 0.05,
+                **_SMTP,
+                **_async_options(env),
+            },
+        ),
+        False,
+    ),
+    "http": (
+        _helper(
+            add_http_handler,
+            lambda env: {"host": env.http.host, "url": "/log"},
+        ),
+        True,
+    ),
+    "async_http": (
+        _helper(
+            add_async_http_handler,
+            lambda env: {
+                "host": env.http.host,
+                "url": "/log",
+                "batch_size": 500,
+                **_async_options(env),
+            },
+        ),
+        False,
+    ),
+    "asyncio_http": (_asyncio(add_asyncio_http_handler), False),
+    "asyncio_tcp": (_asyncio(add_asyncio_tcp_handler), False),
+    "multiprocess": (
+        _helper(
+            add_socket_shipper_handler,
+            lambda env: {
+                "path": env.aggregator.path,
+                **_async_options(env),
+            },
+        ),
+        False,
+    ),
+    "json_formatter": (_formatter(JsonFormatter()), False),
+    "color_formatter": (_formatter(ColorFormatter(colorize=True)), False),
+    "queue": (
+        _pipeline(use_queue=True, queue_size=100_000, overflow_policy="block"),
+        False,
+    ),
+    "memory": (
+        _pipeline(use_memory_handler=True, memory_capacity=1000),
+        False,
+    ),
+    "metrics": (_pipeline(metrics="bench-suite"), False),
+}
+
+
+def _new_logger(name: str) -> logging.Logger:
+    # Not registered with the logging manager, so runs never share state.
+    logger = logging.Logger(f"bench-suite-{name}", logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def _peak_alloc(logger: logging.Logger, samples: int) -> float:
+    tracemalloc.start()
+    try:
+        total = 0
+        for i in range(samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            logger.info("user %s bought %d items", "alice", i)
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / samples
+
+
+def _produce(
+    logger: logging.Logger,
+    records: int,
+    barrier: threading.Barrier,
+    latencies: list[int],
+) -> None:
+    clock = time.perf_counter_ns
+    info = logger.info
+    append = latencies.append
+    barrier.wait()
+    for i in range(records):
+        start = clock()
+        info("user %s bought %d items", "alice", i)
+        append(clock() - start)
+
+
+def _percentile(ordered: list[int], fraction: float) -> float:
+    index = min(len(ordered) - 1, int(len(ordered) * fraction))
+    return ordered[index] / 1000
+
+
+def run(
+    name: str, scenario: Scenario, env: _Env, records: int, threads: int
+) -> dict[str, Any]:
+    """
+    Run one scenario with a number of producer threads.
+
+    Args:
+        name (str): Scenario name.
+        scenario (Scenario): Builds the handlers under test.
+        env (_Env): Shared servers and scratch space.
+        records (int): Records logged across all threads.
+        threads (int): Producer threads.
+
+    Returns:
+        dict[str, Any]: The measured row.
+    """
+    logger = _new_logger(f"{name}-{threads}")
+    close = scenario(logger, env)
+    peak_alloc: Optional[float] = None
+    if threads == 1:
+        peak_alloc = _peak_alloc(logger, min(_ALLOC_SAMPLES, records))
+    per_thread = max(1, records // threads)
+    barrier = threading.Barrier(threads + 1)
+    latencies: list[list[int]] = [[] for _ in range(threads)]
+    workers = [
+        threading.Thread(
+            target=_produce, args=(logger, per_thread, barrier, latencies[i])
+        )
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    emitted = time.perf_counter() - start
+    close()
+    delivered = time.perf_counter() - start
+    ordered = sorted(lat for thread in latencies for lat in thread)
+    total = per_thread * threads
+    return {
+        "scenario": name,
+        "threads": threads,
+        "records": total,
+        "records_per_sec": round(total / emitted),
+        "delivered_per_sec": round(total / delivered),
+        "p50_us": round(_percentile(ordered, 0.50), 2),
+        "p99_us": round(_percentile(ordered, 0.99), 2),
+        "max_us": round(ordered[-1] / 1000, 2),
+        "peak_alloc_bytes": (
+            round(peak_alloc) if peak_alloc is not None else None
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--network-scale", type=float, default=0.02)
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=sorted(SCENARIOS),
+        default=list(SCENARIOS),
+    )
+    add_json_argument(parser)
+    args = parser.parse_args()
+    env = _Env(args.records)
+    results = []
+    try:
+        for name in args.scenarios:
+            scenario, slow = SCENARIOS[name]
+            records = args.records
+            if slow:
+                records = max(100, int(records * args.network_scale))
+            for threads in args.threads:
+                row = run(name, scenario, env, records, threads)
+                results.append(row)
+                alloc = row["peak_alloc_bytes"]
+                print(
+                    f"{name:>19} x{threads:<2}: "
+                    f"{row['records_per_sec']:>9} rec/s "
+                    f"{row['delivered_per_sec']:>9} delivered/s "
+                    f"p50 {row['p50_us']:>8.2f} us "
+                    f"p99 {row['p99_us']:>9.2f} us"
+                    + (f"  {alloc} B/call" if alloc is not None else "")
+                )
+    finally:
+        env.close()
+    write_json(args.json, "suite", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
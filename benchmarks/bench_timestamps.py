@@ -0,0 +1,87 @@
+"""
+Per-record cost of timestamp formatting.
+
+Formats a stream of records whose ``created`` times advance by
+``--step`` seconds (10 µs by default, so many records share a second) with
+``logging.Formatter`` and with ``HimaFormatter``, whose ``formatTime`` goes
+through the shared per-second ``TimestampCache``. The ISO-8601 row compares
+against ``datetime.isoformat``, the usual way to get that format from the
+standard library.
+
+Usage:
+    python benchmarks/bench_timestamps.py [--records N] [--step SECONDS]
+"""
+
+import argparse
+import datetime
+import logging
+import time
+from typing import Callable
+
+from _harness import add_json_argument, write_json
+
+from himalog.formatters import HimaFormatter
+
+
+def _records(count: int, step: float) -> list[logging.LogRecord]:
+    records = []
+    start = time.time()
+    for i in range(count):
+        record = logging.LogRecord(
+            "bench", logging.INFO, __file__, 1, "hello", (), None
+        )
+        record.created = start + i * step
+        record.msecs = int((record.created - int(record.created)) * 1000)
+        records.append(record)
+    return records
+
+
+def _isoformat(record: logging.LogRecord) -> str:
+    return (
+        datetime.datetime.fromtimestamp(record.created)
+        .astimezone()
+        .isoformat(timespec="milliseconds")
+    )
+
+
+def _timed(
+    records: list[logging.LogRecord],
+    func: Callable[[logging.LogRecord], str],
+) -> float:
+    start = time.perf_counter()
+    for record in records:
+        func(record)
+    return (time.perf_counter() - start) / len(records) * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--step", type=float, default=1e-5)
+    add_json_argument(parser)
+    args = parser.parse_args()
+    records = _records(args.records, args.step)
+    stdlib = logging.Formatter("%(asctime)s %(message)s")
+    hima = HimaFormatter("%(asctime)s %(message)s")
+    rows: list[tuple[str, Callable[[logging.LogRecord], str]]] = [
+        ("stdlib formatTime", stdlib.formatTime),
+        ("cached formatTime", hima.formatTime),
+        ("stdlib format", stdlib.format),
+        ("cached format", hima.format),
+        ("stdlib iso8601", _isoformat),
+        ("cached iso8601", lambda r: hima.formatTime(r, "iso8601")),
+        ("cached rfc3339", lambda r: hima.formatTime(r, "rfc3339")),
+        ("cached epoch_ns", lambda r: hima.formatTime(r, "epoch_ns")),
+    ]
+    results = []
+    for label, func in rows:
+        ns_per_record = _timed(records, func)
+        print(f"{label:>18}: {ns_per_record:8.0f} ns/record")
+        results.append(
+            {"variant": label, "ns_per_record": round(ns_per_record)}
+        )
+    write_json(args.json, "timestamps", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
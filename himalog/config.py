@@ -4,24 +4,24 @@ Configuration loader for himalog.
 Supports YAML, JSON, and TOML config files for flexible logger configuration.
 """
 
+import copy
 import json
 import os
+import threading
 from typing import Any
 
-try:
-    import yaml as _yaml
-except ImportError:
-    _yaml = None  # type: ignore
-try:
-    import toml as _toml
-except ImportError:
-    _toml = None  # type: ignore
+# Parsed configs by path, with the (mtime, size) they were parsed at.
+_cache: dict[str, tuple[tuple[int, int], Any]] = {}
+_cache_lock = threading.Lock()
 
 
 def load_config(config_path: str) -> Any:
     """
     Load a configuration file (YAML, JSON, or TOML).
 
+    The parsed result is cached until the file's mtime or size changes;
+    each call returns its own copy.
+
     Args:
         config_path (str): Path to the configuration file.
 
@@ -32,18 +32,42 @@ def load_config(config_path: str) -> Any:
         ImportError: If required parser is not installed.
         ValueError: If the file extension is unsupported.
     """
+    stat = os.stat(config_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = os.path.abspath(config_path)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return copy.deepcopy(cached[1])
+    data = _parse_config(config_path)
+    with _cache_lock:
+        _cache[key] = (signature, data)
+    return copy.deepcopy(data)
+
+
+def _parse_config(config_path: str) -> Any:
+    # The YAML and TOML parsers are imported on first use, so importing
+    # himalog does not pay for a parser the configuration never needs.
     ext = os.path.splitext(config_path)[1].lower()
     with open(config_path, "r", encoding="utf-8") as f:
         if ext in [".yaml", ".yml"]:
-            if not _yaml or not getattr(_yaml, "safe_load", None):
+            try:
+                import yaml
+            except ImportError:
+                yaml = None
+            if not yaml or not getattr(yaml, "safe_load", None):
                 raise ImportError("pyyaml is required for YAML config support")
-            return _yaml.safe_load(f)
+            return yaml.safe_load(f)
         elif ext == ".json":
             return json.load(f)
         elif ext == ".toml":
-            if not _toml or not getattr(_toml, "load", None):
+            try:
+                import toml
+            except ImportError:
+                toml = None
+            if not toml or not getattr(toml, "load", None):
                 raise ImportError("toml is required for TOML config support")
-            return _toml.load(f)
+            return toml.load(f)
         else:
             raise ValueError(f"Unsupported config file extension: {ext}")
 
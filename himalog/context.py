@@ -0,0 +1,184 @@
+"""
+Per-call structured context for himalog.
+
+Context is stored in a ``contextvars.ContextVar`` as an immutable mapping,
+so it follows asyncio tasks automatically and stays isolated per thread.
+Each ``bind`` creates the merged mapping once; ``ContextFilter`` attaches
+that same mapping to every record as ``record.context`` until the context
+changes again.
+"""
+
+import functools
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from types import MappingProxyType
+from typing import Any, Callable, Iterator, Mapping, Optional, TypeVar
+
+_T = TypeVar("_T")
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+_context: ContextVar[Mapping[str, Any]] = ContextVar(
+    "himalog_context", default=_EMPTY
+)
+
+
+def get_context() -> Mapping[str, Any]:
+    """
+    Get the context bound in the current task or thread.
+
+    Returns:
+        Mapping[str, Any]: Immutable mapping of context fields.
+    """
+    return _context.get()
+
+
+def bind(**fields: Any) -> Token[Mapping[str, Any]]:
+    """
+    Add fields to the current context.
+
+    Args:
+        **fields: Context fields to add or override.
+
+    Returns:
+        Token[Mapping[str, Any]]: Token that restores the previous context
+        when passed to ``reset``.
+    """
+    return _context.set(MappingProxyType({**_context.get(), **fields}))
+
+
+def unbind(*keys: str) -> Token[Mapping[str, Any]]:
+    """
+    Remove fields from the current context.
+
+    Args:
+        *keys: Names of the fields to remove.
+
+    Returns:
+        Token[Mapping[str, Any]]: Token that restores the previous context.
+    """
+    current = _context.get()
+    return _context.set(
+        MappingProxyType({k: v for k, v in current.items() if k not in keys})
+    )
+
+
+def clear_context() -> Token[Mapping[str, Any]]:
+    """
+    Remove all fields from the current context.
+
+    Returns:
+        Token[Mapping[str, Any]]: Token that restores the previous context.
+    """
+    return _context.set(_EMPTY)
+
+
+def reset(token: Token[Mapping[str, Any]]) -> None:
+    """
+    Restore the context that was current before ``bind``/``unbind``.
+
+    Args:
+        token (Token[Mapping[str, Any]]): Token returned by bind/unbind.
+    """
+    _context.reset(token)
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[Mapping[str, Any]]:
+    """
+    Bind fields for the duration of a ``with`` block.
+
+    Args:
+        **fields: Context fields to add or override.
+
+    Yields:
+        Mapping[str, Any]: The merged context inside the block.
+    """
+    token = bind(**fields)
+    try:
+        yield _context.get()
+    finally:
+        _context.reset(token)
+
+
+def with_context(func: Callable[..., _T]) -> Callable[..., _T]:
+    """
+    Capture the current context for a callable run in another thread.
+
+    Thread pools do not inherit context variables; wrap the callable before
+    submitting it so records it logs carry the submitter's context.
+
+    Args:
+        func (Callable[..., _T]): Callable to wrap.
+
+    Returns:
+        Callable[..., _T]: Wrapper that runs ``func`` with the captured
+        context bound.
+    """
+    captured = _context.get()
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> _T:
+        token = _context.set(captured)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _context.reset(token)
+
+    return wrapper
+
+
+class ContextFilter(logging.Filter):
+    """
+    Logging filter to attach contextual fields to log records.
+
+    Static fields given at construction are merged with the fields bound
+    in the current context (bound fields win). The merged mapping is
+    reused until the bound context changes and is set on the record as a
+    single ``context`` attribute. Each field is also set as a record
+    attribute (unless the record already has one of that name), so
+    ``%(request_id)s`` works in format strings.
+
+    Args:
+        context (Optional[dict[str, Any]]): Static contextual fields.
+    """
+
+    def __init__(self, context: Optional[dict[str, Any]] = None) -> None:
+        super().__init__()
+        self.context: Mapping[str, Any] = MappingProxyType(dict(context or {}))
+        self._merged: tuple[Mapping[str, Any], Mapping[str, Any]] = (
+            _EMPTY,
+            self.context,
+        )
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Attach the merged context to the log record.
+
+        Args:
+            record (logging.LogRecord): The log record.
+
+        Returns:
+            bool: Always True.
+        """
+        bound = _context.get()
+        merged = self._merged
+        if merged[0] is not bound:
+            if not self.context:
+                merged = (bound, bound)
+            elif not bound:
+                merged = (bound, self.context)
+            else:
+                merged = (
+                    bound,
+                    MappingProxyType({**self.context, **bound}),
+                )
+            self._merged = merged
+        context = merged[1]
+        if context:
+            record.context = context
+            attrs = record.__dict__
+            for key, value in context.items():
+                attrs.setdefault(key, value)
+        return True
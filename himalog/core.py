@@ -8,6 +8,8 @@ import logging
 import os
 from typing import Any, Callable, Optional, Union
 
+from .formatters import HimaFormatter
+
 _DEFAULT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 
 
@@ -34,6 +36,119 @@ def env_or_default(
     return default
 
 
+class HimaLogger(logging.Logger):
+    """
+    Logger that also rejects levels no reachable handler would accept.
+
+    The effective threshold is the higher of the logger's effective level
+    and the lowest level among the handlers a record would reach (this
+    logger's and, while ``propagate`` is set, its ancestors'). Results are
+    cached per level in the standard ``Logger._cache``, which the logging
+    module clears on every ``setLevel``; adding or removing handlers on a
+    ``HimaLogger`` and changing ``propagate`` clear it as well. Plain
+    ``logging.Logger`` ancestors (usually the root logger) clear nothing,
+    so a rejection that depends on their handlers is cached together with
+    a snapshot of those handler lists and ``propagate`` flags, and is
+    recomputed once ``basicConfig`` or a test fixture changes them. Call
+    ``refresh_level_cache`` after changing a handler's level directly.
+    """
+
+    @property
+    def propagate(self) -> bool:
+        return bool(self.__dict__.get("propagate", True))
+
+    @propagate.setter
+    def propagate(self, value: bool) -> None:
+        self.__dict__["propagate"] = value
+        self.manager._clear_cache()  # type: ignore[attr-defined]
+
+    def isEnabledFor(self, level: int) -> bool:
+        """
+        Check whether a record at ``level`` would be handled at all.
+
+        Args:
+            level (int): Logging level.
+
+        Returns:
+            bool: True if a record at this level would reach a handler.
+        """
+        if self.disabled:
+            return False
+        cache: dict[int, bool] = self._cache  # type: ignore[attr-defined]
+        try:
+            enabled = cache[level]
+        except KeyError:
+            pass
+        else:
+            if enabled:
+                return True
+            snapshots = self.__dict__.get("_stock_snapshots")
+            if not snapshots or self._stock_unchanged(snapshots.get(level)):
+                return False
+        snapshots = self.__dict__.get("_stock_snapshots")
+        if snapshots:
+            snapshots.pop(level, None)
+        if self.manager.disable >= level or level < self.getEffectiveLevel():
+            cache[level] = False
+            return False
+        threshold, stock = self._handler_threshold()
+        enabled = level >= threshold
+        if not enabled and stock:
+            snapshots = self.__dict__.setdefault("_stock_snapshots", {})
+            snapshots[level] = [
+                (logger, list(logger.handlers), logger.propagate)
+                for logger in stock
+            ]
+        cache[level] = enabled
+        return enabled
+
+    def _stock_unchanged(
+        self,
+        snapshot: Optional[
+            list[tuple[logging.Logger, list[logging.Handler], bool]]
+        ],
+    ) -> bool:
+        # Whether the plain ancestors behind a cached rejection still have
+        # the handlers and propagate flags it was computed from.
+        if snapshot is None:
+            return True
+        for logger, handlers, propagate in snapshot:
+            if logger.handlers != handlers or logger.propagate != propagate:
+                return False
+        return True
+
+    def _handler_threshold(self) -> tuple[int, list[logging.Logger]]:
+        # Also report the plain loggers consulted: they do not clear the
+        # cache when their handlers change.
+        levels: list[int] = []
+        stock: list[logging.Logger] = []
+        logger: Optional[logging.Logger] = self
+        while logger:
+            levels.extend(handler.level for handler in logger.handlers)
+            if not isinstance(logger, HimaLogger):
+                stock.append(logger)
+            if not logger.propagate:
+                break
+            logger = logger.parent
+        # With no handlers the record falls through to lastResort (or a
+        # handler added later); never prune in that case.
+        return min(levels, default=logging.NOTSET), stock
+
+    def addHandler(self, hdlr: logging.Handler) -> None:
+        super().addHandler(hdlr)
+        self.refresh_level_cache()
+
+    def removeHandler(self, hdlr: logging.Handler) -> None:
+        super().removeHandler(hdlr)
+        self.refresh_level_cache()
+
+    def refresh_level_cache(self) -> None:
+        """
+        Invalidate cached level checks for this logger and its children.
+        """
+        self.manager._clear_cache()  # type: ignore[attr-defined]
+
+
 class HimaLog:
     """
     Core logger class for himalog.
@@ -58,6 +173,14 @@ class HimaLog:
             config_env (Optional[dict[str, str]]): Environment variable overrides.
         """
         self.logger = logging.getLogger(name)
+        # The root logger keeps its class: it is shared with every other
+        # library and test fixture in the process.
+        if (
+            type(self.logger) is logging.Logger
+            and self.logger is not logging.root
+        ):
+            self.logger.__class__ = HimaLogger
+            self.logger.manager._clear_cache()  # type: ignore[attr-defined]
         self._config_env = config_env or {
             "level": "HIMALOG_LEVEL",
             "format": "HIMALOG_FORMAT",
@@ -90,7 +213,7 @@ class HimaLog:
             fmt (str): Log message format string.
         """
         for handler in self.logger.handlers:
-            handler.setFormatter(logging.Formatter(fmt))
+            handler.setFormatter(HimaFormatter(fmt))
 
     def remove_handlers(self) -> None:
         """
@@ -99,6 +222,12 @@ class HimaLog:
         for handler in self.logger.handlers[:]:
             self.logger.removeHandler(handler)
 
+    def refresh_level_cache(self) -> None:
+        """
+        Recompute the cached level threshold after handler levels change.
+        """
+        self.logger.manager._clear_cache()  # type: ignore[attr-defined]
+
     def add_filter(
         self, filter_func: Callable[[logging.LogRecord], bool]
     ) -> None:
@@ -6,13 +6,338 @@ Includes JSON and colorized formatters for advanced log output.
 
 import json
 import logging
+import sys
+import time
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
 
+# Attributes every LogRecord carries; anything else was added through
+# ``extra=`` or a context filter.
+_RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None))
+) | {"message", "asctime"}
 
-class JsonFormatter(logging.Formatter):
+_DEFAULT_JSON_FIELDS = ("time", "level", "name", "message")
+
+
+def _merge_context(
+    fields: dict[str, Any],
+    context: Mapping[str, Any],
+    taken: Sequence[str] = (),
+) -> None:
+    """
+    Flatten context fields into ``fields`` without overwriting anything.
+
+    Keys already in ``fields`` with a different value (``ContextFilter``
+    also copies each field to a record attribute) or listed in ``taken``
+    stay nested under "context", so a context value can never replace a
+    core or extra field.
+
+    Args:
+        fields (dict[str, Any]): Output fields, updated in place.
+        context (Mapping[str, Any]): Context fields of the record.
+        taken (Sequence[str]): Further names the output already shows.
+    """
+    nested = {}
+    for key, value in context.items():
+        if key in taken or (key in fields and fields[key] is not value):
+            nested[key] = value
+        else:
+            fields[key] = value
+    if nested:
+        fields["context"] = nested
+
+
+def _orjson_dumps() -> Callable[[Any], str]:
+    import orjson
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+
+    return dumps
+
+
+def _ujson_dumps() -> Callable[[Any], str]:
+    import ujson
+
+    def dumps(obj: Any) -> str:
+        encoded: str = ujson.dumps(obj, ensure_ascii=False, default=str)
+        return encoded
+
+    return dumps
+
+
+def _stdlib_dumps() -> Callable[[Any], str]:
+    encoder = json.JSONEncoder(
+        ensure_ascii=False, separators=(",", ":"), default=str
+    )
+    return encoder.encode
+
+
+_JSON_BACKENDS: dict[str, Callable[[], Callable[[Any], str]]] = {
+    "orjson": _orjson_dumps,
+    "ujson": _ujson_dumps,
+    "json": _stdlib_dumps,
+}
+
+
+def get_json_dumps(
+    backend: Optional[str] = None,
+) -> tuple[str, Callable[[Any], str]]:
+    """
+    Select a JSON serializer.
+
+    Args:
+        backend (Optional[str]): 'orjson', 'ujson' or 'json'. Defaults to
+            the fastest installed backend.
+
+    Returns:
+        tuple[str, Callable[[Any], str]]: Backend name and dumps function.
+
+    Raises:
+        ImportError: If the requested backend is not installed.
+        ValueError: If the backend name is unknown.
+    """
+    if backend is not None:
+        if backend not in _JSON_BACKENDS:
+            raise ValueError(f"Unsupported JSON backend: {backend}")
+        return backend, _JSON_BACKENDS[backend]()
+    for name, factory in _JSON_BACKENDS.items():
+        try:
+            return name, factory()
+        except ImportError:
+            continue
+    raise ImportError("No JSON backend available")  # pragma: no cover
+
+
+ISO8601 = "iso8601"
+RFC3339 = "rfc3339"
+EPOCH_NS = "epoch_ns"
+
+_ISO_PREFIX_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _utc_offset(ct: time.struct_time, utc_suffix: str) -> str:
+    offset = ct.tm_gmtoff or 0
+    if not offset:
+        return utc_suffix
+    sign = "-" if offset < 0 else "+"
+    hours, minutes = divmod(abs(offset) // 60, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+class TimestampCache:
+    """
+    Formats record times, reusing the formatted prefix for every record in
+    the same second; only the milliseconds are added per record.
+
+    ``datefmt`` is a ``strftime`` format, None for ``logging.Formatter``'s
+    default (``default_time_format`` plus ``default_msec_format``), or one
+    of 'iso8601' (``2024-05-01T12:00:00.123+02:00``), 'rfc3339' (the same,
+    with ``Z`` for UTC) and 'epoch_ns' (integer nanoseconds since the
+    epoch, at microsecond resolution).
+    """
+
+    def __init__(
+        self,
+        datefmt: Optional[str] = None,
+        converter: Callable[[Optional[float]], time.struct_time] = (
+            time.localtime
+        ),
+        default_time_format: str = logging.Formatter.default_time_format,
+        default_msec_format: Optional[
+            str
+        ] = logging.Formatter.default_msec_format,
+    ) -> None:
+        self.datefmt = datefmt
+        self.converter = converter
+        self.default_time_format = default_time_format
+        self.default_msec_format = default_msec_format
+        self._epoch_ns = datefmt == EPOCH_NS
+        # (second, formatted prefix, msec format or None), replaced as one
+        # tuple so concurrent formatters never pair a stale prefix with a
+        # new second.
+        self._cached: tuple[int, str, Optional[str]] = (-1, "", None)
+
+    def _refresh(self, created: float) -> tuple[int, str, Optional[str]]:
+        ct = self.converter(created)
+        datefmt = self.datefmt
+        if datefmt == ISO8601 or datefmt == RFC3339:
+            utc = "Z" if datefmt == RFC3339 else "+00:00"
+            # The offset can change between seconds (DST), so it is part of
+            # the cached entry rather than the cache.
+            prefix = time.strftime(_ISO_PREFIX_FORMAT, ct)
+            msec_format: Optional[str] = "%s.%03d" + _utc_offset(ct, utc)
+        elif datefmt:
+            prefix = time.strftime(datefmt, ct)
+            msec_format = None
+        else:
+            prefix = time.strftime(self.default_time_format, ct)
+            msec_format = self.default_msec_format
+        cached = (int(created), prefix, msec_format)
+        self._cached = cached
+        return cached
+
+    def format(self, created: float, msecs: float) -> str:
+        """
+        Format a record time.
+
+        Args:
+            created (float): ``record.created``.
+            msecs (float): ``record.msecs``.
+
+        Returns:
+            str: Formatted timestamp.
+        """
+        if self._epoch_ns:
+            # A float timestamp resolves to well under a microsecond; round
+            # there rather than print float noise in the last digits.
+            return "%d000" % round(created * 1e6)
+        cached = self._cached
+        if cached[0] != int(created):
+            cached = self._refresh(created)
+        if cached[2] is None:
+            return cached[1]
+        return cached[2] % (cached[1], msecs)
+
+
+_timestamp_caches: dict[tuple[Any, ...], TimestampCache] = {}
+
+
+def get_timestamp_cache(
+    datefmt: Optional[str] = None,
+    converter: Callable[[Optional[float]], time.struct_time] = time.localtime,
+    default_time_format: str = logging.Formatter.default_time_format,
+    default_msec_format: Optional[str] = logging.Formatter.default_msec_format,
+) -> TimestampCache:
+    """
+    Get the process-wide ``TimestampCache`` for a set of time settings, so
+    every formatter using them formats each second only once.
+
+    Args:
+        datefmt (Optional[str]): ``strftime`` format, None for the default,
+            or 'iso8601', 'rfc3339' or 'epoch_ns'.
+        converter (Callable[[Optional[float]], time.struct_time]):
+            ``time.localtime`` or ``time.gmtime``.
+        default_time_format (str): Format used when ``datefmt`` is None.
+        default_msec_format (Optional[str]): Format combining the prefix
+            and milliseconds when ``datefmt`` is None.
+
+    Returns:
+        TimestampCache: The shared cache.
+    """
+    key = (datefmt, converter, default_time_format, default_msec_format)
+    cache = _timestamp_caches.get(key)
+    if cache is None:
+        cache = _timestamp_caches.setdefault(
+            key,
+            TimestampCache(
+                datefmt, converter, default_time_format, default_msec_format
+            ),
+        )
+    return cache
+
+
+class HimaFormatter(logging.Formatter):
+    """
+    ``logging.Formatter`` whose ``formatTime`` uses the shared
+    ``TimestampCache`` for its ``datefmt`` and ``converter``, so
+    ``time.localtime`` and ``strftime`` run once per second across all
+    himalog formatters. ``datefmt`` also accepts 'iso8601', 'rfc3339' and
+    'epoch_ns'. All himalog formatters derive from it.
+    """
+
+    _timestamps: Optional[TimestampCache] = None
+
+    def formatTime(
+        self, record: logging.LogRecord, datefmt: Optional[str] = None
+    ) -> str:
+        """
+        Format the record time through the shared timestamp cache.
+
+        Args:
+            record (logging.LogRecord): The log record.
+            datefmt (Optional[str]): Date format, as for
+                ``logging.Formatter.formatTime``.
+
+        Returns:
+            str: Formatted timestamp.
+        """
+        cache = self._timestamps
+        if (
+            cache is None
+            or cache.datefmt != datefmt
+            or cache.converter != self.converter
+        ):
+            # Looked up again when the converter is reassigned, as with
+            # ``formatter.converter = time.gmtime``.
+            cache = get_timestamp_cache(
+                datefmt,
+                self.converter,
+                self.default_time_format,
+                self.default_msec_format,
+            )
+            self._timestamps = cache
+        return cache.format(record.created, record.msecs)
+
+
+class JsonFormatter(HimaFormatter):
     """
     Formatter that outputs logs in JSON format.
+
+    The field set is compiled once at construction. ``fields`` is either a
+    sequence of field names or a mapping of output key to source field;
+    'time', 'level' and 'message' are computed, any other name is read
+    from the record attribute of that name. Extra and context fields are
+    appended unless ``include_extra`` is False. Serialization uses orjson
+    or ujson when installed and falls back to the standard library.
     """
 
+    def __init__(
+        self,
+        fmt: Optional[str] = None,
+        datefmt: Optional[str] = None,
+        style: str = "%",
+        fields: Optional[Union[Sequence[str], Mapping[str, str]]] = None,
+        include_extra: bool = True,
+        backend: Optional[str] = None,
+    ) -> None:
+        super().__init__(fmt, datefmt, style)  # type: ignore[arg-type]
+        if fields is None:
+            fields = _DEFAULT_JSON_FIELDS
+        if not isinstance(fields, Mapping):
+            fields = {name: name for name in fields}
+        self._fields: list[tuple[str, Callable[[logging.LogRecord], Any]]] = [
+            (key, self._compile_field(source))
+            for key, source in fields.items()
+        ]
+        self._field_sources = frozenset(fields.values())
+        # A configured "context" field keeps the mapping nested; otherwise
+        # its fields are flattened into the top level.
+        self._flatten_context = "context" not in self._field_sources
+        self.include_extra = include_extra
+        self.backend, self._dumps = get_json_dumps(backend)
+
+    def _compile_field(
+        self, source: str
+    ) -> Callable[[logging.LogRecord], Any]:
+        if source == "time":
+            return lambda record: self.formatTime(record, self.datefmt)
+        if source == "level":
+            return lambda record: record.levelname
+        if source == "message":
+            return lambda record: record.getMessage()
+        if source == "context":
+            return lambda record: dict(getattr(record, "context", None) or {})
+        return lambda record: getattr(record, source, None)
+
     def format(self, record: logging.LogRecord) -> str:
         """
         Format a log record as a JSON string.
@@ -23,20 +348,34 @@ class JsonFormatter(logging.Formatter):
         Returns:
             str: JSON-formatted log string.
         """
-        log_record = {
-            "time": self.formatTime(record, self.datefmt),
-            "level": record.levelname,
-            "name": record.name,
-            "message": record.getMessage(),
-        }
+        log_record = {key: getter(record) for key, getter in self._fields}
+        if self.include_extra:
+            attrs = record.__dict__
+            for key in attrs.keys() - _RESERVED_ATTRS - self._field_sources:
+                if not key.startswith("_"):
+                    log_record[key] = attrs[key]
+            context = attrs.get("context")
+            if self._flatten_context and isinstance(context, Mapping):
+                log_record.pop("context", None)
+                _merge_context(log_record, context)
         if record.exc_info:
-            log_record["exception"] = self.formatException(record.exc_info)
-        return json.dumps(log_record)
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_record["exception"] = record.exc_text
+        if record.stack_info:
+            log_record["stack"] = self.formatStack(record.stack_info)
+        return self._dumps(log_record)
 
 
-class ColorFormatter(logging.Formatter):
+class ColorFormatter(HimaFormatter):
     """
     Formatter that outputs colorized log messages for the console.
+
+    The ANSI prefix and padded level column are cached per level name, and
+    context fields are found by a set difference against the standard
+    ``LogRecord`` attributes. With ``colorize=None`` colors are only used
+    when ``stream`` (default ``sys.stderr``) is a TTY.
     """
 
     COLORS = {
@@ -48,6 +387,33 @@ class ColorFormatter(logging.Formatter):
     }
     RESET = "\033[0m"
 
+    def __init__(
+        self,
+        fmt: Optional[str] = None,
+        datefmt: Optional[str] = None,
+        style: str = "%",
+        colorize: Optional[bool] = True,
+        stream: Optional[IO[str]] = None,
+    ) -> None:
+        super().__init__(fmt, datefmt, style)  # type: ignore[arg-type]
+        if colorize is None:
+            stream = stream or sys.stderr
+            isatty = getattr(stream, "isatty", None)
+            colorize = bool(isatty and isatty())
+        self.colorize = colorize
+        self._reset = self.RESET if colorize else ""
+        self._level_parts: dict[str, tuple[str, str]] = {}
+
+    def _parts_for(self, levelname: str) -> tuple[str, str]:
+        parts = self._level_parts.get(levelname)
+        if parts is None:
+            color = (
+                self.COLORS.get(levelname, self.RESET) if self.colorize else ""
+            )
+            parts = (color, f" [{levelname.ljust(8)}] ")
+            self._level_parts[levelname] = parts
+        return parts
+
     def format(self, record: logging.LogRecord) -> str:
         """
         Format a log record as a colorized string.
@@ -58,44 +424,34 @@ class ColorFormatter(logging.Formatter):
         Returns:
             str: Colorized log string.
         """
-        color = self.COLORS.get(record.levelname, self.RESET)
-        time = self.formatTime(record, self.datefmt)
-        name = record.name.ljust(15)
-        level = record.levelname.ljust(8)
-        msg = record.getMessage()
+        color, level = self._parts_for(record.levelname)
+        parts = [
+            color,
+            self.formatTime(record, self.datefmt),
+            level,
+            record.name.ljust(15),
+            ": ",
+            record.getMessage(),
+        ]
         # Add context fields if present
-        context = ""
-        for attr in sorted(vars(record)):
-            if attr not in (
-                "name",
-                "levelname",
-                "msg",
-                "args",
-                "created",
-                "msecs",
-                "relativeCreated",
-                "levelno",
-                "pathname",
-                "filename",
-                "module",
-                "exc_info",
-                "exc_text",
-                "stack_info",
-                "lineno",
-                "funcName",
-                "thread",
-                "threadName",
-                "processName",
-                "process",
-                "message",
-                "asctime",
-            ):
-                value = getattr(record, attr)
+        attrs = record.__dict__
+        extra = attrs.keys() - _RESERVED_ATTRS
+        if extra:
+            fields = {attr: attrs[attr] for attr in extra}
+            context = fields.get("context")
+            if isinstance(context, Mapping):
+                del fields["context"]
+                # Time, level, name and message are the leading columns.
+                _merge_context(fields, context, _DEFAULT_JSON_FIELDS)
+            for attr in sorted(fields):
+                value = fields[attr]
                 if not attr.startswith("_") and not callable(value):
-                    context += f" {attr}={value}"
-        formatted = (
-            f"{color}{time} [{level}] {name}: {msg}{context}{self.RESET}"
-        )
+                    parts.append(f" {attr}={value}")
+        parts.append(self._reset)
         if record.exc_info:
-            formatted += f"\n{self.formatException(record.exc_info)}"
-        return formatted
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            parts.append("\n")
+            parts.append(record.exc_text)
+        return "".join(parts)
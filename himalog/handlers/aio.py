@@ -0,0 +1,499 @@
+import asyncio
+import base64
+import json
+import logging
+import ssl
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional, Union
+from urllib.parse import urlsplit
+
+from .. import shutdown
+from ..core import _DEFAULT_FORMAT
+from ..formatters import HimaFormatter
+from ..metrics import record_batch, record_failure
+from ..records import CompactRecord, compact
+from ..sampling import add_rate_limit_filter
+from .async_http import _BATCH_CONTENT_TYPES
+
+_SENTINEL = None
+
+
+class AsyncioHandler(logging.Handler, ABC):
+    """
+    Base class for handlers that deliver records from the running asyncio
+    event loop instead of a background thread.
+
+    ``emit`` hands each record to the loop with ``call_soon_threadsafe``
+    (or directly when called on the loop thread). A consumer task collects
+    up to ``batch_size`` records, waiting at most ``batch_interval``
+    seconds, and sends each batch with ``send_batch``; at most
+    ``max_concurrency`` sends are in flight. The loop is bound on the first
+    ``emit`` made from a running loop, or explicitly with ``start``.
+    ``aclose()`` drains the queue and waits for in-flight sends.
+    Subclasses implement ``send_batch``.
+    """
+
+    def __init__(
+        self,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        queue_size: int = 1000,
+        batch_size: int = 100,
+        batch_interval: float = 0.1,
+        max_concurrency: int = 4,
+    ) -> None:
+        super().__init__()
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.batch_interval = batch_interval
+        self.max_concurrency = max(1, max_concurrency)
+        self.enqueued = 0
+        self.dropped = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._queue: "Optional[asyncio.Queue[Optional[CompactRecord]]]"
+        self._queue = None
+        self._consumer: "Optional[asyncio.Task[None]]" = None
+        self._closed = False
+        if loop is not None:
+            self.start(loop)
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Bind the handler to an event loop and start its consumer task.
+
+        Args:
+            loop (Optional[asyncio.AbstractEventLoop]): Loop to bind to.
+                Defaults to the running loop.
+        """
+        if self._loop is not None:
+            return
+        try:
+            running: Optional[asyncio.AbstractEventLoop]
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        self._loop = loop or running
+        if self._loop is None:
+            raise RuntimeError("No running event loop to bind to")
+        if self._loop is running:
+            self._start_consumer()
+        else:
+            self._loop.call_soon_threadsafe(self._start_consumer)
+        shutdown.register(self)
+
+    def _start_consumer(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._queue = asyncio.Queue()
+        self._consumer = asyncio.get_running_loop().create_task(
+            self._consume()
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._closed:
+            return
+        loop = self._loop
+        if loop is None:
+            try:
+                self.start()
+            except RuntimeError:
+                # No running loop to deliver from yet.
+                self.dropped += 1
+                record_failure(self)
+                return
+            loop = self._loop
+            assert loop is not None
+        item = compact(record)
+        if threading.get_ident() == self._loop_thread:
+            self._enqueue(item)
+            return
+        try:
+            loop.call_soon_threadsafe(self._enqueue, item)
+        except RuntimeError:
+            # Loop closed.
+            self.dropped += 1
+            record_failure(self)
+
+    def _enqueue(self, record: Optional[CompactRecord]) -> None:
+        assert self._queue is not None
+        # The asyncio.Queue is unbounded so the stop sentinel always fits;
+        # queue_size is enforced here for records only.
+        queue = self._queue
+        if record is not _SENTINEL and queue.qsize() >= self.queue_size:
+            self.dropped += 1
+            record_failure(self)
+            return
+        queue.put_nowait(record)
+        if record is not _SENTINEL:
+            self.enqueued += 1
+
+    def _drain_nowait(self, batch: list[CompactRecord]) -> bool:
+        assert self._queue is not None
+        while len(batch) < self.batch_size:
+            try:
+                record = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return False
+            if record is _SENTINEL:
+                return True
+            batch.append(record)
+        return False
+
+    async def _consume(self) -> None:
+        assert self._queue is not None
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        in_flight: "set[asyncio.Task[None]]" = set()
+        stopping = False
+        while not stopping:
+            record = await self._queue.get()
+            if record is _SENTINEL:
+                break
+            batch = [record]
+            stopping = self._drain_nowait(batch)
+            if (
+                not stopping
+                and len(batch) < self.batch_size
+                and self.batch_interval > 0
+            ):
+                await asyncio.sleep(self.batch_interval)
+                stopping = self._drain_nowait(batch)
+            record_batch(self, len(batch))
+            await semaphore.acquire()
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            task.add_done_callback(lambda _: semaphore.release())
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def _send(self, batch: list[CompactRecord]) -> None:
+        records = [item.to_record() for item in batch]
+        try:
+            await self.send_batch(records)
+        except Exception:
+            self.handleError(records[0])
+
+    @abstractmethod
+    async def send_batch(self, records: list[logging.LogRecord]) -> None:
+        """
+        Deliver a batch of records.
+
+        Args:
+            records (list[logging.LogRecord]): Records in the batch.
+        """
+
+    async def close_transport(self) -> None:
+        """
+        Release network resources once the queue has been drained.
+        """
+
+    async def aclose(self) -> None:
+        """
+        Drain queued records, wait for in-flight sends and close.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._consumer is not None:
+            self._enqueue(_SENTINEL)
+            await self._consumer
+        await self.close_transport()
+        shutdown.unregister(self)
+        super().close()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Drain from outside the event loop, e.g. at interpreter exit.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait; None waits forever.
+        """
+        loop = self._loop
+        if (
+            loop is None
+            or self._closed
+            or not loop.is_running()
+            or threading.get_ident() == self._loop_thread
+        ):
+            return
+        future = asyncio.run_coroutine_threadsafe(self.aclose(), loop)
+        try:
+            future.result(timeout)
+        except Exception:
+            future.cancel()
+
+    def close(self) -> None:
+        self.stop(shutdown.DEFAULT_TIMEOUT)
+        super().close()
+
+
+class AsyncioHTTPHandler(AsyncioHandler):
+    """
+    Asyncio handler that POSTs batches as a JSON array or NDJSON over
+    keep-alive HTTP/1.1 connections opened with ``asyncio`` streams.
+
+    Up to ``max_concurrency`` connections are kept in a pool; a request that
+    fails on a reused connection is retried once on a fresh one.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        url: str,
+        secure: bool = False,
+        credentials: Optional[tuple[str, str]] = None,
+        context: Optional[ssl.SSLContext] = None,
+        batch_format: str = "json",
+        timeout: float = 5.0,
+        **kwargs: Any,
+    ) -> None:
+        if batch_format not in _BATCH_CONTENT_TYPES:
+            raise ValueError(f"Unsupported batch format: {batch_format}")
+        super().__init__(**kwargs)
+        hostname, _, port = host.partition(":")
+        self.host = host
+        self.hostname = hostname
+        self.port = int(port) if port else (443 if secure else 80)
+        self.url = url
+        self.ssl: Union[ssl.SSLContext, bool] = context or secure
+        self.credentials = credentials
+        self.batch_format = batch_format
+        self.timeout = timeout
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]]
+        self._idle = []
+
+    def map_batch_record(self, record: logging.LogRecord) -> dict[str, Any]:
+        """
+        Map a record to the JSON object sent as one element of a batch.
+
+        Args:
+            record (logging.LogRecord): The log record.
+
+        Returns:
+            dict[str, Any]: JSON-serializable record data.
+        """
+        data = dict(record.__dict__)
+        data["message"] = record.getMessage()
+        data.pop("args", None)
+        if record.exc_info:
+            data["exc_info"] = logging.Formatter().formatException(
+                record.exc_info
+            )
+        return data
+
+    def encode_batch(self, records: list[logging.LogRecord]) -> bytes:
+        """
+        Encode a batch of records as a JSON array or NDJSON payload.
+
+        Args:
+            records (list[logging.LogRecord]): Records in the batch.
+
+        Returns:
+            bytes: The encoded request body.
+        """
+        items = [
+            json.dumps(self.map_batch_record(record), default=str)
+            for record in records
+        ]
+        if self.batch_format == "ndjson":
+            return ("\n".join(items) + "\n").encode("utf-8")
+        return ("[" + ",".join(items) + "]").encode("utf-8")
+
+    def _request_head(self, length: int) -> bytes:
+        path = urlsplit(self.url).path or "/"
+        if urlsplit(self.url).query:
+            path += "?" + urlsplit(self.url).query
+        lines = [
+            f"POST {path} HTTP/1.1",
+            f"Host: {self.host}",
+            f"Content-Type: {_BATCH_CONTENT_TYPES[self.batch_format]}",
+            f"Content-Length: {length}",
+        ]
+        if self.credentials:
+            token = ("%s:%s" % self.credentials).encode("utf-8")
+            lines.append(
+                "Authorization: Basic "
+                + base64.b64encode(token).strip().decode("ascii")
+            )
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def send_batch(self, records: list[logging.LogRecord]) -> None:
+        body = self.encode_batch(records)
+        request = self._request_head(len(body)) + body
+        for attempt in range(2):
+            reused = bool(self._idle)
+            if reused:
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(
+                        self.hostname,
+                        self.port,
+                        ssl=self.ssl or None,
+                    ),
+                    self.timeout,
+                )
+            try:
+                writer.write(request)
+                status, keep_alive = await asyncio.wait_for(
+                    self._read_response(reader), self.timeout
+                )
+            except (OSError, asyncio.TimeoutError, ValueError):
+                writer.close()
+                if attempt or not reused:
+                    raise
+                continue
+            if keep_alive and len(self._idle) < self.max_concurrency:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            if status >= 400:
+                raise OSError(f"HTTP {status} from {self.host}{self.url}")
+            return
+
+    async def _read_response(
+        self, reader: asyncio.StreamReader
+    ) -> tuple[int, bool]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        version, status, *_ = status_line.decode("latin-1").split(" ", 2)
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip().lower()
+        keep_alive = (
+            version == "HTTP/1.1" and headers.get("connection") != "close"
+        )
+        if headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        else:
+            await reader.read()
+            keep_alive = False
+        return int(status), keep_alive
+
+    async def close_transport(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class AsyncioTCPHandler(AsyncioHandler):
+    """
+    Asyncio handler that writes formatted records as newline-delimited
+    lines to a TCP collector (e.g. Vector, Fluent Bit, Logstash) over one
+    persistent ``asyncio`` stream, reconnecting when it fails.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        secure: bool = False,
+        context: Optional[ssl.SSLContext] = None,
+        timeout: float = 5.0,
+        **kwargs: Any,
+    ) -> None:
+        kwargs.setdefault("max_concurrency", 1)
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.ssl: Union[ssl.SSLContext, bool] = context or secure
+        self.timeout = timeout
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def send_batch(self, records: list[logging.LogRecord]) -> None:
+        payload = "".join(
+            self.format(record) + "\n" for record in records
+        ).encode("utf-8")
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            for attempt in range(2):
+                writer = await self._get_writer()
+                try:
+                    writer.write(payload)
+                    await asyncio.wait_for(writer.drain(), self.timeout)
+                    return
+                except (OSError, asyncio.TimeoutError):
+                    writer.close()
+                    self._writer = None
+                    if attempt:
+                        raise
+
+    async def _get_writer(self) -> asyncio.StreamWriter:
+        writer = self._writer
+        if writer is not None and not writer.is_closing():
+            return writer
+        _, connected = await asyncio.wait_for(
+            asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl or None
+            ),
+            self.timeout,
+        )
+        self._writer = connected
+        return connected
+
+    async def close_transport(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def add_asyncio_http_handler(
+    logger: logging.Logger,
+    host: str,
+    url: str,
+    method: str = "POST",
+    level: Optional[Union[int, str]] = None,
+    fmt: Optional[str] = None,
+    filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    rate_limit: Optional[dict[str, Any]] = None,
+    **kwargs: Any,
+) -> None:
+    if method.upper() != "POST":
+        raise ValueError("AsyncioHTTPHandler only supports POST")
+    handler = AsyncioHTTPHandler(host, url, **kwargs)
+    handler.setFormatter(HimaFormatter(fmt or _DEFAULT_FORMAT))
+    if level:
+        if isinstance(level, str):
+            level = getattr(logging, level.upper(), logging.INFO)
+        handler.setLevel(level)
+    if filter_func:
+        handler.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(handler, **rate_limit)
+    logger.addHandler(handler)
+
+
+def add_asyncio_tcp_handler(
+    logger: logging.Logger,
+    host: str,
+    port: int,
+    level: Optional[Union[int, str]] = None,
+    fmt: Optional[str] = None,
+    filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    rate_limit: Optional[dict[str, Any]] = None,
+    **kwargs: Any,
+) -> None:
+    handler = AsyncioTCPHandler(host, port, **kwargs)
+    handler.setFormatter(HimaFormatter(fmt or _DEFAULT_FORMAT))
+    if level:
+        if isinstance(level, str):
+            level = getattr(logging, level.upper(), logging.INFO)
+        handler.setLevel(level)
+    if filter_func:
+        handler.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(handler, **rate_limit)
+    logger.addHandler(handler)
@@ -1,45 +1,373 @@
+import base64
+import http.client
+import json
 import logging
+import random
+import time
 from logging.handlers import HTTPHandler
-from queue import Empty, Queue
+from queue import Empty
 from threading import Thread
-from typing import Callable, Optional, Union
+from typing import Any, Callable, Optional, Union
 
+from .. import shutdown
 from ..core import _DEFAULT_FORMAT
+from ..formatters import HimaFormatter
+from ..metrics import record_batch, record_failure
+from ..records import compact
+from ..sampling import add_rate_limit_filter
+from .queueing import DROP_NEWEST, SENTINEL, OverflowQueue, drain_batch
+from .spool import DiskSpool
+
+_BATCH_CONTENT_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+# Client errors that may succeed when sent again; any other 4xx means the
+# batch itself was refused and retrying it would block everything behind it.
+_RETRYABLE_CLIENT_ERRORS = frozenset({408, 429})
+
+
+class HTTPStatusError(http.client.HTTPException):
+    """
+    The collector answered a batch with an error status.
+
+    Args:
+        status (int): HTTP status code.
+        reason (str): Reason phrase.
+    """
+
+    def __init__(self, status: int, reason: str) -> None:
+        super().__init__(f"HTTP {status} {reason}")
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        """
+        Whether sending the same batch again can succeed.
+        """
+        return self.status >= 500 or self.status in _RETRYABLE_CLIENT_ERRORS
 
 
 class AsyncHTTPHandler(HTTPHandler):
-    queue: "Queue[logging.LogRecord]"
+    queue: OverflowQueue
     """
     An HTTPHandler that sends logs asynchronously using a background thread.
+
+    With ``batch_size > 1`` the worker drains up to ``batch_size`` records
+    (or waits at most ``batch_interval`` seconds), encodes them as a single
+    JSON array or NDJSON payload and POSTs it over one persistent
+    keep-alive connection, reconnecting when the connection fails.
+
+    With ``spool_dir`` set, delivery is durable: records the collector does
+    not accept are appended to a ``DiskSpool`` in that directory and
+    replayed in order once it is reachable again, retrying with exponential
+    backoff (``retry_initial`` doubling up to ``retry_max`` seconds) and
+    jitter. New records are spooled behind the backlog while it drains, and
+    a backlog left by a previous process is replayed on start. Durable
+    delivery always sends batch-encoded bodies, even with ``batch_size=1``.
+    Only transport errors, 5xx, 408 and 429 are retried; a batch refused
+    with any other 4xx status is dropped and counted as ``lost``.
+
+    Batched and durable delivery only support ``method="POST"``.
     """
 
     def __init__(
-        self, host: str, url: str, method: str = "POST", queue_size: int = 1000
+        self,
+        host: str,
+        url: str,
+        method: str = "POST",
+        queue_size: int = 1000,
+        overflow_policy: str = DROP_NEWEST,
+        block_timeout: Optional[float] = 1.0,
+        batch_size: int = 1,
+        batch_interval: float = 0.1,
+        batch_format: str = "json",
+        timeout: float = 5.0,
+        spool_dir: Optional[str] = None,
+        spool_max_bytes: int = 64 * 1024 * 1024,
+        retry_initial: float = 0.5,
+        retry_max: float = 60.0,
     ) -> None:
         super().__init__(host, url, method=method)
-        self.queue = Queue(maxsize=queue_size)
-        self._thread = Thread(target=self._worker, daemon=True)
-        self._thread.start()
+        if batch_format not in _BATCH_CONTENT_TYPES:
+            raise ValueError(f"Unsupported batch format: {batch_format}")
+        if (batch_size > 1 or spool_dir is not None) and self.method != "POST":
+            raise ValueError("Batched HTTP delivery only supports POST")
+        self.batch_size = max(1, batch_size)
+        self.batch_interval = batch_interval
+        self.batch_format = batch_format
+        self.timeout = timeout
+        self._connection: Optional[http.client.HTTPConnection] = None
+        self.queue = OverflowQueue(
+            queue_size, policy=overflow_policy, block_timeout=block_timeout
+        )
+        self.spool: Optional[DiskSpool] = None
+        if spool_dir is not None:
+            self.spool = DiskSpool(spool_dir, max_bytes=spool_max_bytes)
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self.spooled = 0
+        self.replayed = 0
+        self.retries = 0
+        self.lost = 0
+        self._failures = 0
+        self._retry_at = 0.0
         self._closed = False
+        worker = self._worker if self.spool is None else self._durable_worker
+        self._thread = Thread(target=worker, daemon=True)
+        self._thread.start()
+        shutdown.register(self)
 
     def emit(self, record: logging.LogRecord) -> None:
-        try:
-            self.queue.put_nowait(record)
-        except Exception:
-            self.handleError(record)
+        self.queue.offer(compact(record))
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the enqueued/dropped counters and depth of the handler queue,
+        and the spool counters when delivery is durable.
+
+        Returns:
+            dict[str, int]: Queue and spool counters.
+        """
+        stats = self.queue.stats()
+        if self.spool is not None:
+            stats.update(
+                spooled=self.spooled,
+                replayed=self.replayed,
+                retries=self.retries,
+                lost=self.lost,
+                spool_pending=self.spool.pending,
+                spool_bytes=self.spool.size,
+                spool_dropped=self.spool.dropped,
+            )
+        return stats
 
     def _worker(self) -> None:
-        while not self._closed:
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is SENTINEL:
+                break
+            try:
+                if self.batch_size > 1:
+                    batch, stopping = drain_batch(
+                        self.queue,
+                        item,
+                        self.batch_size,
+                        self.batch_interval,
+                    )
+                    record_batch(self, len(batch))
+                    self._send_batch([each.to_record() for each in batch])
+                else:
+                    super().emit(item.to_record())
+            except Exception:
+                self.handleError(item.to_record())
+        self._close_connection()
+
+    def _durable_worker(self) -> None:
+        spool = self.spool
+        assert spool is not None
+        stopping = False
+        while not stopping:
+            if spool.pending and time.monotonic() >= self._retry_at:
+                self._replay(spool)
+            timeout = None
+            if spool.pending:
+                timeout = max(0.0, self._retry_at - time.monotonic())
             try:
-                record = self.queue.get(timeout=0.5)
-                super().emit(record)
+                item = self.queue.get(timeout=timeout)
             except Empty:
                 continue
+            if item is SENTINEL:
+                break
+            batch, stopping = drain_batch(
+                self.queue, item, self.batch_size, self.batch_interval
+            )
+            record_batch(self, len(batch))
+            self._deliver(spool, [each.to_record() for each in batch])
+        self._close_connection()
+        spool.close()
+
+    def _deliver(
+        self, spool: DiskSpool, records: list[logging.LogRecord]
+    ) -> None:
+        payloads = []
+        for record in records:
+            try:
+                payloads.append(self.encode_item(record))
             except Exception:
-                pass
+                self.handleError(record)
+        if not payloads:
+            return
+        if not spool.pending:
+            try:
+                self._post(self._join(payloads))
+            except HTTPStatusError as e:
+                if not e.retryable:
+                    self.lost += len(payloads)
+                    record_failure(self, len(payloads))
+                    return
+                self._backoff()
+            except Exception:
+                self._backoff()
+            else:
+                self._failures = 0
+                return
+        # Keep delivery order: while a backlog exists, new records queue
+        # up behind it.
+        dropped = spool.dropped
+        try:
+            self.spooled += spool.append(payloads)
+        except OSError:
+            self.handleError(records[0])
+        # Records pushed out of a full spool are never delivered.
+        if spool.dropped > dropped:
+            record_failure(self, spool.dropped - dropped)
 
-    def close(self) -> None:
+    def _replay(self, spool: DiskSpool) -> None:
+        try:
+            payloads = spool.read(self.batch_size)
+            if payloads:
+                self._post(self._join(payloads))
+        except HTTPStatusError as e:
+            if e.retryable:
+                self._backoff()
+                return
+            # Move past the refused batch so the records behind it flow.
+            spool.commit(len(payloads))
+            self.lost += len(payloads)
+            record_failure(self, len(payloads))
+            return
+        except Exception:
+            self._backoff()
+            return
+        spool.commit(len(payloads))
+        self.replayed += len(payloads)
+        self._failures = 0
+
+    def _backoff(self) -> None:
+        self.retries += 1
+        self._failures += 1
+        delay = min(
+            self.retry_max, self.retry_initial * 2 ** (self._failures - 1)
+        )
+        # Jitter spreads the retries of many processes that lost the same
+        # collector at the same moment.
+        self._retry_at = time.monotonic() + random.uniform(delay / 2, delay)
+
+    def map_batch_record(self, record: logging.LogRecord) -> dict[str, Any]:
+        """
+        Map a record to the JSON object sent as one element of a batch.
+
+        Args:
+            record (logging.LogRecord): The log record.
+
+        Returns:
+            dict[str, Any]: JSON-serializable record data.
+        """
+        data = dict(self.mapLogRecord(record))
+        data["message"] = record.getMessage()
+        data.pop("args", None)
+        if record.exc_info:
+            data["exc_info"] = logging.Formatter().formatException(
+                record.exc_info
+            )
+        return data
+
+    def encode_item(self, record: logging.LogRecord) -> bytes:
+        """
+        Encode one record as the JSON object sent in a batch.
+
+        Args:
+            record (logging.LogRecord): The log record.
+
+        Returns:
+            bytes: The UTF-8 encoded JSON object.
+        """
+        return json.dumps(self.map_batch_record(record), default=str).encode(
+            "utf-8"
+        )
+
+    def encode_batch(self, records: list[logging.LogRecord]) -> bytes:
+        """
+        Encode a batch of records as a JSON array or NDJSON payload.
+
+        Args:
+            records (list[logging.LogRecord]): Records in the batch.
+
+        Returns:
+            bytes: The encoded request body.
+        """
+        return self._join([self.encode_item(record) for record in records])
+
+    def _join(self, items: list[bytes]) -> bytes:
+        if self.batch_format == "ndjson":
+            return b"\n".join(items) + b"\n"
+        return b"[" + b",".join(items) + b"]"
+
+    def _send_batch(self, records: list[logging.LogRecord]) -> None:
+        try:
+            self._post(self.encode_batch(records))
+        except Exception:
+            self.handleError(records[0])
+
+    def _post(self, body: bytes) -> None:
+        headers = {
+            "Content-Type": _BATCH_CONTENT_TYPES[self.batch_format],
+            "Content-Length": str(len(body)),
+        }
+        if self.credentials:
+            token = ("%s:%s" % self.credentials).encode("utf-8")
+            headers["Authorization"] = "Basic " + base64.b64encode(
+                token
+            ).strip().decode("ascii")
+        # A keep-alive connection may have been dropped by the server while
+        # idle; retry once on a fresh connection before giving up.
+        for attempt in range(2):
+            connection = self._get_connection()
+            try:
+                connection.request("POST", self.url, body, headers)
+                response = connection.getresponse()
+                response.read()
+            except (http.client.HTTPException, OSError):
+                self._close_connection()
+                if attempt:
+                    raise
+                continue
+            if response.will_close:
+                self._close_connection()
+            if response.status >= 400:
+                raise HTTPStatusError(response.status, response.reason)
+            return
+
+    def _get_connection(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            self._connection = self.getConnection(self.host, self.secure)
+            self._connection.timeout = self.timeout
+        return self._connection
+
+    def _close_connection(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Wake the worker with a sentinel and wait for it to drain the queue.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait; None waits forever.
+        """
+        if self._closed:
+            return
         self._closed = True
+        self.queue.put_sentinel()
+        self._thread.join(timeout)
+        shutdown.unregister(self)
+
+    def close(self) -> None:
+        self.stop(shutdown.DEFAULT_TIMEOUT)
         super().close()
 
 
@@ -51,13 +379,40 @@ def add_async_http_handler(
     level: Optional[Union[int, str]] = None,
     fmt: Optional[str] = None,
     filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    queue_size: int = 1000,
+    overflow_policy: str = DROP_NEWEST,
+    block_timeout: Optional[float] = 1.0,
+    batch_size: int = 1,
+    batch_interval: float = 0.1,
+    batch_format: str = "json",
+    rate_limit: Optional[dict[str, Any]] = None,
+    spool_dir: Optional[str] = None,
+    spool_max_bytes: int = 64 * 1024 * 1024,
+    retry_initial: float = 0.5,
+    retry_max: float = 60.0,
 ) -> None:
-    handler: AsyncHTTPHandler = AsyncHTTPHandler(host, url, method=method)
-    handler.setFormatter(logging.Formatter(fmt or _DEFAULT_FORMAT))
+    handler: AsyncHTTPHandler = AsyncHTTPHandler(
+        host,
+        url,
+        method=method,
+        queue_size=queue_size,
+        overflow_policy=overflow_policy,
+        block_timeout=block_timeout,
+        batch_size=batch_size,
+        batch_interval=batch_interval,
+        batch_format=batch_format,
+        spool_dir=spool_dir,
+        spool_max_bytes=spool_max_bytes,
+        retry_initial=retry_initial,
+        retry_max=retry_max,
+    )
+    handler.setFormatter(HimaFormatter(fmt or _DEFAULT_FORMAT))
     if level:
         if isinstance(level, str):
             level = getattr(logging, level.upper(), logging.INFO)
         handler.setLevel(level)
     if filter_func:
         handler.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(handler, **rate_limit)
     logger.addHandler(handler)
@@ -1,16 +1,30 @@
+import email.utils
 import logging
+import smtplib
+from email.message import EmailMessage
 from logging.handlers import SMTPHandler
-from queue import Empty, Queue
 from threading import Thread
 from typing import Any, Callable, Optional, Union
 
+from .. import shutdown
 from ..core import _DEFAULT_FORMAT
+from ..formatters import HimaFormatter
+from ..metrics import record_batch
+from ..records import compact
+from ..sampling import add_rate_limit_filter
+from .queueing import DROP_NEWEST, SENTINEL, OverflowQueue, drain_batch
 
 
 class AsyncSMTPHandler(SMTPHandler):
-    queue: "Queue[logging.LogRecord]"
+    queue: OverflowQueue
     """
     An SMTPHandler that sends logs asynchronously using a background thread.
+
+    With ``batch_size > 1`` (digest mode) the worker collects up to
+    ``batch_size`` records, or waits at most ``batch_interval`` seconds,
+    and sends them as one email over a single SMTP connection that stays
+    open and authenticated between digests, reconnecting when the server
+    has dropped it.
     """
 
     def __init__(
@@ -22,6 +36,11 @@ class AsyncSMTPHandler(SMTPHandler):
         credentials: Optional[tuple[str, str]] = None,
         secure: Optional[tuple[Any, ...]] = None,
         queue_size: int = 1000,
+        overflow_policy: str = DROP_NEWEST,
+        block_timeout: Optional[float] = 1.0,
+        batch_size: int = 1,
+        batch_interval: float = 10.0,
+        timeout: float = 5.0,
     ) -> None:
         super().__init__(
             mailhost,
@@ -30,30 +49,142 @@ class AsyncSMTPHandler(SMTPHandler):
             subject,
             credentials=credentials,
             secure=secure,
+            timeout=timeout,
+        )
+        self.batch_size = max(1, batch_size)
+        self.batch_interval = batch_interval
+        self.emails = 0
+        self._smtp: Optional[smtplib.SMTP] = None
+        self.queue = OverflowQueue(
+            queue_size, policy=overflow_policy, block_timeout=block_timeout
         )
-        self.queue = Queue(maxsize=queue_size)
+        self._closed = False
         self._thread = Thread(target=self._worker, daemon=True)
         self._thread.start()
-        self._closed = False
+        shutdown.register(self)
 
     def emit(self, record: logging.LogRecord) -> None:
-        try:
-            self.queue.put_nowait(record)
-        except Exception:
-            self.handleError(record)
+        self.queue.offer(compact(record))
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the enqueued/dropped counters and depth of the handler queue,
+        plus the number of digest emails sent.
+
+        Returns:
+            dict[str, int]: Queue counters.
+        """
+        return {**self.queue.stats(), "emails": self.emails}
 
     def _worker(self) -> None:
-        while not self._closed:
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is SENTINEL:
+                break
             try:
-                record = self.queue.get(timeout=0.5)
-                super().emit(record)
-            except Empty:
-                continue
+                if self.batch_size > 1:
+                    batch, stopping = drain_batch(
+                        self.queue,
+                        item,
+                        self.batch_size,
+                        self.batch_interval,
+                    )
+                    record_batch(self, len(batch))
+                    self._send_digest([each.to_record() for each in batch])
+                else:
+                    super().emit(item.to_record())
             except Exception:
                 pass
+        self._close_smtp()
 
-    def close(self) -> None:
+    def build_digest(self, records: list[logging.LogRecord]) -> EmailMessage:
+        """
+        Build one email holding a batch of formatted records.
+
+        Args:
+            records (list[logging.LogRecord]): Records in the digest.
+
+        Returns:
+            EmailMessage: The message; the subject notes the record count.
+        """
+        subject = self.getSubject(records[0])
+        if len(records) > 1:
+            subject = f"{subject} ({len(records)} records)"
+        message = EmailMessage()
+        message["From"] = self.fromaddr
+        message["To"] = ",".join(self.toaddrs)
+        message["Subject"] = subject
+        message["Date"] = email.utils.localtime()
+        message.set_content("\n".join(self.format(r) for r in records))
+        return message
+
+    def _send_digest(self, records: list[logging.LogRecord]) -> None:
+        try:
+            message = self.build_digest(records)
+            # The server may have closed the idle connection; retry once on
+            # a fresh one.
+            for attempt in range(2):
+                smtp = self._get_smtp()
+                try:
+                    smtp.send_message(message)
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    self._close_smtp()
+                    if attempt:
+                        raise
+                    continue
+                self.emails += 1
+                return
+        except Exception:
+            self._close_smtp()
+            self.handleError(records[0])
+
+    def _get_smtp(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            smtp = smtplib.SMTP(
+                self.mailhost,
+                self.mailport or smtplib.SMTP_PORT,
+                timeout=self.timeout,
+            )
+            try:
+                # Same handshake as SMTPHandler.emit, done once per
+                # connection instead of once per record.
+                if self.username:
+                    if self.secure is not None:
+                        smtp.ehlo()
+                        smtp.starttls(*self.secure)
+                        smtp.ehlo()
+                    smtp.login(self.username, self.password)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+        return self._smtp
+
+    def _close_smtp(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                self._smtp.close()
+            self._smtp = None
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Wake the worker with a sentinel and wait for it to drain the queue.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait; None waits forever.
+        """
+        if self._closed:
+            return
         self._closed = True
+        self.queue.put_sentinel()
+        self._thread.join(timeout)
+        shutdown.unregister(self)
+
+    def close(self) -> None:
+        self.stop(shutdown.DEFAULT_TIMEOUT)
         super().close()
 
 
@@ -68,6 +199,12 @@ def add_async_smtp_handler(
     level: Optional[Union[int, str]] = None,
     fmt: Optional[str] = None,
     filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    queue_size: int = 1000,
+    overflow_policy: str = DROP_NEWEST,
+    block_timeout: Optional[float] = 1.0,
+    rate_limit: Optional[dict[str, Any]] = None,
+    batch_size: int = 1,
+    batch_interval: float = 10.0,
 ) -> None:
     handler: AsyncSMTPHandler = AsyncSMTPHandler(
         mailhost,
@@ -76,12 +213,19 @@ def add_async_smtp_handler(
         subject,
         credentials=credentials,
         secure=secure,
+        queue_size=queue_size,
+        overflow_policy=overflow_policy,
+        block_timeout=block_timeout,
+        batch_size=batch_size,
+        batch_interval=batch_interval,
     )
-    handler.setFormatter(logging.Formatter(fmt or _DEFAULT_FORMAT))
+    handler.setFormatter(HimaFormatter(fmt or _DEFAULT_FORMAT))
     if level:
         if isinstance(level, str):
             level = getattr(logging, level.upper(), logging.INFO)
         handler.setLevel(level)
     if filter_func:
         handler.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(handler, **rate_limit)
     logger.addHandler(handler)
@@ -0,0 +1,268 @@
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import weakref
+from typing import Any, Optional, Union
+
+from .rotation import (
+    CompressingRotatingFileHandler,
+    CompressingTimedRotatingFileHandler,
+)
+
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = -1
+if _IOV_MAX <= 0:
+    # Linux and macOS both cap an iovec array at 1024 entries.
+    _IOV_MAX = 1024
+
+
+class BufferedWriteMixin:
+    """
+    Mixin for file handlers that coalesces formatted lines into few writes.
+
+    Encoded lines accumulate in memory and are written straight to the file
+    descriptor when ``buffer_size`` bytes are pending, when
+    ``flush_interval`` seconds have passed since the last write (checked on
+    emit and by a shared background flusher), or immediately for records at
+    or above ``flush_level``. With ``use_writev`` the lines are kept as
+    separate chunks and written with one ``os.writev`` call instead of
+    being copied into a single ``bytearray``.
+    """
+
+    stream: Any
+    baseFilename: str
+    encoding: Optional[str]
+    errors: Optional[str]
+    terminator: str
+    lock: Any
+
+    def _init_buffer(
+        self,
+        buffer_size: int = 65536,
+        flush_interval: float = 1.0,
+        flush_level: Union[int, str] = logging.ERROR,
+        use_writev: bool = False,
+    ) -> None:
+        if isinstance(flush_level, str):
+            flush_level = getattr(logging, flush_level.upper(), logging.ERROR)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self.use_writev = use_writev and hasattr(os, "writev")
+        self._buffer = bytearray()
+        self._chunks: list[bytes] = []
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._size = (
+            os.path.getsize(self.baseFilename)
+            if os.path.exists(self.baseFilename)
+            else 0
+        )
+        if flush_interval > 0:
+            _flusher.add(self)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)  # type: ignore[attr-defined]
+            data = (line + self.terminator).encode(
+                self.encoding or "utf-8", self.errors or "strict"
+            )
+            if self._rollover_due(record, len(data)):
+                self._flush_buffer()
+                self.doRollover()  # type: ignore[attr-defined]
+                self._size = 0
+            if self.use_writev:
+                self._chunks.append(data)
+            else:
+                self._buffer += data
+            self._pending += len(data)
+            if (
+                self._pending >= self.buffer_size
+                or record.levelno >= self.flush_level
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self._flush_buffer()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)  # type: ignore[attr-defined]
+
+    def _rollover_due(self, record: logging.LogRecord, length: int) -> bool:
+        max_bytes = getattr(self, "maxBytes", 0)
+        if max_bytes > 0:
+            size = self._size + self._pending
+            return size > 0 and size + length >= max_bytes
+        if hasattr(self, "rolloverAt"):
+            should_rollover = self.shouldRollover  # type: ignore[attr-defined]
+            return bool(should_rollover(record))
+        return False
+
+    def _flush_buffer(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        if self.stream is None:
+            self.stream = self._open()  # type: ignore[attr-defined]
+        self.stream.flush()
+        fd = self.stream.fileno()
+        if self.use_writev:
+            chunks, self._chunks = self._chunks, []
+            _writev_all(fd, chunks)
+        else:
+            data, self._buffer = self._buffer, bytearray()
+            _write_all(fd, data)
+        self._size += self._pending
+        self._pending = 0
+
+    def flush(self) -> None:
+        self.lock.acquire()
+        try:
+            if self._pending:
+                self._flush_buffer()
+            super().flush()  # type: ignore[misc]
+        finally:
+            self.lock.release()
+
+    def _flush_if_due(self, now: float) -> None:
+        if self._pending and now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+
+def _write_all(fd: int, data: Union[bytes, bytearray]) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def _writev_all(fd: int, chunks: list[bytes]) -> None:
+    while chunks:
+        batch = chunks[:_IOV_MAX]
+        written = os.writev(fd, batch)
+        # Drop fully written chunks; keep the unwritten tail of a partial one.
+        for i, chunk in enumerate(batch):
+            if written < len(chunk):
+                chunks = [chunk[written:]] + chunks[i + 1 :]
+                break
+            written -= len(chunk)
+        else:
+            chunks = chunks[len(batch) :]
+
+
+class _IntervalFlusher:
+    """
+    One daemon thread that flushes idle buffered handlers once their
+    ``flush_interval`` has elapsed.
+    """
+
+    def __init__(self, tick: float = 0.1) -> None:
+        self.tick = tick
+        self._handlers: "weakref.WeakSet[BufferedWriteMixin]" = (
+            weakref.WeakSet()
+        )
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, handler: BufferedWriteMixin) -> None:
+        with self._lock:
+            self._handlers.add(handler)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="himalog-flusher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.tick)
+            now = time.monotonic()
+            for handler in list(self._handlers):
+                try:
+                    handler._flush_if_due(now)
+                except Exception:
+                    pass
+
+
+_flusher = _IntervalFlusher()
+
+
+class BufferedFileHandler(BufferedWriteMixin, logging.FileHandler):
+    """
+    FileHandler that coalesces writes; see ``BufferedWriteMixin``.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        mode: str = "a",
+        encoding: Optional[str] = None,
+        delay: bool = False,
+        **buffer: Any,
+    ) -> None:
+        logging.FileHandler.__init__(self, filename, mode, encoding, delay)
+        self._init_buffer(**buffer)
+
+
+class BufferedRotatingFileHandler(
+    BufferedWriteMixin, CompressingRotatingFileHandler
+):
+    """
+    RotatingFileHandler that coalesces writes; see ``BufferedWriteMixin``
+    and ``BackgroundRotationMixin``.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        maxBytes: int = 0,
+        backupCount: int = 0,
+        compress: Optional[str] = None,
+        max_total_bytes: int = 0,
+        max_age: float = 0,
+        **buffer: Any,
+    ) -> None:
+        CompressingRotatingFileHandler.__init__(
+            self,
+            filename,
+            maxBytes=maxBytes,
+            backupCount=backupCount,
+            compress=compress,
+            max_total_bytes=max_total_bytes,
+            max_age=max_age,
+        )
+        self._init_buffer(**buffer)
+
+
+class BufferedTimedRotatingFileHandler(
+    BufferedWriteMixin, CompressingTimedRotatingFileHandler
+):
+    """
+    TimedRotatingFileHandler that coalesces writes; see
+    ``BufferedWriteMixin`` and ``BackgroundRotationMixin``.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        when: str = "h",
+        interval: int = 1,
+        backupCount: int = 0,
+        compress: Optional[str] = None,
+        max_total_bytes: int = 0,
+        max_age: float = 0,
+        **buffer: Any,
+    ) -> None:
+        CompressingTimedRotatingFileHandler.__init__(
+            self,
+            filename,
+            when=when,
+            interval=interval,
+            backupCount=backupCount,
+            compress=compress,
+            max_total_bytes=max_total_bytes,
+            max_age=max_age,
+        )
+        self._init_buffer(**buffer)
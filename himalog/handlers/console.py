@@ -1,7 +1,9 @@
 import logging
-from typing import Callable, Optional, Union
+from typing import Any, Callable, Optional, Union
 
 from ..core import _DEFAULT_FORMAT
+from ..formatters import HimaFormatter
+from ..sampling import add_rate_limit_filter
 
 
 def add_console_handler(
@@ -9,13 +11,16 @@ def add_console_handler(
     level: Optional[Union[int, str]] = None,
     fmt: Optional[str] = None,
     filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    rate_limit: Optional[dict[str, Any]] = None,
 ) -> None:
     ch = logging.StreamHandler()
-    ch.setFormatter(logging.Formatter(fmt or _DEFAULT_FORMAT))
+    ch.setFormatter(HimaFormatter(fmt or _DEFAULT_FORMAT))
     if level:
         if isinstance(level, str):
             level = getattr(logging, level.upper(), logging.INFO)
         ch.setLevel(level)
     if filter_func:
         ch.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(ch, **rate_limit)
     logger.addHandler(ch)
@@ -0,0 +1,172 @@
+"""
+Duplicate-message suppression for any handler.
+
+``DedupHandler`` wraps a target handler and fingerprints records by
+(logger name, level, message template). The first record of a fingerprint
+goes straight to the target; repeats within ``window`` seconds are only
+counted, and when the window closes the last repeat is sent once with its
+``repeat_count``. For ``AsyncSMTPHandler`` this turns a burst of identical
+errors into two emails instead of one per record.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from ..sampling import summary_ticker
+
+_REPEAT_SUFFIX = " (repeated %d times in %.0fs)"
+
+
+class _Entry:
+    __slots__ = ("since", "count", "last")
+
+    def __init__(self, since: float) -> None:
+        self.since = since
+        self.count = 0
+        self.last: Optional[logging.LogRecord] = None
+
+
+def fingerprint(record: logging.LogRecord) -> Hashable:
+    """
+    Get the deduplication key of a record: logger name, level and the
+    unformatted message template.
+
+    Args:
+        record (logging.LogRecord): The log record.
+
+    Returns:
+        Hashable: The fingerprint.
+    """
+    msg = record.msg
+    if not isinstance(msg, str):
+        msg = str(msg)
+    return (record.name, record.levelno, msg)
+
+
+class DedupHandler(logging.Handler):
+    """
+    Handler wrapper that collapses repeated records.
+
+    Fingerprints live in an LRU of at most ``max_entries``; an evicted
+    fingerprint's pending repeats are sent before it is dropped. ``stats()``
+    reports cache hits (suppressed repeats), misses (records passed
+    through), evictions and size.
+
+    Args:
+        target (logging.Handler): Handler that receives the records.
+        window (float): Seconds during which repeats are collapsed.
+        max_entries (int): Maximum number of tracked fingerprints.
+    """
+
+    def __init__(
+        self,
+        target: logging.Handler,
+        window: float = 60.0,
+        max_entries: int = 1024,
+    ) -> None:
+        super().__init__()
+        self.target = target
+        self.window = window
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if window > 0:
+            summary_ticker.add(self)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            key = fingerprint(record)
+            now = time.monotonic()
+            entries = self._entries
+            entry = entries.get(key)
+            if entry is not None and now - entry.since < self.window:
+                entries.move_to_end(key)
+                entry.count += 1
+                entry.last = record
+                self.hits += 1
+                return
+            if entry is not None:
+                # Window over: report its repeats, then start a new one
+                # with this record.
+                self._send_repeats(entry, now)
+                del entries[key]
+            self.misses += 1
+            entries[key] = _Entry(now)
+            if len(entries) > self.max_entries:
+                _, evicted = entries.popitem(last=False)
+                self.evictions += 1
+                self._send_repeats(evicted, now)
+            self.target.handle(record)
+        except Exception:
+            self.handleError(record)
+
+    def _send_repeats(self, entry: _Entry, now: float) -> None:
+        record = entry.last
+        if record is None:
+            return
+        count = entry.count
+        entry.count = 0
+        entry.last = None
+        # The message is resolved so the suffix is never %-interpolated.
+        attrs = dict(record.__dict__)
+        attrs["msg"] = record.getMessage() + _REPEAT_SUFFIX % (
+            count,
+            now - entry.since,
+        )
+        attrs["args"] = None
+        attrs["repeat_count"] = count
+        self.target.handle(logging.makeLogRecord(attrs))
+
+    def flush_summaries(self, now: Optional[float] = None) -> None:
+        """
+        Send the repeats of every fingerprint whose window has closed; with
+        ``now=None``, of every fingerprint.
+
+        Args:
+            now (Optional[float]): ``time.monotonic()`` value.
+        """
+        self.acquire()
+        try:
+            force = now is None
+            now = time.monotonic() if now is None else now
+            expired = [
+                key
+                for key, entry in self._entries.items()
+                if force or now - entry.since >= self.window
+            ]
+            for key in expired:
+                self._send_repeats(self._entries.pop(key), now)
+        finally:
+            self.release()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get fingerprint cache counters.
+
+        Returns:
+            dict[str, int]: hits, misses, evictions and size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+    def setFormatter(self, fmt: Optional[logging.Formatter]) -> None:
+        self.target.setFormatter(fmt)
+
+    def flush(self) -> None:
+        self.flush_summaries()
+        self.target.flush()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self.target.close()
+            super().close()
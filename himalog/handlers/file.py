@@ -1,7 +1,10 @@
 import logging
-from typing import Callable, Optional, Union
+from typing import Any, Callable, Optional, Union
 
 from ..core import _DEFAULT_FORMAT
+from ..formatters import HimaFormatter
+from ..sampling import add_rate_limit_filter
+from .buffered import BufferedFileHandler
 
 
 def add_file_handler(
@@ -10,13 +13,21 @@ def add_file_handler(
     level: Optional[Union[int, str]] = None,
     fmt: Optional[str] = None,
     filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    buffer: Optional[dict[str, Any]] = None,
+    rate_limit: Optional[dict[str, Any]] = None,
 ) -> None:
-    fh = logging.FileHandler(filename)
-    fh.setFormatter(logging.Formatter(fmt or _DEFAULT_FORMAT))
+    fh: logging.FileHandler
+    if buffer is not None:
+        fh = BufferedFileHandler(filename, **buffer)
+    else:
+        fh = logging.FileHandler(filename)
+    fh.setFormatter(HimaFormatter(fmt or _DEFAULT_FORMAT))
     if level:
         if isinstance(level, str):
             level = getattr(logging, level.upper(), logging.INFO)
         fh.setLevel(level)
     if filter_func:
         fh.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(fh, **rate_limit)
     logger.addHandler(fh)
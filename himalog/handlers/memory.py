@@ -0,0 +1,26 @@
+import logging
+from logging.handlers import MemoryHandler
+
+from ..records import compact
+
+
+class CompactMemoryHandler(MemoryHandler):
+    """
+    MemoryHandler that buffers ``CompactRecord`` objects instead of full
+    ``LogRecord`` instances and rebuilds them when flushing to the target.
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.buffer.append(compact(record))  # type: ignore[arg-type]
+        if self.shouldFlush(record):
+            self.flush()
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self.target:
+                for item in self.buffer:
+                    self.target.handle(item.to_record())  # type: ignore[attr-defined]
+                self.buffer.clear()
+        finally:
+            self.release()
@@ -0,0 +1,480 @@
+"""
+Memory-mapped append log with a compact binary record format.
+
+``MmapLogHandler`` never formats a message. It appends the record's
+timestamp, level, interned logger name, interned message template and
+struct-encoded arguments to a preallocated, memory-mapped segment file and
+starts a new segment when the current one is full. ``read_records`` turns
+segments back into ``LogRecord`` objects, so any himalog formatter can
+render them at read time; ``read_json`` does that with ``JsonFormatter``.
+
+Segment layout (little-endian)::
+
+    header  b"HLOG" u16 version u16 reserved
+    frame   u32 length, payload          (length 0 marks the end)
+    payload 0x01 u32 id, utf-8 text      (interned string definition)
+            0x02 f64 created, u16 level, u32 name id, u32 template id,
+                 u8 flags, args value[, exc_text value]
+
+Strings are interned per segment, so each segment decodes on its own.
+Argument values are tagged: ``N`` None, ``T``/``F`` bool, ``i`` int64,
+``I`` big int (decimal text), ``f`` float64, ``s`` str, ``b`` bytes,
+``t`` tuple, ``l`` list, ``m`` mapping. Any other object is stored as its
+``str()``.
+"""
+
+import logging
+import mmap
+import os
+import struct
+from typing import Any, Callable, Iterator, Optional, Union
+
+from ..formatters import JsonFormatter
+from ..sampling import add_rate_limit_filter
+
+_MAGIC = b"HLOG"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHH")
+_LEN = struct.Struct("<I")
+_STRING_HEAD = struct.Struct("<BI")
+_RECORD_HEAD = struct.Struct("<BdHIIB")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+_KIND_STRING = 1
+_KIND_RECORD = 2
+_FLAG_EXC_TEXT = 1
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+_formatter = logging.Formatter()
+
+
+def _encode_none(value: None, out: list[bytes]) -> None:
+    out.append(b"N")
+
+
+def _encode_bool(value: bool, out: list[bytes]) -> None:
+    out.append(b"T" if value else b"F")
+
+
+def _encode_int(value: int, out: list[bytes]) -> None:
+    if _INT64_MIN <= value <= _INT64_MAX:
+        out.append(b"i" + _I64.pack(value))
+    else:
+        _encode_text(b"I", str(value), out)
+
+
+def _encode_float(value: float, out: list[bytes]) -> None:
+    out.append(b"f" + _F64.pack(value))
+
+
+def _encode_str(value: str, out: list[bytes]) -> None:
+    _encode_text(b"s", value, out)
+
+
+def _encode_bytes(value: Union[bytes, bytearray], out: list[bytes]) -> None:
+    out.append(b"b" + _U32.pack(len(value)) + bytes(value))
+
+
+def _encode_tuple(value: tuple[Any, ...], out: list[bytes]) -> None:
+    out.append(b"t" + _U32.pack(len(value)))
+    for item in value:
+        _encode_value(item, out)
+
+
+def _encode_list(value: list[Any], out: list[bytes]) -> None:
+    out.append(b"l" + _U32.pack(len(value)))
+    for item in value:
+        _encode_value(item, out)
+
+
+def _encode_dict(value: dict[Any, Any], out: list[bytes]) -> None:
+    out.append(b"m" + _U32.pack(len(value)))
+    for key, item in value.items():
+        _encode_value(key, out)
+        _encode_value(item, out)
+
+
+def _encode_text(tag: bytes, text: str, out: list[bytes]) -> None:
+    data = text.encode("utf-8", "surrogateescape")
+    out.append(tag + _U32.pack(len(data)) + data)
+
+
+# Dispatch on the exact type; bool must not fall through to int.
+_ENCODERS: dict[type, Callable[[Any, list[bytes]], None]] = {
+    type(None): _encode_none,
+    bool: _encode_bool,
+    int: _encode_int,
+    float: _encode_float,
+    str: _encode_str,
+    bytes: _encode_bytes,
+    bytearray: _encode_bytes,
+    tuple: _encode_tuple,
+    list: _encode_list,
+    dict: _encode_dict,
+}
+
+
+def _encode_value(value: Any, out: list[bytes]) -> None:
+    encoder = _ENCODERS.get(type(value))
+    if encoder is None:
+        # Subclasses (enums, named tuples, ...) use their base encoding.
+        for base, candidate in _ENCODERS.items():
+            if base is not bool and isinstance(value, base):
+                encoder = candidate
+                break
+        else:
+            _encode_text(b"s", str(value), out)
+            return
+    encoder(value, out)
+
+
+def _decode_value(data: bytes, offset: int) -> tuple[Any, int]:
+    tag = data[offset : offset + 1]
+    offset += 1
+    if tag == b"N":
+        return None, offset
+    if tag == b"T":
+        return True, offset
+    if tag == b"F":
+        return False, offset
+    if tag == b"i":
+        return _I64.unpack_from(data, offset)[0], offset + _I64.size
+    if tag == b"f":
+        return _F64.unpack_from(data, offset)[0], offset + _F64.size
+    if tag in (b"s", b"I", b"b"):
+        (length,) = _U32.unpack_from(data, offset)
+        offset += _U32.size
+        raw = data[offset : offset + length]
+        offset += length
+        if tag == b"b":
+            return bytes(raw), offset
+        text = bytes(raw).decode("utf-8", "surrogateescape")
+        return (int(text) if tag == b"I" else text), offset
+    if tag in (b"t", b"l", b"m"):
+        (count,) = _U32.unpack_from(data, offset)
+        offset += _U32.size
+        if tag == b"m":
+            mapping = {}
+            for _ in range(count):
+                key, offset = _decode_value(data, offset)
+                mapping[key], offset = _decode_value(data, offset)
+            return mapping, offset
+        items = []
+        for _ in range(count):
+            item, offset = _decode_value(data, offset)
+            items.append(item)
+        return (tuple(items) if tag == b"t" else items), offset
+    raise ValueError(f"Unknown value tag {tag!r} at offset {offset - 1}")
+
+
+def _frame(payload: bytes) -> bytes:
+    return _LEN.pack(len(payload)) + payload
+
+
+class MmapLogHandler(logging.Handler):
+    """
+    Handler that appends binary records to memory-mapped segment files.
+
+    Segments are named ``<filename>.000001``, ``<filename>.000002`` and so
+    on; each is preallocated to ``segment_size`` bytes. A new handler
+    always starts a fresh segment after the highest existing one.
+    ``flush`` syncs the current segment to disk.
+
+    Args:
+        filename (str): Segment path prefix.
+        segment_size (int): Bytes preallocated per segment.
+    """
+
+    def __init__(self, filename: str, segment_size: int = 64 * 1024 * 1024):
+        super().__init__()
+        self.filename = os.path.abspath(filename)
+        self.segment_size = segment_size
+        self._index = max(segment_indexes(self.filename), default=0)
+        self._file: Optional[Any] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._size = 0
+        self._offset = 0
+        self._strings: dict[str, int] = {}
+
+    def segment_path(self, index: int) -> str:
+        """
+        Get the path of a segment.
+
+        Args:
+            index (int): Segment number.
+
+        Returns:
+            str: Segment file path.
+        """
+        return f"{self.filename}.{index:06d}"
+
+    def _open_segment(self, min_size: int = 0) -> None:
+        self._close_segment()
+        self._index += 1
+        size = max(self.segment_size, _HEADER.size + min_size + _LEN.size)
+        self._file = open(self.segment_path(self._index), "w+b")
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self._mm[: _HEADER.size] = _HEADER.pack(_MAGIC, _VERSION, 0)
+        self._size = size
+        self._offset = _HEADER.size
+        self._strings = {}
+
+    def _close_segment(self) -> None:
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _intern(
+        self, text: str, frames: list[bytes], new: dict[str, int]
+    ) -> int:
+        string_id = self._strings.get(text)
+        if string_id is None:
+            string_id = new.get(text)
+        if string_id is None:
+            string_id = len(self._strings) + len(new)
+            new[text] = string_id
+            frames.append(
+                _frame(
+                    _STRING_HEAD.pack(_KIND_STRING, string_id)
+                    + text.encode("utf-8", "surrogateescape")
+                )
+            )
+        return string_id
+
+    def encode(self, record: logging.LogRecord) -> bytes:
+        """
+        Encode a record, plus definitions for strings new to the current
+        segment, as frames. The new strings only count as defined once
+        ``emit`` has written the frames.
+
+        Args:
+            record (logging.LogRecord): The log record.
+
+        Returns:
+            bytes: Frames to append.
+        """
+        return self._encode(record)[0]
+
+    def _encode(
+        self, record: logging.LogRecord
+    ) -> tuple[bytes, dict[str, int]]:
+        frames: list[bytes] = []
+        new: dict[str, int] = {}
+        name_id = self._intern(record.name, frames, new)
+        template = (
+            record.msg if isinstance(record.msg, str) else str(record.msg)
+        )
+        template_id = self._intern(template, frames, new)
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = record.exc_text = _formatter.formatException(
+                record.exc_info
+            )
+        flags = _FLAG_EXC_TEXT if exc_text else 0
+        parts = [
+            _RECORD_HEAD.pack(
+                _KIND_RECORD,
+                record.created,
+                record.levelno,
+                name_id,
+                template_id,
+                flags,
+            )
+        ]
+        _encode_value(record.args, parts)
+        if exc_text:
+            _encode_value(exc_text, parts)
+        frames.append(_frame(b"".join(parts)))
+        return b"".join(frames), new
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            data, new = (
+                self._encode(record) if self._mm is not None else (b"", {})
+            )
+            if self._mm is None or self._offset + len(data) > self._size:
+                # Strings are interned per segment: re-encode after rolling.
+                self._open_segment()
+                data, new = self._encode(record)
+                if self._offset + len(data) > self._size:
+                    self._open_segment(len(data))
+                    data, new = self._encode(record)
+            assert self._mm is not None
+            end = self._offset + len(data)
+            self._mm[self._offset : end] = data
+            self._offset = end
+            # Only strings whose definitions are now in the segment may be
+            # referenced by later records.
+            self._strings.update(new)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self._mm is not None:
+                self._mm.flush()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            self._close_segment()
+        finally:
+            self.release()
+        super().close()
+
+
+def segment_indexes(filename: str) -> list[int]:
+    """
+    List the segment numbers that exist for a path prefix.
+
+    Args:
+        filename (str): Segment path prefix.
+
+    Returns:
+        list[int]: Sorted segment numbers.
+    """
+    directory, base = os.path.split(os.path.abspath(filename))
+    prefix = base + "."
+    indexes = []
+    for name in os.listdir(directory):
+        suffix = name[len(prefix) :]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            indexes.append(int(suffix))
+    return sorted(indexes)
+
+
+def _lookup(strings: dict[int, str], string_id: int, path: str) -> str:
+    # Every string is defined before the first record that references it;
+    # a missing id means the segment is damaged.
+    text = strings.get(string_id)
+    if text is None:
+        raise ValueError(f"Undefined string id {string_id} in {path}")
+    return text
+
+
+def read_segment(path: str) -> Iterator[logging.LogRecord]:
+    """
+    Decode the records in one segment file.
+
+    Args:
+        path (str): Segment file path.
+
+    Yields:
+        logging.LogRecord: Records in write order.
+
+    Raises:
+        ValueError: If the file is not a himalog segment, or a record
+            references a string the segment never defines.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, _ = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f"Not a himalog segment: {path}")
+    strings: dict[int, str] = {}
+    offset = _HEADER.size
+    while offset + _LEN.size <= len(data):
+        (length,) = _LEN.unpack_from(data, offset)
+        offset += _LEN.size
+        if length == 0 or offset + length > len(data):
+            break
+        payload = memoryview(data)[offset : offset + length]
+        offset += length
+        kind = payload[0]
+        if kind == _KIND_STRING:
+            _, string_id = _STRING_HEAD.unpack_from(payload)
+            strings[string_id] = bytes(payload[_STRING_HEAD.size :]).decode(
+                "utf-8", "surrogateescape"
+            )
+            continue
+        if kind != _KIND_RECORD:
+            break
+        _, created, levelno, name_id, template_id, flags = (
+            _RECORD_HEAD.unpack_from(payload)
+        )
+        raw = bytes(payload)
+        args, pos = _decode_value(raw, _RECORD_HEAD.size)
+        record = logging.LogRecord(
+            _lookup(strings, name_id, path),
+            levelno,
+            "",
+            0,
+            _lookup(strings, template_id, path),
+            None,
+            None,
+        )
+        # LogRecord unwraps a lone mapping argument; keep it as stored.
+        record.args = args
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        if flags & _FLAG_EXC_TEXT:
+            record.exc_text, pos = _decode_value(raw, pos)
+        yield record
+
+
+def read_records(filename: str) -> Iterator[logging.LogRecord]:
+    """
+    Decode the records of every segment for a path prefix, oldest first.
+
+    Args:
+        filename (str): Segment path prefix given to ``MmapLogHandler``.
+
+    Yields:
+        logging.LogRecord: Records in write order.
+    """
+    for index in segment_indexes(filename):
+        yield from read_segment(f"{os.path.abspath(filename)}.{index:06d}")
+
+
+def read_json(
+    filename: str,
+    formatter: Optional[logging.Formatter] = None,
+) -> Iterator[str]:
+    """
+    Render the records of every segment with a formatter.
+
+    Args:
+        filename (str): Segment path prefix.
+        formatter (Optional[logging.Formatter]): Formatter to apply.
+            Defaults to ``JsonFormatter()``.
+
+    Yields:
+        str: One formatted line per record.
+    """
+    formatter = formatter or JsonFormatter()
+    for record in read_records(filename):
+        yield formatter.format(record)
+
+
+def add_mmap_log_handler(
+    logger: logging.Logger,
+    filename: str,
+    segment_size: int = 64 * 1024 * 1024,
+    level: Optional[Union[int, str]] = None,
+    filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    rate_limit: Optional[dict[str, Any]] = None,
+) -> None:
+    handler = MmapLogHandler(filename, segment_size=segment_size)
+    if level:
+        if isinstance(level, str):
+            level = getattr(logging, level.upper(), logging.INFO)
+        handler.setLevel(level)
+    if filter_func:
+        handler.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(handler, **rate_limit)
+    logger.addHandler(handler)
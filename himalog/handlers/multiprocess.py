@@ -0,0 +1,451 @@
+"""
+Multi-process logging through a single aggregator.
+
+Worker processes attach a ``SocketShipperHandler``: records are snapshotted
+on the logging thread, batched by a background thread, pickled once per
+batch and written as length-prefixed frames to a Unix domain socket. One
+``LogAggregator`` (a thread in the master process, or its own process via
+``run_aggregator_process``) owns the real file and network handlers, so
+only one process ever writes or rotates a given file.
+"""
+
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional, Sequence, Union
+
+from .. import shutdown
+from ..metrics import record_batch, record_failure
+from ..sampling import add_rate_limit_filter
+from .queueing import DROP_NEWEST, SENTINEL, OverflowQueue, drain_batch
+
+_HEADER = struct.Struct(">I")
+
+_formatter = logging.Formatter()
+
+
+class SocketShipperHandler(logging.Handler):
+    """
+    Handler that ships records to a ``LogAggregator`` over a Unix socket.
+
+    ``emit`` resolves the message and exception text and enqueues the
+    record; the sender thread batches up to ``batch_size`` records (or
+    ``batch_interval`` seconds), pickles the batch once and sends it in a
+    single write. On a connection error the sender reconnects with
+    exponential backoff (capped at ``max_backoff``) and resends the batch,
+    so records survive an aggregator restart as long as the queue has
+    room. The handler restarts its sender after ``fork``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        queue_size: int = 10000,
+        overflow_policy: str = DROP_NEWEST,
+        block_timeout: Optional[float] = 1.0,
+        batch_size: int = 256,
+        batch_interval: float = 0.05,
+        max_backoff: float = 2.0,
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.batch_size = max(1, batch_size)
+        self.batch_interval = batch_interval
+        self.max_backoff = max_backoff
+        self.sent = 0
+        self.lost = 0
+        self._start_worker()
+
+    def _start_worker(self) -> None:
+        self._pid = os.getpid()
+        self._sock: Optional[socket.socket] = None
+        self._closed = False
+        self.queue = OverflowQueue(
+            self.queue_size,
+            policy=self.overflow_policy,
+            block_timeout=self.block_timeout,
+        )
+        self._thread = threading.Thread(
+            target=self._worker, name="himalog-shipper", daemon=True
+        )
+        self._thread.start()
+        shutdown.register(self)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Copy a record with its message and exception text resolved, so it
+        can be pickled without the caller's arguments or traceback.
+
+        Args:
+            record (logging.LogRecord): The log record.
+
+        Returns:
+            logging.LogRecord: A picklable copy.
+        """
+        data = dict(record.__dict__)
+        data["msg"] = record.getMessage()
+        data["args"] = None
+        if record.exc_info:
+            data["exc_text"] = record.exc_text or _formatter.formatException(
+                record.exc_info
+            )
+        data["exc_info"] = None
+        data.pop("message", None)
+        context = data.get("context")
+        if context is not None:
+            # ContextFilter attaches a read-only mapping proxy.
+            data["context"] = dict(context)
+        return _rebuild(data)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self._pid != os.getpid():
+                self._start_worker()
+            self.queue.offer(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get queue counters plus records sent and records lost on failed
+        sends during shutdown.
+
+        Returns:
+            dict[str, int]: Shipper counters.
+        """
+        return {**self.queue.stats(), "sent": self.sent, "lost": self.lost}
+
+    def _worker(self) -> None:
+        stopping = False
+        while not stopping:
+            record = self.queue.get()
+            if record is SENTINEL:
+                break
+            batch, stopping = drain_batch(
+                self.queue, record, self.batch_size, self.batch_interval
+            )
+            record_batch(self, len(batch))
+            self._send(batch)
+        self._close_socket()
+
+    @staticmethod
+    def encode(records: Sequence[logging.LogRecord]) -> bytes:
+        """
+        Encode a batch as one length-prefixed pickle frame.
+
+        Args:
+            records (Sequence[logging.LogRecord]): Prepared records.
+
+        Returns:
+            bytes: The frame.
+        """
+        items = [record.__dict__ for record in records]
+        try:
+            payload = pickle.dumps(items, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # An extra= value is not picklable; ship its repr instead.
+            items = [
+                {key: _picklable(value) for key, value in item.items()}
+                for item in items
+            ]
+            payload = pickle.dumps(items, pickle.HIGHEST_PROTOCOL)
+        return _HEADER.pack(len(payload)) + payload
+
+    def _send(self, batch: list[logging.LogRecord]) -> None:
+        try:
+            frame = self.encode(batch)
+        except Exception:
+            self.lost += len(batch)
+            record_failure(self, len(batch))
+            return
+        attempt = 0
+        while True:
+            try:
+                if self._sock is None:
+                    self._sock = socket.socket(socket.AF_UNIX)
+                    self._sock.connect(self.path)
+                self._sock.sendall(frame)
+                self.sent += len(batch)
+                return
+            except OSError:
+                self._close_socket()
+                attempt += 1
+                # Keep retrying while running; give up quickly once
+                # stopping so shutdown stays bounded.
+                if self._closed and attempt >= 3:
+                    self.lost += len(batch)
+                    record_failure(self, len(batch))
+                    return
+                time.sleep(min(self.max_backoff, 0.01 * 2**attempt))
+
+    def _close_socket(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Wake the sender with a sentinel and wait for it to ship the queue.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait; None waits forever.
+        """
+        if self._closed or self._pid != os.getpid():
+            return
+        self._closed = True
+        self.queue.put_sentinel()
+        self._thread.join(timeout)
+        shutdown.unregister(self)
+
+    def close(self) -> None:
+        self.stop(shutdown.DEFAULT_TIMEOUT)
+        super().close()
+
+
+def _rebuild(attrs: dict[str, Any]) -> logging.LogRecord:
+    # Like logging.makeLogRecord, without running LogRecord.__init__ only
+    # to overwrite every attribute it sets.
+    record: logging.LogRecord = logging.LogRecord.__new__(logging.LogRecord)
+    record.__dict__.update(attrs)
+    return record
+
+
+def _picklable(value: Any) -> Any:
+    try:
+        pickle.dumps(value)
+    except Exception:
+        return repr(value)
+    return value
+
+
+class _AggregatorRequestHandler(socketserver.StreamRequestHandler):
+    server: "_AggregatorServer"
+
+    def handle(self) -> None:
+        read = self.rfile.read
+        while True:
+            header = read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            (length,) = _HEADER.unpack(header)
+            payload = read(length)
+            if len(payload) < length:
+                return
+            self.server.aggregator.handle_batch(pickle.loads(payload))
+
+
+class _AggregatorServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, aggregator: "LogAggregator") -> None:
+        self.aggregator = aggregator
+        super().__init__(
+            path, _AggregatorRequestHandler, bind_and_activate=False
+        )
+        try:
+            self.server_bind()
+            # Restrict the socket before listen(), so no client can connect
+            # while it still has the default permissions.
+            os.chmod(path, 0o600)
+            self.server_activate()
+        except BaseException:
+            self.server_close()
+            raise
+
+
+class LogAggregator:
+    """
+    Receives record batches from ``SocketShipperHandler`` instances and
+    passes them to the handlers it owns.
+
+    The socket is created with mode 0600, since batches are unpickled; only
+    processes running as the same user can connect.
+
+    Args:
+        path (str): Unix socket path. A stale socket file is replaced.
+        *handlers (logging.Handler): Handlers that receive every record.
+        respect_handler_level (bool): Skip handlers whose level is above
+            the record's level.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *handlers: logging.Handler,
+        respect_handler_level: bool = True,
+    ) -> None:
+        self.path = path
+        self.handlers = handlers
+        self.respect_handler_level = respect_handler_level
+        self.received = 0
+        self._lock = threading.Lock()
+        self._server: Optional[_AggregatorServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def bind(self) -> None:
+        """
+        Create the listening socket.
+        """
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = _AggregatorServer(self.path, self)
+
+    def handle_batch(self, items: list[dict[str, Any]]) -> None:
+        """
+        Rebuild and dispatch a batch of records.
+
+        Args:
+            items (list[dict[str, Any]]): Record attribute dicts.
+        """
+        for item in items:
+            record = _rebuild(item)
+            for handler in self.handlers:
+                if (
+                    not self.respect_handler_level
+                    or record.levelno >= handler.level
+                ):
+                    handler.handle(record)
+        with self._lock:
+            self.received += len(items)
+
+    def serve_forever(self) -> None:
+        """
+        Serve connections in the calling thread until ``stop`` is called.
+        """
+        if self._server is None:
+            self.bind()
+        assert self._server is not None
+        self._server.serve_forever(poll_interval=0.1)
+
+    def start(self) -> None:
+        """
+        Serve connections on a background thread.
+        """
+        self.bind()
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="himalog-aggregator", daemon=True
+        )
+        self._thread.start()
+        shutdown.register(self)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop accepting connections, remove the socket and flush handlers.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for the server
+                thread; None waits forever.
+        """
+        server, self._server = self._server, None
+        if server is None:
+            return
+        if self._thread is not None:
+            server.shutdown()
+            self._thread.join(timeout)
+            self._thread = None
+        server.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        for handler in self.handlers:
+            handler.flush()
+        shutdown.unregister(self)
+
+
+def _run_aggregator(
+    path: str, setup: Callable[[], Sequence[logging.Handler]]
+) -> None:
+    handlers = list(setup())
+    aggregator = LogAggregator(path, *handlers)
+    aggregator.bind()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        aggregator.serve_forever()
+    finally:
+        aggregator.stop()
+        for handler in handlers:
+            handler.close()
+
+
+def run_aggregator_process(
+    path: str,
+    setup: Callable[[], Sequence[logging.Handler]],
+    ready_timeout: float = 10.0,
+) -> multiprocessing.process.BaseProcess:
+    """
+    Start a ``LogAggregator`` in its own process.
+
+    Args:
+        path (str): Unix socket path.
+        setup (Callable[[], Sequence[logging.Handler]]): Builds the sinks
+            inside the aggregator process. Must be picklable (a module-level
+            function) under the 'spawn' start method.
+        ready_timeout (float): Seconds to wait for the socket to appear.
+
+    Returns:
+        multiprocessing.process.BaseProcess: The aggregator process; call
+        ``terminate()`` to stop it and flush its handlers.
+
+    Raises:
+        TimeoutError: If the aggregator does not start listening in time.
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+    process = multiprocessing.Process(
+        target=_run_aggregator,
+        args=(path, setup),
+        name="himalog-aggregator",
+        daemon=True,
+    )
+    process.start()
+    deadline = time.monotonic() + ready_timeout
+    while not os.path.exists(path):
+        if not process.is_alive() or time.monotonic() > deadline:
+            process.terminate()
+            raise TimeoutError(f"Log aggregator did not start on {path}")
+        time.sleep(0.01)
+    return process
+
+
+def add_socket_shipper_handler(
+    logger: logging.Logger,
+    path: str,
+    level: Optional[Union[int, str]] = None,
+    filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    queue_size: int = 10000,
+    overflow_policy: str = DROP_NEWEST,
+    block_timeout: Optional[float] = 1.0,
+    batch_size: int = 256,
+    batch_interval: float = 0.05,
+    rate_limit: Optional[dict[str, Any]] = None,
+) -> None:
+    handler = SocketShipperHandler(
+        path,
+        queue_size=queue_size,
+        overflow_policy=overflow_policy,
+        block_timeout=block_timeout,
+        batch_size=batch_size,
+        batch_interval=batch_interval,
+    )
+    if level:
+        if isinstance(level, str):
+            level = getattr(logging, level.upper(), logging.INFO)
+        handler.setLevel(level)
+    if filter_func:
+        handler.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(handler, **rate_limit)
+    logger.addHandler(handler)
@@ -0,0 +1,617 @@
+"""
+Bounded record queues with configurable overflow policies.
+
+Used by the async handlers and by ``get_logger(use_queue=True)`` so that a
+burst of records degrades by policy instead of printing a traceback for
+every record that does not fit.
+"""
+
+import copy
+import logging
+import threading
+import time
+from decimal import Decimal
+from fractions import Fraction
+from logging.handlers import QueueHandler, QueueListener
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Optional, Sequence
+
+from .. import shutdown
+from ..formatters import HimaFormatter
+from ..records import compact, expand
+
+BLOCK = "block"
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+SAMPLE = "sample"
+
+OVERFLOW_POLICIES = (BLOCK, DROP_NEWEST, DROP_OLDEST, SAMPLE)
+
+# Same sentinel as logging.handlers.QueueListener, so one queue can feed
+# either a QueueListener or a himalog worker.
+SENTINEL = None
+
+
+class OverflowQueue(Queue):  # type: ignore[type-arg]
+    """
+    A bounded queue that applies an overflow policy when full.
+
+    Policies:
+        - ``"block"``: wait up to ``block_timeout`` seconds for a free slot,
+          then drop the new record.
+        - ``"drop_newest"``: drop the new record.
+        - ``"drop_oldest"``: evict the oldest queued record (ring buffer).
+        - ``"sample"``: drop new records below ``sample_level``; records at
+          or above it evict the oldest queued record below ``sample_level``
+          and are never dropped. When the queue holds only such records,
+          they are queued past ``maxsize``.
+
+    The ``enqueued`` and ``dropped`` counters are updated under the queue's
+    own mutex, so reading them costs no extra locking.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        policy: str = DROP_NEWEST,
+        block_timeout: Optional[float] = 1.0,
+        sample_level: int = logging.ERROR,
+    ) -> None:
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unsupported overflow policy: {policy}")
+        super().__init__(maxsize=maxsize)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.sample_level = sample_level
+        self.enqueued = 0
+        self.dropped = 0
+
+    def offer(self, item: Any) -> bool:
+        """
+        Enqueue an item according to the overflow policy.
+
+        Args:
+            item (Any): The item (usually a log record) to enqueue.
+
+        Returns:
+            bool: True if the item was enqueued, False if it was dropped.
+        """
+        if self.policy == BLOCK:
+            try:
+                self.put(item, timeout=self.block_timeout)
+            except Full:
+                with self.mutex:
+                    self.dropped += 1
+                return False
+            with self.mutex:
+                self.enqueued += 1
+            return True
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize():
+                levelno = getattr(item, "levelno", logging.CRITICAL)
+                if self.policy == DROP_NEWEST or (
+                    self.policy == SAMPLE and levelno < self.sample_level
+                ):
+                    self.dropped += 1
+                    return False
+                if self.policy == DROP_OLDEST:
+                    self._get()
+                    self.unfinished_tasks -= 1
+                    self.dropped += 1
+                else:
+                    self._evict_sampled()
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.enqueued += 1
+            self.not_empty.notify()
+        return True
+
+    def _evict_sampled(self) -> None:
+        # Make room for a record at or above sample_level by evicting the
+        # oldest queued record below it. If every queued record is at or
+        # above sample_level, nothing is evicted and the queue grows past
+        # maxsize rather than lose one of them.
+        for index, queued in enumerate(self.queue):
+            levelno = getattr(queued, "levelno", logging.CRITICAL)
+            if levelno < self.sample_level:
+                del self.queue[index]
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+                return
+
+    def put_sentinel(self) -> None:
+        """
+        Enqueue the stop sentinel, ignoring ``maxsize`` and the policy so a
+        worker can always be woken up, even behind a full queue.
+        """
+        with self.not_full:
+            self._put(SENTINEL)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get a snapshot of the queue counters.
+
+        Returns:
+            dict[str, int]: Enqueued, dropped and current depth.
+        """
+        with self.mutex:
+            return {
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "depth": self._qsize(),
+            }
+
+
+# Values that cannot change after the call returns, so a deferred record can
+# reference them as-is.
+_IMMUTABLE_TYPES = frozenset(
+    {str, int, float, bool, complex, bytes, type(None), Decimal, Fraction}
+)
+
+
+class _MutableArg(Exception):
+    pass
+
+
+def _snapshot(value: Any) -> Any:
+    kind = type(value)
+    if kind in _IMMUTABLE_TYPES:
+        return value
+    if kind is tuple or kind is frozenset:
+        items = [_snapshot(item) for item in value]
+        if all(a is b for a, b in zip(items, value)):
+            return value
+        return kind(items)
+    if kind is list:
+        return [_snapshot(item) for item in value]
+    if kind is set:
+        return {_snapshot(item) for item in value}
+    if kind is dict:
+        return {_snapshot(k): _snapshot(v) for k, v in value.items()}
+    raise _MutableArg
+
+
+def snapshot_args(args: Any) -> Any:
+    """
+    Copy record arguments that could change before a deferred format.
+
+    Immutable primitives are kept by reference; lists, dicts and sets of
+    them are copied. Anything else (user objects whose ``__str__`` reads
+    mutable state) cannot be snapshotted safely.
+
+    Args:
+        args (Any): ``LogRecord.args``: a tuple, a mapping or None.
+
+    Returns:
+        Any: ``args`` itself if nothing needed copying, else a copy.
+
+    Raises:
+        ValueError: If an argument cannot be snapshotted.
+    """
+    if args is None:
+        return args
+    try:
+        return _snapshot(args)
+    except _MutableArg:
+        raise ValueError("Argument cannot be snapshotted") from None
+
+
+def drain_batch(
+    queue: "Queue[Any]",
+    first: Any,
+    batch_size: int,
+    batch_interval: float,
+) -> tuple[list[Any], bool]:
+    """
+    Collect up to ``batch_size`` items, waiting at most ``batch_interval``
+    seconds after ``first`` for more to arrive.
+
+    Args:
+        queue (Queue[Any]): Queue to read from.
+        first (Any): Item already taken off the queue.
+        batch_size (int): Maximum number of items in the batch.
+        batch_interval (float): Seconds to wait for the batch to fill.
+
+    Returns:
+        tuple[list[Any], bool]: The batch, and whether the stop sentinel
+        was read while collecting it.
+    """
+    batch = [first]
+    deadline = time.monotonic() + batch_interval
+    while len(batch) < batch_size:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining > 0:
+                item = queue.get(timeout=remaining)
+            else:
+                item = queue.get_nowait()
+        except Empty:
+            break
+        if item is SENTINEL:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+class OverflowQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues through an OverflowQueue's policy instead of
+    reporting every full-queue condition to ``handleError``.
+
+    With ``defer_format`` the calling thread does no formatting at all: the
+    record keeps its template and arguments (and ``exc_info``) and the
+    consumer formats it. Arguments that are not immutable primitives are
+    snapshotted; if one cannot be (an arbitrary object), the message is
+    merged on the calling thread as the standard ``QueueHandler`` does.
+
+    If a ``listener`` is attached, closing the handler drains and stops it.
+    """
+
+    queue: OverflowQueue
+
+    def __init__(
+        self,
+        queue: OverflowQueue,
+        listener: Optional[shutdown.Stoppable] = None,
+        defer_format: bool = False,
+    ) -> None:
+        super().__init__(queue)
+        self.listener = listener
+        self.defer_format = defer_format
+
+    def prepare(self, record: logging.LogRecord) -> Any:
+        if not self.defer_format:
+            return super().prepare(record)
+        args = record.args
+        if isinstance(record.msg, str):
+            if not args:
+                return record
+            try:
+                snapshot = snapshot_args(args)
+            except ValueError:
+                pass
+            else:
+                if snapshot is args:
+                    return record
+                record = copy.copy(record)
+                record.args = snapshot
+                return record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.queue.offer(compact(record))
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get the queue counters and, for a fan-out listener, per-sink metrics.
+
+        Returns:
+            dict[str, Any]: Queue stats, plus a ``sinks`` entry if the
+            listener reports its own stats.
+        """
+        stats: dict[str, Any] = dict(self.queue.stats())
+        listener_stats = getattr(self.listener, "stats", None)
+        if listener_stats is not None:
+            stats["sinks"] = listener_stats()
+        return stats
+
+    def close(self) -> None:
+        if self.listener is not None:
+            self.listener.stop(shutdown.DEFAULT_TIMEOUT)
+        super().close()
+
+
+class DrainingQueueListener(QueueListener):
+    """
+    QueueListener registered with ``himalog.shutdown`` whose ``stop`` waits
+    at most ``timeout`` seconds for the queue to drain.
+    """
+
+    def start(self) -> None:
+        super().start()
+        shutdown.register(self)
+
+    def dequeue(self, block: bool) -> Any:
+        return expand(super().dequeue(block))
+
+    def enqueue_sentinel(self) -> None:
+        if isinstance(self.queue, OverflowQueue):
+            self.queue.put_sentinel()
+        else:
+            super().enqueue_sentinel()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Wake the listener with a sentinel and wait for it to drain.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait; None waits forever.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._thread = None
+        self.enqueue_sentinel()
+        thread.join(timeout)
+        shutdown.unregister(self)
+
+
+# Text the fan-out dispatcher produced for the record a sink thread is
+# handling: (record, {id(_SharedFormatter): text}). Kept per thread rather
+# than on the record, so it never reaches handlers that serialize the
+# record's attributes.
+_dispatched = threading.local()
+
+
+class _SharedFormatter(logging.Formatter):
+    """
+    Wraps a handler's formatter and returns the text the fan-out dispatcher
+    already produced for this record, formatting only on a cache miss.
+    """
+
+    def __init__(self, formatter: logging.Formatter) -> None:
+        super().__init__()
+        self.formatter = formatter
+
+    def format(self, record: logging.LogRecord) -> str:
+        current = getattr(_dispatched, "current", None)
+        if current is not None and current[0] is record:
+            text = current[1].get(id(self))
+            if text is not None:
+                return str(text)
+        return self.formatter.format(record)
+
+
+class _Dispatched:
+    """
+    A queued record paired with its pre-formatted text on a sink queue.
+    ``levelno`` is copied so sink overflow policies can read it.
+    """
+
+    __slots__ = ("item", "formatted", "levelno")
+
+    def __init__(
+        self, item: Any, formatted: dict[int, str], levelno: int
+    ) -> None:
+        self.item = item
+        self.formatted = formatted
+        self.levelno = levelno
+
+
+class _Sink:
+    """
+    One consumer of a fan-out listener: its own queue, thread and metrics.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handlers: list[logging.Handler],
+        queue: OverflowQueue,
+    ) -> None:
+        self.name = name
+        self.handlers = handlers
+        self.queue = queue
+        self.thread: Optional[threading.Thread] = None
+        # Only the sink thread writes these, so reads need no lock.
+        self.handled = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def stats(self) -> dict[str, Any]:
+        handled = self.handled
+        return {
+            **self.queue.stats(),
+            "handled": handled,
+            "latency_avg": self.latency_total / handled if handled else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+
+def _group_by_handler(handler: logging.Handler) -> str:
+    return f"{type(handler).__name__}-{id(handler):x}"
+
+
+def _group_by_class(handler: logging.Handler) -> str:
+    # Group wrappers (memory buffers, dedup) by the sink they wrap.
+    target = getattr(handler, "target", None)
+    return type(target if target is not None else handler).__name__
+
+
+SINK_GROUPS: dict[str, Callable[[logging.Handler], str]] = {
+    "handler": _group_by_handler,
+    "class": _group_by_class,
+}
+
+
+class FanoutQueueListener:
+    """
+    Queue listener that gives every sink its own queue and writer thread.
+
+    A dispatcher thread takes records off the shared queue, formats each
+    record once per distinct formatter among the handlers that accept it,
+    and offers it to every sink's queue. A slow sink (SMTP, HTTP) therefore
+    only fills its own queue, where its ``overflow_policy`` applies, while
+    console and file output keep flowing.
+
+    Sinks are formed per handler (``group="handler"``) or per handler
+    class (``group="class"``). ``stats()`` reports queue depth, drops and
+    end-to-end latency (record creation to emit) for each sink.
+
+    Args:
+        queue (OverflowQueue): Queue fed by an OverflowQueueHandler.
+        *handlers (logging.Handler): Handlers to fan out to.
+        respect_handler_level (bool): Skip handlers whose level is above
+            the record's level.
+        group (str): How to group handlers into sinks.
+        sink_queue_size (int): Max size of each sink queue.
+        overflow_policy (str): Overflow policy of each sink queue.
+    """
+
+    def __init__(
+        self,
+        queue: OverflowQueue,
+        *handlers: logging.Handler,
+        respect_handler_level: bool = True,
+        group: str = "handler",
+        sink_queue_size: int = 1000,
+        overflow_policy: str = DROP_NEWEST,
+    ) -> None:
+        if group not in SINK_GROUPS:
+            raise ValueError(f"Unsupported sink group: {group}")
+        self.queue = queue
+        self.handlers: Sequence[logging.Handler] = handlers
+        self.respect_handler_level = respect_handler_level
+        key = SINK_GROUPS[group]
+        grouped: dict[str, list[logging.Handler]] = {}
+        for handler in handlers:
+            grouped.setdefault(key(handler), []).append(handler)
+        self.sinks = [
+            _Sink(
+                name,
+                members,
+                OverflowQueue(sink_queue_size, policy=overflow_policy),
+            )
+            for name, members in grouped.items()
+        ]
+        self._formatters = self._share_formatters(handlers)
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _share_formatters(
+        handlers: Sequence[logging.Handler],
+    ) -> list[tuple[_SharedFormatter, list[logging.Handler]]]:
+        # Handlers with the same formatter object, or plain Formatters with
+        # the same format strings, share one _SharedFormatter.
+        shared: dict[Any, tuple[_SharedFormatter, list[logging.Handler]]] = {}
+        for handler in handlers:
+            formatter = handler.formatter
+            if formatter is None:
+                continue
+            if isinstance(formatter, _SharedFormatter):
+                formatter = formatter.formatter
+            if type(formatter) in (logging.Formatter, HimaFormatter):
+                key: Any = (
+                    formatter._fmt,
+                    formatter.datefmt,
+                    type(formatter._style),
+                )
+            else:
+                key = id(formatter)
+            if key not in shared:
+                shared[key] = (_SharedFormatter(formatter), [])
+            wrapper, members = shared[key]
+            members.append(handler)
+            handler.setFormatter(wrapper)
+        return list(shared.values())
+
+    def start(self) -> None:
+        """
+        Start the sink threads and the dispatcher thread.
+        """
+        for sink in self.sinks:
+            sink.thread = threading.Thread(
+                target=self._consume,
+                args=(sink,),
+                name=f"himalog-sink-{sink.name}",
+                daemon=True,
+            )
+            sink.thread.start()
+        self._thread = threading.Thread(
+            target=self._dispatch, name="himalog-fanout", daemon=True
+        )
+        self._thread.start()
+        shutdown.register(self)
+
+    def _accepts(self, handler: logging.Handler, levelno: int) -> bool:
+        return not self.respect_handler_level or levelno >= handler.level
+
+    def _dispatch(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is SENTINEL:
+                break
+            record = expand(item)
+            formatted: dict[int, str] = {}
+            try:
+                for wrapper, members in self._formatters:
+                    if any(self._accepts(h, record.levelno) for h in members):
+                        formatted[id(wrapper)] = wrapper.formatter.format(
+                            record
+                        )
+            except Exception:
+                # Sinks fall back to formatting on their own thread.
+                formatted = {}
+            dispatched = _Dispatched(item, formatted, record.levelno)
+            for sink in self.sinks:
+                if any(
+                    self._accepts(h, record.levelno) for h in sink.handlers
+                ):
+                    sink.queue.offer(dispatched)
+        for sink in self.sinks:
+            sink.queue.put_sentinel()
+
+    def _consume(self, sink: _Sink) -> None:
+        while True:
+            item = sink.queue.get()
+            if item is SENTINEL:
+                break
+            record = expand(item.item)
+            _dispatched.current = (record, item.formatted)
+            try:
+                for handler in sink.handlers:
+                    if self._accepts(handler, record.levelno):
+                        handler.handle(record)
+            finally:
+                _dispatched.current = None
+            latency = time.time() - record.created
+            sink.handled += 1
+            sink.latency_total += latency
+            if latency > sink.latency_max:
+                sink.latency_max = latency
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Get per-sink metrics.
+
+        Returns:
+            dict[str, dict[str, Any]]: For each sink, its queue counters
+            (``enqueued``, ``dropped``, ``depth``), the number of records
+            ``handled`` and the average and maximum latency in seconds.
+        """
+        return {sink.name: sink.stats() for sink in self.sinks}
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Drain the shared queue and every sink queue, then stop all threads.
+
+        Args:
+            timeout (Optional[float]): Total seconds to wait; None waits
+                forever.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._thread = None
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining() -> Optional[float]:
+            if deadline is None:
+                return None
+            return max(0.0, deadline - time.monotonic())
+
+        self.queue.put_sentinel()
+        thread.join(remaining())
+        if thread.is_alive():
+            # The dispatcher missed the deadline; wake the sinks directly.
+            for sink in self.sinks:
+                sink.queue.put_sentinel()
+        for sink in self.sinks:
+            if sink.thread is not None:
+                sink.thread.join(remaining())
+        shutdown.unregister(self)
@@ -1,8 +1,12 @@
 import logging
 import logging.handlers
-from typing import Callable, Optional, Union
+from typing import Any, Callable, Optional, Union
 
 from ..core import _DEFAULT_FORMAT
+from ..formatters import HimaFormatter
+from ..sampling import add_rate_limit_filter
+from .buffered import BufferedRotatingFileHandler
+from .rotation import CompressingRotatingFileHandler
 
 
 def add_rotating_file_handler(
@@ -13,15 +17,37 @@ def add_rotating_file_handler(
     level: Optional[Union[int, str]] = None,
     fmt: Optional[str] = None,
     filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    buffer: Optional[dict[str, Any]] = None,
+    compress: Optional[str] = None,
+    max_total_bytes: int = 0,
+    max_age: float = 0,
+    rate_limit: Optional[dict[str, Any]] = None,
 ) -> None:
-    rfh = logging.handlers.RotatingFileHandler(
-        filename, maxBytes=max_bytes, backupCount=backup_count
-    )
-    rfh.setFormatter(logging.Formatter(fmt or _DEFAULT_FORMAT))
+    rotation: dict[str, Any] = {
+        "compress": compress,
+        "max_total_bytes": max_total_bytes,
+        "max_age": max_age,
+    }
+    rfh: logging.handlers.RotatingFileHandler
+    if buffer is not None:
+        rfh = BufferedRotatingFileHandler(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            **rotation,
+            **buffer,
+        )
+    else:
+        rfh = CompressingRotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, **rotation
+        )
+    rfh.setFormatter(HimaFormatter(fmt or _DEFAULT_FORMAT))
     if level:
         if isinstance(level, str):
             level = getattr(logging, level.upper(), logging.INFO)
         rfh.setLevel(level)
     if filter_func:
         rfh.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(rfh, **rate_limit)
     logger.addHandler(rfh)
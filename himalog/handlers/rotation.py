@@ -0,0 +1,329 @@
+"""
+Background compression and retention for rotated log segments.
+
+With ``compress``, ``max_total_bytes`` or ``max_age`` set, a rotating
+handler's rollover only renames the active file to a closed segment and
+hands it to a shared compressor thread, which compresses it (gzip, or zstd
+when the ``zstandard`` package is installed) and then prunes old segments
+by count, total size and age. Without those options rotation behaves
+exactly like the standard library's.
+"""
+
+import datetime
+import gzip
+import logging
+import logging.handlers
+import os
+import re
+import shutil
+import threading
+import time
+from queue import Queue
+from typing import IO, Any, Callable, Optional, cast
+
+from .. import shutdown
+
+_TMP_SUFFIX = ".tmp"
+
+
+def _open_gzip(path: str) -> IO[bytes]:
+    return cast(IO[bytes], gzip.open(path, "wb", compresslevel=6))
+
+
+def _open_zstd(path: str) -> IO[bytes]:
+    import zstandard
+
+    stream: IO[bytes] = zstandard.ZstdCompressor(level=3).stream_writer(
+        open(path, "wb"), closefd=True
+    )
+    return stream
+
+
+_COMPRESSORS: dict[str, tuple[str, Callable[[str], IO[bytes]]]] = {
+    "gzip": (".gz", _open_gzip),
+    "zstd": (".zst", _open_zstd),
+}
+
+
+def check_compression(compress: Optional[str]) -> None:
+    """
+    Validate a compression name.
+
+    Args:
+        compress (Optional[str]): 'gzip', 'zstd' or None.
+
+    Raises:
+        ValueError: If the name is unknown.
+        ImportError: If 'zstd' is requested without ``zstandard``.
+    """
+    if compress is None:
+        return
+    if compress not in _COMPRESSORS:
+        raise ValueError(f"Unsupported compression: {compress}")
+    if compress == "zstd":
+        import zstandard  # noqa: F401
+
+
+class SegmentCompressor:
+    """
+    One daemon thread that compresses closed segments and applies
+    retention, so rotating handlers never do either under their lock.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: "Queue[Optional[tuple[BackgroundRotationMixin, str]]]" = (
+            Queue()
+        )
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, handler: "BackgroundRotationMixin", segment: str) -> None:
+        """
+        Queue a closed segment for compression and retention.
+
+        Args:
+            handler (BackgroundRotationMixin): Handler that owns the segment.
+            segment (str): Path of the closed segment.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="himalog-compressor", daemon=True
+                )
+                self._thread.start()
+                shutdown.register(self)
+            self._jobs.put((handler, segment))
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                handler, segment = job
+                try:
+                    handler.finish_segment(segment)
+                except Exception:
+                    pass
+            finally:
+                self._jobs.task_done()
+
+    def wait(self) -> None:
+        """
+        Block until every queued segment has been processed.
+        """
+        self._jobs.join()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Finish the queued segments and stop the thread.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait; None waits forever.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._jobs.put(None)
+        thread.join(timeout)
+        shutdown.unregister(self)
+
+
+compressor = SegmentCompressor()
+
+
+class BackgroundRotationMixin:
+    """
+    Mixin for rotating file handlers that moves compression and retention
+    off the logging thread.
+
+    When enabled, the rollover renames the active file to a closed segment
+    (the standard library's timed suffix, or a timestamp for size-based
+    rotation so existing backups never need shifting) and submits it to
+    ``compressor``. Retention keeps at most ``backupCount`` segments, at
+    most ``max_total_bytes`` bytes of segments and no segment older than
+    ``max_age`` seconds; 0 disables a limit.
+    """
+
+    baseFilename: str
+    backupCount: int
+    rotator: Optional[Callable[[str, str], None]]
+    # Suffix (after "<base>.") of the segments this handler creates.
+    segment_suffix: "re.Pattern[str]"
+
+    def _init_rotation(
+        self,
+        compress: Optional[str] = None,
+        max_total_bytes: int = 0,
+        max_age: float = 0,
+    ) -> None:
+        check_compression(compress)
+        self.compress = compress
+        self.max_total_bytes = max_total_bytes
+        self.max_age = max_age
+        self.background = bool(compress or max_total_bytes or max_age)
+        self.backup_limit = self.backupCount
+        if self.background:
+            # Retention is ours; keep the standard library from pruning
+            # (it would not recognize compressed names).
+            self.backupCount = 0
+            self.rotator = self._rotate_segment
+
+    def _rotate_segment(self, source: str, dest: str) -> None:
+        if not os.path.exists(source):
+            return
+        os.rename(source, dest)
+        compressor.submit(self, dest)
+
+    def finish_segment(self, segment: str) -> None:
+        """
+        Compress a closed segment, then apply retention. Runs on the
+        compressor thread.
+
+        Args:
+            segment (str): Path of the closed segment.
+        """
+        if self.compress and os.path.exists(segment):
+            ext, open_compressed = _COMPRESSORS[self.compress]
+            target = segment + ext
+            tmp = target + _TMP_SUFFIX
+            with open(segment, "rb") as src, open_compressed(tmp) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            # Keep the segment's mtime so age-based retention still applies.
+            shutil.copystat(segment, tmp)
+            os.replace(tmp, target)
+            os.unlink(segment)
+        self.apply_retention()
+
+    def segments(self) -> list[str]:
+        """
+        List closed segments of this handler, newest first. Both segment
+        suffixes (timestamps and the timed handler's dates) sort by name.
+
+        Returns:
+            list[str]: Segment paths.
+        """
+        directory, base = os.path.split(self.baseFilename)
+        prefix = base + "."
+        return sorted(
+            (
+                entry.path
+                for entry in os.scandir(directory or ".")
+                if entry.name.startswith(prefix)
+                and self._is_segment(entry.name[len(prefix) :])
+            ),
+            reverse=True,
+        )
+
+    def _is_segment(self, suffix: str) -> bool:
+        # Only our own names: other files sharing the prefix (app.log.err,
+        # app.log.pid) must never be pruned.
+        for ext, _ in _COMPRESSORS.values():
+            if suffix.endswith(ext):
+                suffix = suffix[: -len(ext)]
+                break
+        return self.segment_suffix.fullmatch(suffix) is not None
+
+    def apply_retention(self) -> None:
+        """
+        Delete segments beyond the count, total size and age limits.
+        """
+        now = time.time()
+        total = 0
+        for index, path in enumerate(self.segments()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            if (
+                (self.backup_limit and index >= self.backup_limit)
+                or (self.max_total_bytes and total > self.max_total_bytes)
+                or (self.max_age and now - stat.st_mtime > self.max_age)
+            ):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+
+class CompressingRotatingFileHandler(
+    BackgroundRotationMixin, logging.handlers.RotatingFileHandler
+):
+    """
+    RotatingFileHandler with background compression and retention; see
+    ``BackgroundRotationMixin``.
+    """
+
+    # Rollover timestamps, plus the standard library's numbered backups.
+    segment_suffix = re.compile(r"\d{8}-\d{6}-\d{6}(?:-\d+)?|\d+")
+
+    def __init__(
+        self,
+        filename: str,
+        maxBytes: int = 0,
+        backupCount: int = 0,
+        compress: Optional[str] = None,
+        max_total_bytes: int = 0,
+        max_age: float = 0,
+        **kwargs: Any,
+    ) -> None:
+        logging.handlers.RotatingFileHandler.__init__(
+            self,
+            filename,
+            maxBytes=maxBytes,
+            backupCount=backupCount,
+            **kwargs,
+        )
+        self._init_rotation(compress, max_total_bytes, max_age)
+
+    def doRollover(self) -> None:
+        if not self.background:
+            super().doRollover()
+            return
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        dest = self.rotation_filename(f"{self.baseFilename}.{stamp}")
+        suffix = 1
+        while os.path.exists(dest):
+            dest = self.rotation_filename(
+                f"{self.baseFilename}.{stamp}-{suffix}"
+            )
+            suffix += 1
+        self.rotate(self.baseFilename, dest)
+        if not self.delay:
+            self.stream = self._open()
+
+
+class CompressingTimedRotatingFileHandler(
+    BackgroundRotationMixin, logging.handlers.TimedRotatingFileHandler
+):
+    """
+    TimedRotatingFileHandler with background compression and retention;
+    see ``BackgroundRotationMixin``.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        when: str = "h",
+        interval: int = 1,
+        backupCount: int = 0,
+        compress: Optional[str] = None,
+        max_total_bytes: int = 0,
+        max_age: float = 0,
+        **kwargs: Any,
+    ) -> None:
+        logging.handlers.TimedRotatingFileHandler.__init__(
+            self,
+            filename,
+            when=when,
+            interval=interval,
+            backupCount=backupCount,
+            **kwargs,
+        )
+        self.segment_suffix = self.extMatch
+        self._init_rotation(compress, max_total_bytes, max_age)
@@ -3,6 +3,8 @@ from logging.handlers import SMTPHandler
 from typing import Any, Callable, Optional, Union
 
 from ..core import _DEFAULT_FORMAT
+from ..formatters import HimaFormatter
+from ..sampling import add_rate_limit_filter
 
 
 def add_smtp_handler(
@@ -16,6 +18,7 @@ def add_smtp_handler(
     level: Optional[Union[int, str]] = None,
     fmt: Optional[str] = None,
     filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    rate_limit: Optional[dict[str, Any]] = None,
 ) -> None:
     handler = SMTPHandler(
         mailhost,
@@ -25,11 +28,13 @@ def add_smtp_handler(
         credentials=credentials,
         secure=secure,
     )
-    handler.setFormatter(logging.Formatter(fmt or _DEFAULT_FORMAT))
+    handler.setFormatter(HimaFormatter(fmt or _DEFAULT_FORMAT))
     if level:
         if isinstance(level, str):
             level = getattr(logging, level.upper(), logging.INFO)
         handler.setLevel(level)
     if filter_func:
         handler.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(handler, **rate_limit)
     logger.addHandler(handler)
@@ -0,0 +1,256 @@
+"""
+Append-only on-disk spool for records that could not be delivered.
+
+``DiskSpool`` stores opaque byte payloads as length-prefixed frames in
+numbered segment files inside one directory. Payloads are read back in the
+order they were appended; ``commit`` advances a cursor that is persisted
+next to the segments, so a restarted process resumes where delivery
+stopped. Fully delivered segments are deleted. When the spool would exceed
+``max_bytes``, the oldest segments are dropped (and counted) to make room.
+
+A spool is used by a single worker thread; only the counters are read from
+other threads.
+"""
+
+import os
+import struct
+from collections import OrderedDict
+from typing import BinaryIO, Optional, Sequence
+
+_FRAME = struct.Struct(">I")
+_SUFFIX = ".spool"
+_CURSOR = "cursor"
+
+
+class DiskSpool:
+    """
+    Durable FIFO of byte payloads.
+
+    Args:
+        directory (str): Spool directory; created if missing.
+        max_bytes (int): Cap on the bytes kept on disk. Defaults to 64 MiB.
+        segment_bytes (int): Size at which a new segment file is started.
+            Defaults to 4 MiB.
+        fsync (bool): ``fsync`` every append and cursor update. Defaults to
+            False (data survives a process crash, not a power loss).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        segment_bytes: int = 4 * 1024 * 1024,
+        fsync: bool = False,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = max(1, min(segment_bytes, max_bytes))
+        self.fsync = fsync
+        self.pending = 0
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+        # Segment number -> [size in bytes, frames not yet committed].
+        self._segments: "OrderedDict[int, list[int]]" = OrderedDict()
+        self._read_seq, self._read_offset = self._load_cursor()
+        self._read_ends: list[int] = []
+        for seq in sorted(self._scan()):
+            path = self._path(seq)
+            if seq < self._read_seq:
+                os.remove(path)
+                continue
+            start = self._read_offset if seq == self._read_seq else 0
+            ends = self._frame_ends(seq, start)
+            self._segments[seq] = [os.path.getsize(path), len(ends)]
+            self.pending += len(ends)
+        first = next(iter(self._segments), None)
+        if first is not None and first != self._read_seq:
+            self._read_seq, self._read_offset = first, 0
+        # Always append to a fresh segment, so a torn frame left by a crash
+        # stays at the end of a segment that is only read.
+        self._write_seq = max(self._segments, default=self._read_seq - 1) + 1
+        self._writer: Optional[BinaryIO] = None
+
+    @property
+    def size(self) -> int:
+        """
+        Bytes on disk, including frames already delivered from the oldest
+        segment.
+        """
+        return sum(size for size, _ in self._segments.values())
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:010d}{_SUFFIX}")
+
+    def _scan(self) -> list[int]:
+        return [
+            int(name[: -len(_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(_SUFFIX) and name[: -len(_SUFFIX)].isdigit()
+        ]
+
+    def _load_cursor(self) -> tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, _CURSOR)) as f:
+                seq, offset = f.read().split()
+            return int(seq), int(offset)
+        except (OSError, ValueError):
+            return 0, 0
+
+    def _save_cursor(self) -> None:
+        path = os.path.join(self.directory, _CURSOR)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{self._read_seq} {self._read_offset}")
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _frame_ends(
+        self, seq: int, start: int, limit: Optional[int] = None
+    ) -> list[int]:
+        # End offsets of the complete frames from ``start``; a torn frame at
+        # the end of the segment is ignored.
+        ends: list[int] = []
+        with open(self._path(seq), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(start)
+            offset = start
+            while limit is None or len(ends) < limit:
+                header = f.read(_FRAME.size)
+                if len(header) < _FRAME.size:
+                    break
+                (length,) = _FRAME.unpack(header)
+                if offset + _FRAME.size + length > size:
+                    break
+                offset += _FRAME.size + length
+                ends.append(offset)
+                f.seek(offset)
+        return ends
+
+    def append(self, payloads: Sequence[bytes]) -> int:
+        """
+        Append payloads to the spool, dropping the oldest segments if the
+        spool would exceed ``max_bytes``.
+
+        Args:
+            payloads (Sequence[bytes]): Payloads to store, in order.
+
+        Returns:
+            int: Payloads stored; the rest were dropped because they alone
+            exceed ``max_bytes``.
+        """
+        data = b"".join(_FRAME.pack(len(p)) + p for p in payloads)
+        if len(data) > self.max_bytes:
+            self.dropped += len(payloads)
+            return 0
+        self._make_room(len(data))
+        writer = self._writer
+        if writer is None or writer.tell() >= self.segment_bytes:
+            writer = self._rollover()
+        writer.write(data)
+        writer.flush()
+        if self.fsync:
+            os.fsync(writer.fileno())
+        segment = self._segments[self._write_seq]
+        segment[0] += len(data)
+        segment[1] += len(payloads)
+        self.pending += len(payloads)
+        return len(payloads)
+
+    def _rollover(self) -> BinaryIO:
+        if self._writer is not None:
+            self._writer.close()
+            self._write_seq += 1
+        self._writer = open(self._path(self._write_seq), "ab")
+        self._segments[self._write_seq] = [0, 0]
+        return self._writer
+
+    def _make_room(self, size: int) -> None:
+        if self.size + size <= self.max_bytes:
+            return
+        while self._segments and self.size + size > self.max_bytes:
+            seq, (_, count) = next(iter(self._segments.items()))
+            if seq == self._write_seq and self._writer is not None:
+                # Start a new segment, so the current one can be dropped.
+                self._rollover()
+            del self._segments[seq]
+            os.remove(self._path(seq))
+            self.pending -= count
+            self.dropped += count
+            if seq == self._read_seq:
+                self._read_offset = 0
+                self._read_ends = []
+            self._read_seq = next(iter(self._segments), self._write_seq)
+        self._save_cursor()
+
+    def read(self, max_items: int) -> list[bytes]:
+        """
+        Read up to ``max_items`` of the oldest uncommitted payloads without
+        consuming them.
+
+        Args:
+            max_items (int): Maximum number of payloads.
+
+        Returns:
+            list[bytes]: Payloads in append order; empty if the spool is
+            empty.
+        """
+        self._read_ends = []
+        while self._segments:
+            seq = next(iter(self._segments))
+            self._read_seq = seq
+            ends = self._frame_ends(seq, self._read_offset, max_items)
+            if ends:
+                break
+            if seq == self._write_seq:
+                return []
+            # Oldest segment fully delivered.
+            self._drop_read_segment()
+        else:
+            return []
+        payloads = []
+        with open(self._path(self._read_seq), "rb") as f:
+            f.seek(self._read_offset)
+            for _ in ends:
+                (length,) = _FRAME.unpack(f.read(_FRAME.size))
+                payloads.append(f.read(length))
+        self._read_ends = ends
+        return payloads
+
+    def _drop_read_segment(self) -> None:
+        seq = self._read_seq
+        _, count = self._segments.pop(seq)
+        self.pending -= count
+        os.remove(self._path(seq))
+        self._read_seq = next(iter(self._segments), self._write_seq)
+        self._read_offset = 0
+        self._save_cursor()
+
+    def commit(self, count: int) -> None:
+        """
+        Consume the first ``count`` payloads returned by the last ``read``.
+
+        Args:
+            count (int): Payloads delivered.
+        """
+        if count <= 0 or not self._read_ends:
+            return
+        count = min(count, len(self._read_ends))
+        self._read_offset = self._read_ends[count - 1]
+        self._read_ends = self._read_ends[count:]
+        segment = self._segments[self._read_seq]
+        segment[1] -= count
+        self.pending -= count
+        if segment[1] == 0 and self._read_seq != self._write_seq:
+            self._drop_read_segment()
+        else:
+            self._save_cursor()
+
+    def close(self) -> None:
+        """
+        Close the segment being written.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -1,8 +1,12 @@
 import logging
 import logging.handlers
-from typing import Callable, Optional, Union
+from typing import Any, Callable, Optional, Union
 
 from ..core import _DEFAULT_FORMAT
+from ..formatters import HimaFormatter
+from ..sampling import add_rate_limit_filter
+from .buffered import BufferedTimedRotatingFileHandler
+from .rotation import CompressingTimedRotatingFileHandler
 
 
 def add_timed_rotating_file_handler(
@@ -14,15 +18,42 @@ def add_timed_rotating_file_handler(
     level: Optional[Union[int, str]] = None,
     fmt: Optional[str] = None,
     filter_func: Optional[Callable[[logging.LogRecord], bool]] = None,
+    buffer: Optional[dict[str, Any]] = None,
+    compress: Optional[str] = None,
+    max_total_bytes: int = 0,
+    max_age: float = 0,
+    rate_limit: Optional[dict[str, Any]] = None,
 ) -> None:
-    t_handler = logging.handlers.TimedRotatingFileHandler(
-        filename, when=when, interval=interval, backupCount=backup_count
-    )
-    t_handler.setFormatter(logging.Formatter(fmt or _DEFAULT_FORMAT))
+    rotation: dict[str, Any] = {
+        "compress": compress,
+        "max_total_bytes": max_total_bytes,
+        "max_age": max_age,
+    }
+    t_handler: logging.handlers.TimedRotatingFileHandler
+    if buffer is not None:
+        t_handler = BufferedTimedRotatingFileHandler(
+            filename,
+            when=when,
+            interval=interval,
+            backupCount=backup_count,
+            **rotation,
+            **buffer,
+        )
+    else:
+        t_handler = CompressingTimedRotatingFileHandler(
+            filename,
+            when=when,
+            interval=interval,
+            backupCount=backup_count,
+            **rotation,
+        )
+    t_handler.setFormatter(HimaFormatter(fmt or _DEFAULT_FORMAT))
     if level:
         if isinstance(level, str):
             level = getattr(logging, level.upper(), logging.INFO)
         t_handler.setLevel(level)
     if filter_func:
         t_handler.addFilter(filter_func)
+    if rate_limit:
+        add_rate_limit_filter(t_handler, **rate_limit)
     logger.addHandler(t_handler)
@@ -4,24 +4,49 @@ Public API for the himalog logging system.
 """
 
 import logging
-from typing import Any, Callable, Optional, Union
+import threading
+from typing import Any, Callable, Hashable, Mapping, Optional, Union, cast
 
+from . import shutdown
 from .config import load_config
-from .core import _DEFAULT_FORMAT, HimaLog
-from .formatters import ColorFormatter, JsonFormatter
-from .handlers.async_http import add_async_http_handler
-from .handlers.async_smtp import add_async_smtp_handler
-from .handlers.console import add_console_handler
-from .handlers.file import add_file_handler
-from .handlers.http import add_http_handler
-from .handlers.rotating_file import add_rotating_file_handler
-from .handlers.smtp import add_smtp_handler
-from .handlers.timed_rotating_file import add_timed_rotating_file_handler
+from .core import HimaLog
+from .pipeline import (
+    PIPELINE_DEFAULTS,
+    compile_pipeline,
+    config_watcher,
+    detach,
+)
+
+# Logger name -> normalized configuration of the pipeline get_logger built
+# for it. A repeated call with the same configuration returns the logger
+# as is instead of stacking another set of handlers on it.
+_registry: dict[str, Hashable] = {}
+_registry_lock = threading.Lock()
+
+
+def _freeze(value: Any) -> Hashable:
+    # Normalize a configuration into a hashable key: mappings compare
+    # independent of key order, lists like tuples, and anything unhashable
+    # by its repr.
+    if isinstance(value, Mapping):
+        return frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return cast(Hashable, value)
 
 
 def get_logger(
     use_queue: bool = False,
     queue_size: int = 1000,
+    overflow_policy: Optional[str] = None,
+    queue_fanout: Optional[str] = "handler",
+    defer_format: bool = False,
     use_memory_handler: bool = False,
     memory_capacity: int = 100,
     memory_flush_level: Union[int, str] = logging.ERROR,
@@ -31,6 +56,7 @@ def get_logger(
     config_env: Optional[dict[str, str]] = None,
     console: bool = True,
     file: Optional[str] = None,
+    file_buffer: Optional[dict[str, Any]] = None,
     config_path: Optional[str] = None,
     rotating_file: Optional[dict[str, Any]] = None,
     timed_rotating_file: Optional[dict[str, Any]] = None,
@@ -38,7 +64,13 @@ def get_logger(
     formatter: Optional[str] = None,
     smtp_handler: Optional[dict[str, Any]] = None,
     http_handler: Optional[dict[str, Any]] = None,
+    tcp_handler: Optional[dict[str, Any]] = None,
+    multiprocess: Optional[dict[str, Any]] = None,
     filter_func: Optional[Callable[..., bool]] = None,
+    rate_limit: Optional[dict[str, Any]] = None,
+    dedup: Optional[dict[str, Any]] = None,
+    reload_config: bool = False,
+    metrics: bool = False,
 ) -> logging.Logger:
     """
     Get a configured logger with advanced features.
@@ -50,6 +82,9 @@ def get_logger(
         config_env (Optional[dict[str, str]]): Environment variable overrides. Defaults to None.
         console (bool): Add console handler. Defaults to True.
         file (Optional[str]): File path for file handler. Defaults to None.
+        file_buffer (Optional[dict[str, Any]]): Write-coalescing options for
+            the file, rotating and timed rotating handlers (buffer_size,
+            flush_interval, flush_level, use_writev). Defaults to None.
         config_path (Optional[str]): Path to config file (YAML/JSON/TOML). Defaults to None.
         rotating_file (Optional[dict[str, Any]]): Rotating file handler config. Defaults to None.
         timed_rotating_file (Optional[dict[str, Any]]): Timed rotating file handler config. Defaults to None.
@@ -57,203 +92,132 @@ def get_logger(
         formatter (Optional[str]): Formatter type ('color', 'json', or None). Defaults to None.
         smtp_handler (Optional[dict[str, Any]]): SMTP handler config. Defaults to None.
         http_handler (Optional[dict[str, Any]]): HTTP handler config. Defaults to None.
+        tcp_handler (Optional[dict[str, Any]]): AsyncioTCPHandler config
+            ('host', 'port' plus optional secure, batch_size, batch_interval,
+            queue_size, level, fmt, rate_limit). Defaults to None.
+        multiprocess (Optional[dict[str, Any]]): Ship records to a
+            LogAggregator over a Unix socket ('path' plus optional batch_size,
+            batch_interval, queue_size, overflow_policy). Defaults to None.
         filter_func (Optional[Callable[..., bool]]): Custom filter function. Defaults to None.
+        rate_limit (Optional[dict[str, Any]]): Per-call-site rate limiting and
+            sampling for each handler (RateLimitFilter options: rate, burst,
+            sample, exempt_level, max_sites, summary_interval). The SMTP and
+            HTTP handler dicts accept their own 'rate_limit'. Defaults to None.
+        dedup (Optional[dict[str, Any]]): Wrap every handler in a
+            DedupHandler that collapses repeats of the same (logger, level,
+            template) within a window (options: window, max_entries).
+            Defaults to None.
+        reload_config (bool): With config_path, watch the file and swap in
+            a pipeline built from the new contents whenever it changes.
+            Defaults to False.
+        metrics (bool): Instrument every handler of the pipeline (emit
+            latency, batch sizes, failures, queue depth and drops) in
+            ``himalog.metrics.registry``, labelled with the logger name.
+            Defaults to False.
 
     Args:
         use_queue (bool): If True, use QueueHandler/QueueListener for async logging.
         queue_size (int): Max size of the log queue.
+        overflow_policy (Optional[str]): What to do when the log queue or an
+            async handler queue is full: 'block', 'drop_newest' (default),
+            'drop_oldest' or 'sample' (never drops ERROR and above).
+        queue_fanout (Optional[str]): With use_queue, give each handler
+            ('handler', default) or each handler class ('class') its own
+            queue and writer thread so a slow sink cannot stall the others.
+            None uses a single QueueListener thread for all handlers.
+        defer_format (bool): With use_queue, enqueue the raw template and
+            (snapshotted) arguments and do all formatting on the consumer
+            thread instead of the calling thread.
         use_memory_handler (bool): If True, wrap handlers in a MemoryHandler for batching.
         memory_capacity (int): Buffer size for MemoryHandler.
         memory_flush_level (Union[int, str]): Level at which MemoryHandler flushes.
 
+    Calls are idempotent: the built pipeline is registered under the logger
+    name and its normalized configuration, so calling again with the same
+    configuration returns the logger unchanged. A different configuration
+    replaces the logger's previous pipeline and stops its workers.
+
     Returns:
         logging.Logger: Configured logger instance.
     """
-    config = None
-    if config_path:
-        config = load_config(config_path)
+    options: dict[str, Any] = {
+        "level": level,
+        "fmt": fmt,
+        "formatter": formatter,
+        "context": context,
+        "console": console,
+        "file": file,
+        "file_buffer": file_buffer,
+        "rotating_file": rotating_file,
+        "timed_rotating_file": timed_rotating_file,
+        "smtp_handler": smtp_handler,
+        "http_handler": http_handler,
+        "tcp_handler": tcp_handler,
+        "multiprocess": multiprocess,
+        "filter_func": filter_func,
+        "rate_limit": rate_limit,
+        "dedup": dedup,
+        "use_memory_handler": use_memory_handler,
+        "memory_capacity": memory_capacity,
+        "memory_flush_level": memory_flush_level,
+        "use_queue": use_queue,
+        "queue_size": queue_size,
+        "overflow_policy": overflow_policy,
+        "queue_fanout": queue_fanout,
+        "defer_format": defer_format,
+        "metrics": metrics,
+    }
+    # Only the caller's arguments form the base that a reloaded file is
+    # merged over; keys removed from the file must fall back to them.
+    arguments = dict(options)
+    config = load_config(config_path) if config_path else None
     if config:
         name = config.get("name", name)
-        level = config.get("level", level)
-        fmt = config.get("fmt", fmt)
         config_env = config.get("config_env", config_env)
-        console = config.get("console", console)
-        file = config.get("file", file)
-        rotating_file = config.get("rotating_file", rotating_file)
-        timed_rotating_file = config.get(
-            "timed_rotating_file", timed_rotating_file
+        options.update(
+            (key, value)
+            for key, value in config.items()
+            if key in PIPELINE_DEFAULTS
         )
-        formatter = config.get("formatter", formatter)
-
-    # Formatter selection
-    formatter_obj: Optional[Union[ColorFormatter, JsonFormatter]] = None
-    if formatter == "json":
-        formatter_obj = JsonFormatter()
-    elif formatter == "color":
-        formatter_obj = ColorFormatter(fmt or _DEFAULT_FORMAT)
-
-    # Contextual logging support
-    class ContextFilter(logging.Filter):
-        """
-        Logging filter to inject contextual fields into log records.
-
-        Args:
-            context (Optional[dict[str, Any]]): Contextual fields to add.
-        """
-
-        def __init__(self, context: Optional[dict[str, Any]] = None) -> None:
-            super().__init__()
-            self.context: dict[str, Any] = context or {}
-
-        def filter(self, record: logging.LogRecord) -> bool:
-            """
-            Add context fields to the log record.
-
-            Args:
-                record (logging.LogRecord): The log record.
-
-            Returns:
-                bool: Always True.
-            """
-            for k, v in self.context.items():
-                setattr(record, k, v)
-            return True
-
-    context_filter: Optional[ContextFilter] = None
-    if context:
-        context_filter = ContextFilter(context)
-
-    def safe_add_handler(
-        add_func: Callable[..., None], *args: Any, **kwargs: Any
-    ) -> None:
-        """
-        Safely add a logging handler, catching and logging errors.
-
-        Args:
-            add_func (Callable[..., None]): Handler addition function.
-            *args: Positional arguments for handler.
-            **kwargs: Keyword arguments for handler.
-        """
-        try:
-            add_func(*args, **kwargs)
-        except Exception as e:
-            logging.getLogger("himalog").error(f"Failed to add handler: {e}")
-
-    import queue
-    from logging.handlers import MemoryHandler, QueueHandler, QueueListener
-
-    hima_log = HimaLog(name, level, fmt, config_env)
-    logger = hima_log.get_logger()
-    if context_filter:
-        logger.addFilter(context_filter)
-
-    # Collect handlers to attach (for queue/memory support)
-    from typing import List
 
-    handlers: List[logging.Handler] = []
-    if console:
-        ch_logger = logging.getLogger(f"{name or 'root'}-console")
-        safe_add_handler(
-            add_console_handler,
-            ch_logger,
-            level=level,
-            fmt=fmt,
-            filter_func=filter_func,
-        )
-        handlers.extend(ch_logger.handlers)
-        ch_logger.handlers.clear()
-    if file:
-        fh_logger = logging.getLogger(f"{name or 'root'}-file")
-        safe_add_handler(
-            add_file_handler,
-            fh_logger,
-            file,
-            level=level,
-            fmt=fmt,
-            filter_func=filter_func,
-        )
-        handlers.extend(fh_logger.handlers)
-        fh_logger.handlers.clear()
-    if rotating_file:
-        rfh_logger = logging.getLogger(f"{name or 'root'}-rotfile")
-        safe_add_handler(
-            add_rotating_file_handler,
-            rfh_logger,
-            **rotating_file,
-            level=level,
-            fmt=fmt,
-            filter_func=filter_func,
-        )
-        handlers.extend(rfh_logger.handlers)
-        rfh_logger.handlers.clear()
-    if timed_rotating_file:
-        trfh_logger = logging.getLogger(f"{name or 'root'}-timedrotfile")
-        safe_add_handler(
-            add_timed_rotating_file_handler,
-            trfh_logger,
-            **timed_rotating_file,
-            level=level,
-            fmt=fmt,
-            filter_func=filter_func,
-        )
-        handlers.extend(trfh_logger.handlers)
-        trfh_logger.handlers.clear()
-    if smtp_handler:
-        smtp_logger = logging.getLogger(f"{name or 'root'}-smtp")
-        if smtp_handler.get("async"):
-            safe_add_handler(
-                add_async_smtp_handler,
-                smtp_logger,
-                **{k: v for k, v in smtp_handler.items() if k != "async"},
-            )
+    for merged in (options, arguments):
+        if merged["metrics"] is True:
+            merged["metrics"] = name or "root"
+    key = _freeze((config_env, reload_config and config_path, options))
+    registry_name = logging.getLogger(name).name
+    with _registry_lock:
+        cached = _registry.get(registry_name)
+        if cached == key:
+            return logging.getLogger(name)
+        if cached is None:
+            logger = HimaLog(
+                name, options["level"], options["fmt"], config_env
+            ).get_logger()
         else:
-            safe_add_handler(add_smtp_handler, smtp_logger, **smtp_handler)
-        handlers.extend(smtp_logger.handlers)
-        smtp_logger.handlers.clear()
-    if http_handler:
-        http_logger = logging.getLogger(f"{name or 'root'}-http")
-        if http_handler.get("async"):
-            safe_add_handler(
-                add_async_http_handler,
-                http_logger,
-                **{k: v for k, v in http_handler.items() if k != "async"},
-            )
-        else:
-            safe_add_handler(add_http_handler, http_logger, **http_handler)
-        handlers.extend(http_logger.handlers)
-        http_logger.handlers.clear()
+            logger = logging.getLogger(name)
+        previous = compile_pipeline(options).attach(logger)
+        _registry[registry_name] = key
+        config_watcher.unwatch(logger)
+        if config_path and reload_config:
+            config_watcher.watch(config_path, logger, arguments)
+    if previous is not None:
+        previous.stop(shutdown.DEFAULT_TIMEOUT)
+    return logger
 
-    # Optionally wrap handlers in MemoryHandler for batching
-    if use_memory_handler:
-        wrapped: List[logging.Handler] = []
-        flush_level = memory_flush_level
-        if isinstance(flush_level, str):
-            flush_level = getattr(logging, flush_level.upper(), logging.ERROR)
-        for h in handlers:
-            memh = MemoryHandler(
-                memory_capacity, flushLevel=flush_level, target=h
-            )
-            wrapped.append(memh)
-        handlers = wrapped
 
-    # Optionally use QueueHandler/QueueListener for async logging
-    if use_queue:
-        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(
-            maxsize=queue_size
-        )
-        qh = QueueHandler(log_queue)
-        logger.addHandler(qh)
-        listener = QueueListener(
-            log_queue, *handlers, respect_handler_level=True
-        )
-        listener.start()
-    else:
-        for h in handlers:
-            logger.addHandler(h)
+def close_logger(name: Optional[str] = None) -> None:
+    """
+    Detach the pipeline ``get_logger`` built for a logger, stop its workers
+    and close its handlers. The next ``get_logger`` call for the name builds
+    a new pipeline.
 
-    # Apply formatter to all handlers if specified
-    if formatter_obj:
-        for handler in logger.handlers:
-            handler.setFormatter(formatter_obj)
-    assert isinstance(logger, logging.Logger)
-    return logger
+    Args:
+        name (Optional[str]): Logger name. Defaults to None (root logger).
+    """
+    logger = logging.getLogger(name)
+    with _registry_lock:
+        _registry.pop(logger.name, None)
+        config_watcher.unwatch(logger)
+        pipeline = detach(logger)
+    if pipeline is not None:
+        pipeline.stop(shutdown.DEFAULT_TIMEOUT)
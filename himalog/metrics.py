@@ -0,0 +1,538 @@
+"""
+Self-instrumentation for himalog's own handlers and queues.
+
+``instrument`` attaches a ``HandlerMetrics`` to a handler: a histogram of the
+time its ``handle`` takes on the thread that calls it, a histogram of the
+batch sizes its background worker sends, and a count of records that ended
+in ``handleError``. The handler's existing ``stats()`` counters (enqueued,
+dropped, depth, ...) are read when a snapshot is taken, so the logging path
+pays only for the two clock reads and one histogram update.
+
+``registry.snapshot()`` returns everything as plain data, and
+``registry.render_prometheus()`` in the Prometheus text format.
+``PrometheusExporter`` serves that text on a local port or writes it to a
+file for the node_exporter textfile collector. ``get_logger(metrics=True)``
+instruments every handler of the pipeline it builds.
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Any, Optional, Sequence
+
+from . import shutdown
+
+# Upper bounds of the emit latency buckets, in seconds.
+LATENCY_BUCKETS: tuple[float, ...] = (
+    1e-6,
+    5e-6,
+    1e-5,
+    5e-5,
+    1e-4,
+    5e-4,
+    1e-3,
+    5e-3,
+    1e-2,
+    5e-2,
+    0.1,
+    0.5,
+    1.0,
+)
+
+# Upper bounds of the batch size buckets, in records.
+BATCH_BUCKETS: tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# stats() keys that only ever grow; every other numeric key is a gauge.
+COUNTER_STATS = frozenset(
+    {
+        "enqueued",
+        "dropped",
+        "handled",
+        "emails",
+        "hits",
+        "misses",
+        "evictions",
+        "spooled",
+        "replayed",
+        "retries",
+        "spool_dropped",
+        "sent",
+        "lost",
+    }
+)
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket bounds.
+
+    Args:
+        buckets (Sequence[float]): Increasing upper bounds; an implicit
+            ``+Inf`` bucket catches the rest.
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Record one value.
+
+        Args:
+            value (float): The observed value.
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Get the histogram as plain data.
+
+        Returns:
+            dict[str, Any]: count, sum and cumulative bucket counts keyed by
+            upper bound (``"+Inf"`` for the last).
+        """
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative: dict[str, int] = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative[_format_bound(bound)] = running
+        cumulative["+Inf"] = count
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound)) if bound != int(bound) else f"{bound:g}"
+
+
+class HandlerMetrics:
+    """
+    Metrics of one instrumented handler.
+
+    Args:
+        handler (logging.Handler): The handler; held by weak reference.
+        logger (str): ``logger`` label.
+        name (str): ``handler`` label.
+    """
+
+    def __init__(
+        self, handler: logging.Handler, logger: str, name: str
+    ) -> None:
+        self.logger = logger
+        self.name = name
+        self.kind = type(handler).__name__
+        self.emit_seconds = Histogram(LATENCY_BUCKETS)
+        self.batch_size = Histogram(BATCH_BUCKETS)
+        self.failed = 0
+        self._handler = weakref.ref(handler)
+        self._last_enqueued: Optional[tuple[float, int]] = None
+
+    @property
+    def handler(self) -> Optional[logging.Handler]:
+        return self._handler()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Read the handler's own ``stats()`` counters, flattened: a nested
+        mapping (per-sink stats of a fan-out queue) becomes
+        ``<sink>.<key>`` entries.
+
+        Returns:
+            dict[str, Any]: Numeric stats.
+        """
+        handler = self._handler()
+        read = getattr(handler, "stats", None)
+        if read is None:
+            return {}
+        try:
+            return _flatten(read())
+        except Exception:
+            return {}
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Get all metrics of the handler as plain data.
+
+        ``enqueue_rate`` is records per second since the previous snapshot
+        (0.0 on the first one), for handlers that count enqueued records.
+
+        Returns:
+            dict[str, Any]: Labels, stats, failures and histograms.
+        """
+        stats = self.stats()
+        data: dict[str, Any] = {
+            "logger": self.logger,
+            "handler": self.name,
+            "class": self.kind,
+            **stats,
+            "failed": self.failed,
+            "emit_seconds": self.emit_seconds.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
+        enqueued = stats.get("enqueued")
+        if isinstance(enqueued, int):
+            now = time.monotonic()
+            last, self._last_enqueued = self._last_enqueued, (now, enqueued)
+            rate = 0.0
+            if last is not None and now > last[0]:
+                rate = (enqueued - last[1]) / (now - last[0])
+            data["enqueue_rate"] = rate
+        return data
+
+
+def _flatten(stats: Any, prefix: str = "") -> dict[str, Any]:
+    flat: dict[str, Any] = {}
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            # A fan-out queue's per-sink stats are keyed by sink name under
+            # "sinks"; the container name is dropped.
+            nested = prefix if key == "sinks" else f"{prefix}{key}."
+            flat.update(_flatten(value, nested))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+class MetricsRegistry:
+    """
+    The instrumented handlers of a process.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[int, HandlerMetrics] = {}
+        self._lock = threading.Lock()
+
+    def add(self, metrics: HandlerMetrics) -> None:
+        """
+        Register a handler's metrics.
+
+        Args:
+            metrics (HandlerMetrics): Metrics to report.
+        """
+        handler = metrics.handler
+        if handler is None:
+            return
+        with self._lock:
+            self._metrics[id(handler)] = metrics
+
+    def remove(self, handler: logging.Handler) -> None:
+        """
+        Stop reporting a handler.
+
+        Args:
+            handler (logging.Handler): An instrumented handler.
+        """
+        with self._lock:
+            self._metrics.pop(id(handler), None)
+
+    def collect(self) -> list[HandlerMetrics]:
+        """
+        Get the metrics of every live instrumented handler.
+
+        Returns:
+            list[HandlerMetrics]: Registered metrics, in registration order.
+        """
+        with self._lock:
+            dead = [k for k, m in self._metrics.items() if m.handler is None]
+            for key in dead:
+                del self._metrics[key]
+            return list(self._metrics.values())
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """
+        Get a snapshot of every instrumented handler.
+
+        Returns:
+            list[dict[str, Any]]: One ``HandlerMetrics.snapshot()`` per
+            handler.
+        """
+        return [metrics.snapshot() for metrics in self.collect()]
+
+    def render_prometheus(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metric families ``himalog_<stat>`` (``_total`` for
+            counters), ``himalog_failed_total``, ``himalog_emit_seconds`` and
+            ``himalog_batch_size``, labelled by logger and handler.
+        """
+        families: dict[str, tuple[str, list[str]]] = {}
+
+        def add(name: str, kind: str, line: str) -> None:
+            families.setdefault(name, (kind, []))[1].append(line)
+
+        for metrics in self.collect():
+            labels = (
+                f'logger="{_escape(metrics.logger)}",'
+                f'handler="{_escape(metrics.name)}"'
+            )
+            for key, value in metrics.stats().items():
+                sink, _, stat = key.rpartition(".")
+                stat_labels = labels
+                if sink:
+                    stat_labels += f',sink="{_escape(sink)}"'
+                if stat in COUNTER_STATS:
+                    name = f"himalog_{_metric_name(stat)}_total"
+                    kind = "counter"
+                else:
+                    name = f"himalog_{_metric_name(stat)}"
+                    kind = "gauge"
+                add(name, kind, f"{name}{{{stat_labels}}} {value}")
+            add(
+                "himalog_failed_total",
+                "counter",
+                f"himalog_failed_total{{{labels}}} {metrics.failed}",
+            )
+            for name, histogram in (
+                ("himalog_emit_seconds", metrics.emit_seconds),
+                ("himalog_batch_size", metrics.batch_size),
+            ):
+                data = histogram.snapshot()
+                for bound, count in data["buckets"].items():
+                    add(
+                        name,
+                        "histogram",
+                        f'{name}_bucket{{{labels},le="{bound}"}} {count}',
+                    )
+                add(name, "histogram", f"{name}_sum{{{labels}}} {data['sum']}")
+                add(
+                    name,
+                    "histogram",
+                    f"{name}_count{{{labels}}} {data['count']}",
+                )
+        lines = []
+        for name, (kind, samples) in families.items():
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(stat: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in stat)
+
+
+registry = MetricsRegistry()
+
+
+def instrument(
+    handler: logging.Handler,
+    logger: str,
+    name: str,
+    timed: bool = True,
+) -> HandlerMetrics:
+    """
+    Instrument a handler and register it with ``registry``.
+
+    With ``timed``, the handler's ``handle`` is wrapped to record its
+    duration; ``handleError`` is always wrapped to count failures. Both
+    wrappers are set on the instance, so the handler keeps its class and
+    its place in the pipeline.
+
+    Args:
+        handler (logging.Handler): Handler to instrument.
+        logger (str): ``logger`` label.
+        name (str): ``handler`` label.
+        timed (bool): Record emit latency. Defaults to True.
+
+    Returns:
+        HandlerMetrics: The handler's metrics.
+    """
+    metrics = HandlerMetrics(handler, logger, name)
+    handler.__dict__["_himalog_metrics"] = metrics
+    if timed:
+        handle = handler.handle
+        clock = time.perf_counter
+        observe = metrics.emit_seconds.observe
+
+        def timed_handle(record: logging.LogRecord) -> Any:
+            start = clock()
+            try:
+                return handle(record)
+            finally:
+                observe(clock() - start)
+
+        setattr(handler, "handle", timed_handle)
+    handle_error = handler.handleError
+
+    def counting_handle_error(record: logging.LogRecord) -> None:
+        metrics.failed += 1
+        handle_error(record)
+
+    setattr(handler, "handleError", counting_handle_error)
+    registry.add(metrics)
+    return metrics
+
+
+def record_batch(handler: logging.Handler, size: int) -> None:
+    """
+    Record the size of a batch a handler's worker is about to send. Does
+    nothing for handlers that are not instrumented.
+
+    Args:
+        handler (logging.Handler): The sending handler.
+        size (int): Records in the batch.
+    """
+    metrics = handler.__dict__.get("_himalog_metrics")
+    if metrics is not None:
+        metrics.batch_size.observe(size)
+
+
+def record_failure(handler: logging.Handler, count: int = 1) -> None:
+    """
+    Count records a handler failed to deliver without calling
+    ``handleError``. Does nothing for handlers that are not instrumented.
+
+    Args:
+        handler (logging.Handler): The handler.
+        count (int): Records lost. Defaults to 1.
+    """
+    metrics = handler.__dict__.get("_himalog_metrics")
+    if metrics is not None:
+        metrics.failed += count
+
+
+class PrometheusExporter:
+    """
+    Expose ``registry.render_prometheus()`` over HTTP on a local port, or
+    write it to a file every ``interval`` seconds (replaced atomically, for
+    the node_exporter textfile collector).
+
+    Args:
+        port (Optional[int]): Serve ``GET /metrics`` on this port (0 picks
+            a free one; see ``port`` after ``start``).
+        path (Optional[str]): Write the metrics to this file instead.
+        host (str): Address to bind. Defaults to 127.0.0.1.
+        interval (float): Seconds between file writes. Defaults to 15.
+        metrics (Optional[MetricsRegistry]): Registry to export. Defaults to
+            the module ``registry``.
+    """
+
+    def __init__(
+        self,
+        port: Optional[int] = None,
+        path: Optional[str] = None,
+        host: str = "127.0.0.1",
+        interval: float = 15.0,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        if (port is None) == (path is None):
+            raise ValueError("Pass exactly one of port and path")
+        self.port = port
+        self.path = path
+        self.host = host
+        self.interval = interval
+        self.metrics = metrics or registry
+        self._server: Any = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> "PrometheusExporter":
+        """
+        Start serving or writing on a daemon thread.
+
+        Returns:
+            PrometheusExporter: self.
+        """
+        if self._thread is not None:
+            return self
+        self._stopped.clear()
+        if self.port is not None:
+            self._server = _make_server(self.host, self.port, self.metrics)
+            self.port = self._server.server_address[1]
+            target = self._server.serve_forever
+        else:
+            target = self._write_loop
+        self._thread = threading.Thread(
+            target=target, name="himalog-metrics", daemon=True
+        )
+        self._thread.start()
+        shutdown.register(self)
+        return self
+
+    def write(self) -> None:
+        """
+        Write the current metrics to ``path``.
+        """
+        assert self.path is not None
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.metrics.render_prometheus())
+        os.replace(tmp, self.path)
+
+    def _write_loop(self) -> None:
+        while True:
+            try:
+                self.write()
+            except OSError as e:
+                logging.getLogger("himalog").error(
+                    f"Failed to write metrics to {self.path}: {e}"
+                )
+            if self._stopped.wait(self.interval):
+                return
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop serving, or write the file one last time and stop.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for the thread.
+        """
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        thread.join(timeout)
+        if self.path is not None:
+            try:
+                self.write()
+            except OSError:
+                pass
+        shutdown.unregister(self)
+
+
+def _make_server(host: str, port: int, metrics: MetricsRegistry) -> Any:
+    # http.server is only imported when an exporter is started.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header(
+                "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+            )
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,584 @@
+"""
+Handler pipelines compiled from a declarative configuration.
+
+A configuration (the keyword arguments of ``get_logger``, or a YAML, JSON or
+TOML file with the same keys) describes a small graph: the sinks (console,
+files, SMTP, HTTP, TCP, the multi-process shipper), the formatter and filters
+applied to each of them (``formatter``, ``filter_func``, ``rate_limit``),
+the wrappers around them (``dedup``, ``use_memory_handler``) and the
+delivery stage (``use_queue``). ``compile_pipeline`` builds that graph once
+into plain handler objects, so logging calls never consult the
+configuration. ``ConfigWatcher`` recompiles a file-based configuration
+when the file changes and swaps the new pipeline in atomically.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, List, Mapping, Optional, Union
+
+from . import shutdown
+from .config import load_config
+from .context import ContextFilter
+from .core import _DEFAULT_FORMAT
+from .formatters import ColorFormatter, JsonFormatter
+
+# Handler modules are imported by the builders that use them, so a
+# configuration only pays for the sinks it names (logging.handlers,
+# smtplib and http.client stay off the import path of himalog.logger).
+
+# Every pipeline option with its default; see get_logger for their meaning.
+PIPELINE_DEFAULTS: dict[str, Any] = {
+    "level": None,
+    "fmt": None,
+    "formatter": None,
+    "context": None,
+    "console": True,
+    "file": None,
+    "file_buffer": None,
+    "rotating_file": None,
+    "timed_rotating_file": None,
+    "smtp_handler": None,
+    "http_handler": None,
+    "tcp_handler": None,
+    "multiprocess": None,
+    "filter_func": None,
+    "rate_limit": None,
+    "dedup": None,
+    "use_memory_handler": False,
+    "memory_capacity": 100,
+    "memory_flush_level": logging.ERROR,
+    "use_queue": False,
+    "queue_size": 1000,
+    "overflow_policy": None,
+    "queue_fanout": "handler",
+    "defer_format": False,
+    "metrics": None,
+}
+
+
+def _collect(
+    add_func: Callable[..., None], *args: Any, **kwargs: Any
+) -> list[logging.Handler]:
+    # A Logger created directly is not registered with the logging manager,
+    # so collecting handlers leaves nothing behind in the logger dict.
+    collector = logging.Logger("himalog.pipeline")
+    try:
+        add_func(collector, *args, **kwargs)
+    except Exception as e:
+        logging.getLogger("himalog").error(f"Failed to add handler: {e}")
+    return collector.handlers
+
+
+def _common(options: Mapping[str, Any]) -> dict[str, Any]:
+    return {
+        "level": options["level"],
+        "fmt": options["fmt"],
+        "filter_func": options["filter_func"],
+        "rate_limit": options["rate_limit"],
+    }
+
+
+def _console(value: Any, options: Mapping[str, Any]) -> list[logging.Handler]:
+    from .handlers.console import add_console_handler
+
+    return _collect(add_console_handler, **_common(options))
+
+
+def _file(value: Any, options: Mapping[str, Any]) -> list[logging.Handler]:
+    from .handlers.file import add_file_handler
+
+    return _collect(
+        add_file_handler,
+        value,
+        buffer=options["file_buffer"],
+        **_common(options),
+    )
+
+
+def _rotating_file(
+    value: Any, options: Mapping[str, Any]
+) -> list[logging.Handler]:
+    from .handlers.rotating_file import add_rotating_file_handler
+
+    return _collect(
+        add_rotating_file_handler,
+        **{"buffer": options["file_buffer"], **value},
+        **_common(options),
+    )
+
+
+def _timed_rotating_file(
+    value: Any, options: Mapping[str, Any]
+) -> list[logging.Handler]:
+    from .handlers.timed_rotating_file import add_timed_rotating_file_handler
+
+    return _collect(
+        add_timed_rotating_file_handler,
+        **{"buffer": options["file_buffer"], **value},
+        **_common(options),
+    )
+
+
+def _smtp(value: Any, options: Mapping[str, Any]) -> list[logging.Handler]:
+    if value.get("async"):
+        from .handlers.async_smtp import add_async_smtp_handler
+
+        kwargs = {k: v for k, v in value.items() if k != "async"}
+        if options["overflow_policy"]:
+            kwargs.setdefault("overflow_policy", options["overflow_policy"])
+        return _collect(add_async_smtp_handler, **kwargs)
+    from .handlers.smtp import add_smtp_handler
+
+    return _collect(add_smtp_handler, **value)
+
+
+def _http(value: Any, options: Mapping[str, Any]) -> list[logging.Handler]:
+    if value.get("asyncio"):
+        from .handlers.aio import add_asyncio_http_handler
+
+        return _collect(
+            add_asyncio_http_handler,
+            **{k: v for k, v in value.items() if k != "asyncio"},
+        )
+    if value.get("async"):
+        from .handlers.async_http import add_async_http_handler
+
+        kwargs = {k: v for k, v in value.items() if k != "async"}
+        if options["overflow_policy"]:
+            kwargs.setdefault("overflow_policy", options["overflow_policy"])
+        return _collect(add_async_http_handler, **kwargs)
+    from .handlers.http import add_http_handler
+
+    return _collect(add_http_handler, **value)
+
+
+def _tcp(value: Any, options: Mapping[str, Any]) -> list[logging.Handler]:
+    from .handlers.aio import add_asyncio_tcp_handler
+
+    return _collect(add_asyncio_tcp_handler, **value)
+
+
+def _multiprocess(
+    value: Any, options: Mapping[str, Any]
+) -> list[logging.Handler]:
+    from .handlers.multiprocess import add_socket_shipper_handler
+
+    kwargs = dict(value)
+    if options["overflow_policy"]:
+        kwargs.setdefault("overflow_policy", options["overflow_policy"])
+    common = _common(options)
+    del common["fmt"]
+    return _collect(add_socket_shipper_handler, **kwargs, **common)
+
+
+# Sink nodes in attachment order: option name and builder.
+_SINKS: tuple[
+    tuple[str, Callable[[Any, Mapping[str, Any]], list[logging.Handler]]],
+    ...,
+] = (
+    ("console", _console),
+    ("file", _file),
+    ("rotating_file", _rotating_file),
+    ("timed_rotating_file", _timed_rotating_file),
+    ("smtp_handler", _smtp),
+    ("http_handler", _http),
+    ("tcp_handler", _tcp),
+    ("multiprocess", _multiprocess),
+)
+
+
+_attached: dict[str, "Pipeline"] = {}
+_attach_lock = threading.Lock()
+
+
+def _swap(
+    logger: logging.Logger,
+    previous: Optional["Pipeline"],
+    pipeline: Optional["Pipeline"],
+) -> None:
+    old_handlers = previous.handlers if previous is not None else []
+    old_filter = previous.context_filter if previous is not None else None
+    filters = [f for f in logger.filters if f is not old_filter]
+    handlers = [h for h in logger.handlers if h not in old_handlers]
+    if pipeline is not None:
+        filters.append(pipeline.context_filter)
+        handlers.extend(pipeline.handlers)
+    logger.filters = filters
+    logger.handlers = handlers
+    logger.manager._clear_cache()  # type: ignore[attr-defined]
+
+
+def detach(logger: logging.Logger) -> Optional["Pipeline"]:
+    """
+    Remove the attached pipeline's handlers and context filter from a
+    logger.
+
+    Args:
+        logger (logging.Logger): The logger.
+
+    Returns:
+        Optional[Pipeline]: The detached pipeline, still running; the
+        caller stops it.
+    """
+    with _attach_lock:
+        previous = _attached.pop(logger.name, None)
+        if previous is not None:
+            _swap(logger, previous, None)
+    return previous
+
+
+class Pipeline:
+    """
+    The handlers, wrappers and queue listener built from one configuration.
+
+    ``handlers`` are attached to the logger (the queue handler in queue
+    mode); ``layers`` lists every handler built, outermost first, so
+    ``stop`` can flush wrappers before closing the sinks behind them.
+    """
+
+    def __init__(
+        self,
+        options: Mapping[str, Any],
+        handlers: list[logging.Handler],
+        layers: list[logging.Handler],
+        listener: Optional[shutdown.Stoppable],
+        context_filter: ContextFilter,
+    ) -> None:
+        self.options = options
+        self.handlers = handlers
+        self.layers = layers
+        self.listener = listener
+        self.context_filter = context_filter
+
+    def attach(self, logger: logging.Logger) -> Optional["Pipeline"]:
+        """
+        Attach the pipeline to a logger, replacing the pipeline attached
+        before it, if any.
+
+        The handler list is replaced with a single assignment, so a record
+        logged concurrently goes to either the old or the new handlers,
+        never to neither. Handlers added to the logger by other means are
+        kept.
+
+        Args:
+            logger (logging.Logger): Target logger.
+
+        Returns:
+            Optional[Pipeline]: The replaced pipeline, still running; the
+            caller stops it.
+        """
+        with _attach_lock:
+            previous = _attached.get(logger.name)
+            _attached[logger.name] = self
+            _swap(logger, previous, self)
+        level = self.options.get("level")
+        if isinstance(level, str):
+            level = getattr(logging, level.upper(), logging.INFO)
+        if level:
+            logger.setLevel(int(level))
+        return previous
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Drain the queue listener, then flush and close every handler.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for the listener.
+        """
+        if self.listener is not None:
+            self.listener.stop(timeout)
+        for handler in self.layers:
+            try:
+                handler.close()
+            except Exception:
+                pass
+        if self.options.get("metrics"):
+            from .metrics import registry
+
+            for handler in self.layers + self.handlers:
+                registry.remove(handler)
+
+
+def compile_pipeline(options: Mapping[str, Any]) -> Pipeline:
+    """
+    Build the handler graph described by a configuration.
+
+    Args:
+        options (Mapping[str, Any]): Pipeline options (``get_logger``
+            keyword arguments); missing keys take ``PIPELINE_DEFAULTS``.
+
+    Returns:
+        Pipeline: The built, not yet attached, pipeline. In queue mode its
+        listener is already running.
+    """
+    opts = {**PIPELINE_DEFAULTS, **options}
+    formatter = opts["formatter"]
+    formatter_obj: Optional[Union[ColorFormatter, JsonFormatter]] = None
+    if formatter == "json":
+        formatter_obj = JsonFormatter()
+    elif formatter == "color":
+        formatter_obj = ColorFormatter(opts["fmt"] or _DEFAULT_FORMAT)
+
+    # Contextual logging support: static fields plus fields bound with
+    # himalog.context.bind()/log_context().
+    context_filter = ContextFilter(opts["context"])
+
+    handlers: List[logging.Handler] = []
+    names: List[str] = []
+    for key, build in _SINKS:
+        value = opts[key]
+        if value:
+            built = build(value, opts)
+            handlers.extend(built)
+            names.extend(
+                key if len(built) == 1 else f"{key}.{i}"
+                for i in range(len(built))
+            )
+    layers = list(handlers)
+
+    # Self-instrumentation: time each sink's emit and count its failures.
+    metrics_label = opts["metrics"]
+    if metrics_label:
+        from .metrics import instrument
+
+        if not isinstance(metrics_label, str):
+            metrics_label = "himalog"
+        for h, name in zip(handlers, names):
+            instrument(h, metrics_label, name)
+
+    # Apply the formatter to the sinks themselves, not to the queue or
+    # memory handlers that wrap them.
+    if formatter_obj:
+        for h in handlers:
+            h.setFormatter(formatter_obj)
+
+    # Collapse repeated records before any buffering, so a burst of
+    # duplicates never fills the memory buffer or the queue.
+    dedup = opts["dedup"]
+    if dedup:
+        from .handlers.dedup import DedupHandler
+
+        deduped: List[logging.Handler] = []
+        for h, name in zip(handlers, names):
+            dh = DedupHandler(h, **dedup)
+            dh.setLevel(h.level)
+            if metrics_label:
+                instrument(dh, metrics_label, f"dedup.{name}", timed=False)
+            deduped.append(dh)
+        handlers = deduped
+        layers[:0] = deduped
+
+    # Optionally wrap handlers in MemoryHandler for batching
+    if opts["use_memory_handler"]:
+        from .handlers.memory import CompactMemoryHandler
+
+        wrapped: List[logging.Handler] = []
+        flush_level = opts["memory_flush_level"]
+        if isinstance(flush_level, str):
+            flush_level = getattr(logging, flush_level.upper(), logging.ERROR)
+        for h in handlers:
+            memh = CompactMemoryHandler(
+                opts["memory_capacity"], flushLevel=flush_level, target=h
+            )
+            memh.setLevel(h.level)
+            wrapped.append(memh)
+        handlers = wrapped
+        layers[:0] = wrapped
+
+    # Optionally use QueueHandler/QueueListener for async logging
+    listener: Optional[shutdown.Stoppable] = None
+    if opts["use_queue"]:
+        from .handlers.queueing import (
+            DROP_NEWEST,
+            DrainingQueueListener,
+            FanoutQueueListener,
+            OverflowQueue,
+            OverflowQueueHandler,
+        )
+
+        overflow_policy = opts["overflow_policy"] or DROP_NEWEST
+        log_queue = OverflowQueue(opts["queue_size"], policy=overflow_policy)
+        queue_listener: Union[DrainingQueueListener, FanoutQueueListener]
+        if opts["queue_fanout"]:
+            queue_listener = FanoutQueueListener(
+                log_queue,
+                *handlers,
+                respect_handler_level=True,
+                group=opts["queue_fanout"],
+                sink_queue_size=opts["queue_size"],
+                overflow_policy=overflow_policy,
+            )
+        else:
+            queue_listener = DrainingQueueListener(
+                log_queue, *handlers, respect_handler_level=True
+            )
+        qh = OverflowQueueHandler(
+            log_queue,
+            listener=queue_listener,
+            defer_format=opts["defer_format"],
+        )
+        # Let the disabled-level fast path see the sinks' levels through
+        # the queue.
+        qh.setLevel(min((h.level for h in handlers), default=logging.NOTSET))
+        if metrics_label:
+            instrument(qh, metrics_label, "queue")
+        queue_listener.start()
+        listener = queue_listener
+        handlers = [qh]
+    return Pipeline(opts, handlers, layers, listener, context_filter)
+
+
+class ConfigWatcher:
+    """
+    One daemon thread that polls watched configuration files and, when a
+    file's mtime or size changes, compiles the new configuration and swaps
+    it into its logger.
+
+    The previous pipeline is kept running for ``grace`` seconds after the
+    swap, so records already on their way to it are still written, and is
+    then drained and closed. A configuration that fails to load or build
+    leaves the current pipeline in place.
+    """
+
+    def __init__(self, interval: float = 1.0, grace: float = 1.0) -> None:
+        self.interval = interval
+        self.grace = grace
+        self._watches: dict[str, "_Watch"] = {}
+        self._retired: list[tuple[float, Pipeline]] = []
+        self._lock = threading.Lock()
+        # Serializes check() between the thread and direct callers.
+        self._check_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def watch(
+        self,
+        path: str,
+        logger: logging.Logger,
+        overrides: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        """
+        Reload ``logger``'s pipeline whenever ``path`` changes.
+
+        Args:
+            path (str): Configuration file.
+            logger (logging.Logger): Logger the pipeline is attached to.
+            overrides (Optional[Mapping[str, Any]]): Options that the file
+                is merged over on every reload.
+        """
+        with self._lock:
+            self._watches[logger.name] = _Watch(
+                path, logger, dict(overrides or {})
+            )
+            if self._thread is None:
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="himalog-config", daemon=True
+                )
+                self._thread.start()
+                shutdown.register(self)
+
+    def unwatch(self, logger: logging.Logger) -> None:
+        """
+        Stop watching the configuration of a logger.
+
+        Args:
+            logger (logging.Logger): A watched logger.
+        """
+        with self._lock:
+            self._watches.pop(logger.name, None)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def check(self) -> None:
+        """
+        Reload every changed configuration and close retired pipelines
+        whose grace period has passed. Called by the watcher thread.
+        """
+        with self._check_lock:
+            with self._lock:
+                watches = list(self._watches.values())
+            for watch in watches:
+                try:
+                    watch.reload_if_changed(self)
+                except Exception as e:
+                    logging.getLogger("himalog").error(
+                        f"Failed to reload {watch.path}: {e}"
+                    )
+            now = time.monotonic()
+            with self._lock:
+                due = [p for deadline, p in self._retired if deadline <= now]
+                self._retired = [
+                    (deadline, p)
+                    for deadline, p in self._retired
+                    if deadline > now
+                ]
+            for pipeline in due:
+                pipeline.stop(shutdown.DEFAULT_TIMEOUT)
+
+    def retire(self, pipeline: Pipeline) -> None:
+        """
+        Close a detached pipeline once the grace period has passed.
+
+        Args:
+            pipeline (Pipeline): The pipeline that was replaced.
+        """
+        with self._lock:
+            self._retired.append((time.monotonic() + self.grace, pipeline))
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop polling and close retired pipelines immediately.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for each pipeline.
+        """
+        self._stopped.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+            retired, self._retired = self._retired, []
+        if thread is not None:
+            thread.join(timeout)
+            shutdown.unregister(self)
+        for _, pipeline in retired:
+            pipeline.stop(timeout)
+
+
+class _Watch:
+    def __init__(
+        self,
+        path: str,
+        logger: logging.Logger,
+        overrides: dict[str, Any],
+    ) -> None:
+        self.path = path
+        self.logger = logger
+        self.overrides = overrides
+        self.signature = _signature(path)
+
+    def reload_if_changed(self, watcher: ConfigWatcher) -> None:
+        signature = _signature(self.path)
+        if signature == self.signature:
+            return
+        self.signature = signature
+        config = load_config(self.path) or {}
+        previous = compile_pipeline({**self.overrides, **config}).attach(
+            self.logger
+        )
+        if previous is not None:
+            watcher.retire(previous)
+
+
+def _signature(path: str) -> Optional[tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+config_watcher = ConfigWatcher()
@@ -0,0 +1,237 @@
+"""
+Compact record representation for himalog's internal queues and buffers.
+
+A ``LogRecord`` keeps about 20 attributes in a per-instance ``__dict__``,
+several of which (``levelname``, ``filename``, ``module``,
+``relativeCreated``) are derived from the others. ``CompactRecord`` stores
+only the source fields in ``__slots__``, non-standard attributes as a flat
+tuple, and shares the thread and process ids between records; it rebuilds
+the ``LogRecord`` when it leaves a himalog queue.
+"""
+
+import logging
+import os
+from typing import Any, Optional
+
+# Attributes recomputed by to_record() rather than stored, and formatter
+# output that is recomputed when the record is formatted again.
+_DERIVED_ATTRS = frozenset(
+    {
+        "levelname",
+        "filename",
+        "module",
+        "relativeCreated",
+        "message",
+        "asctime",
+    }
+)
+
+# logging's module load time, the origin of LogRecord.relativeCreated.
+_START_TIME: float = getattr(logging, "_startTime")
+
+# Entries kept per lookup cache; beyond it new keys are computed every time.
+_CACHE_LIMIT = 4096
+
+_path_parts: dict[str, tuple[str, str]] = {}
+
+# Thread and process ids are large ints, a new object per record; share one
+# object per distinct id.
+_ids: dict[int, int] = {}
+
+
+def _split_path(pathname: str) -> tuple[str, str]:
+    parts = _path_parts.get(pathname)
+    if parts is None:
+        try:
+            filename = os.path.basename(pathname)
+            module = os.path.splitext(filename)[0]
+        except (TypeError, ValueError, AttributeError):
+            filename = module = pathname
+        parts = (filename, module)
+        if len(_path_parts) < _CACHE_LIMIT:
+            _path_parts[pathname] = parts
+    return parts
+
+
+def _share_id(value: int) -> int:
+    shared = _ids.get(value)
+    if shared is None:
+        # Short-lived threads bring new ids forever; stop interning at the
+        # cap rather than growing without bound.
+        if len(_ids) < _CACHE_LIMIT:
+            _ids[value] = value
+        return value
+    return shared
+
+
+def _msecs(created: float) -> float:
+    # LogRecord.__init__'s derivation before Python 3.13.
+    return int((created - int(created)) * 1000) + 0.0
+
+
+class CompactRecord:
+    """
+    A ``__slots__`` snapshot of a ``LogRecord``.
+
+    ``levelname``, ``filename``, ``module`` and ``relativeCreated`` are
+    recomputed on conversion back, as is ``msecs`` when it matches its
+    usual derivation from ``created``; ``message`` and ``asctime``
+    (formatter output) are dropped. Other attributes, such as ``extra=``
+    fields and ``context``, are kept in ``extra`` as a flat
+    ``(key, value, key, value, ...)`` tuple.
+    """
+
+    __slots__ = (
+        "name",
+        "msg",
+        "args",
+        "levelno",
+        "pathname",
+        "lineno",
+        "funcName",
+        "created",
+        "msecs",
+        "thread",
+        "threadName",
+        "process",
+        "processName",
+        "exc_info",
+        "exc_text",
+        "stack_info",
+        "extra",
+    )
+
+    name: str
+    msg: Any
+    args: Any
+    levelno: int
+    pathname: str
+    lineno: int
+    funcName: str
+    created: float
+    msecs: Optional[float]
+    thread: Optional[int]
+    threadName: Optional[str]
+    process: Optional[int]
+    processName: Optional[str]
+    exc_info: Any
+    exc_text: Optional[str]
+    stack_info: Optional[str]
+    extra: tuple[Any, ...]
+
+    @classmethod
+    def from_record(cls, record: logging.LogRecord) -> "CompactRecord":
+        """
+        Build a compact record from a ``LogRecord``.
+
+        Args:
+            record (logging.LogRecord): The log record.
+
+        Returns:
+            CompactRecord: The compact copy.
+        """
+        attrs = record.__dict__
+        compact = cls.__new__(cls)
+        compact.name = attrs["name"]
+        compact.msg = attrs["msg"]
+        compact.args = attrs["args"]
+        compact.levelno = attrs["levelno"]
+        compact.pathname = attrs["pathname"]
+        compact.lineno = attrs["lineno"]
+        compact.funcName = attrs["funcName"]
+        created = compact.created = attrs["created"]
+        msecs = attrs["msecs"]
+        compact.msecs = None if msecs == _msecs(created) else msecs
+        thread = attrs["thread"]
+        compact.thread = _share_id(thread) if thread else thread
+        compact.threadName = attrs["threadName"]
+        process = attrs["process"]
+        compact.process = _share_id(process) if process else process
+        compact.processName = attrs["processName"]
+        compact.exc_info = attrs["exc_info"]
+        compact.exc_text = attrs["exc_text"]
+        compact.stack_info = attrs["stack_info"]
+        extra_keys = attrs.keys() - _NOT_EXTRA
+        compact.extra = (
+            tuple(item for k in extra_keys for item in (k, attrs[k]))
+            if extra_keys
+            else ()
+        )
+        return compact
+
+    def to_record(self) -> logging.LogRecord:
+        """
+        Rebuild the ``LogRecord``.
+
+        Returns:
+            logging.LogRecord: A record with the standard attributes plus
+            any extra ones.
+        """
+        filename, module = _split_path(self.pathname)
+        record: logging.LogRecord = logging.LogRecord.__new__(
+            logging.LogRecord
+        )
+        record.__dict__ = {
+            "name": self.name,
+            "msg": self.msg,
+            "args": self.args,
+            "levelname": logging.getLevelName(self.levelno),
+            "levelno": self.levelno,
+            "pathname": self.pathname,
+            "filename": filename,
+            "module": module,
+            "exc_info": self.exc_info,
+            "exc_text": self.exc_text,
+            "stack_info": self.stack_info,
+            "lineno": self.lineno,
+            "funcName": self.funcName,
+            "created": self.created,
+            "msecs": (
+                _msecs(self.created) if self.msecs is None else self.msecs
+            ),
+            "relativeCreated": (self.created - _START_TIME) * 1000,
+            "thread": self.thread,
+            "threadName": self.threadName,
+            "processName": self.processName,
+            "process": self.process,
+        }
+        extra = self.extra
+        if extra:
+            attrs = record.__dict__
+            for i in range(0, len(extra), 2):
+                attrs[extra[i]] = extra[i + 1]
+        return record
+
+
+# Everything else, including attributes newer Pythons add (taskName), is
+# carried in ``extra``.
+_NOT_EXTRA = (frozenset(CompactRecord.__slots__) - {"extra"}) | _DERIVED_ATTRS
+
+
+def compact(record: logging.LogRecord) -> CompactRecord:
+    """
+    Convert a record for storage in a himalog queue or buffer.
+
+    Args:
+        record (logging.LogRecord): The log record.
+
+    Returns:
+        CompactRecord: The compact record.
+    """
+    return CompactRecord.from_record(record)
+
+
+def expand(item: Any) -> Any:
+    """
+    Convert a queued item back to a ``LogRecord``; other items (such as the
+    stop sentinel) are returned unchanged.
+
+    Args:
+        item (Any): A queued item.
+
+    Returns:
+        Any: The ``LogRecord`` or the item itself.
+    """
+    if type(item) is CompactRecord:
+        return item.to_record()
+    return item
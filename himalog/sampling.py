@@ -0,0 +1,266 @@
+"""
+Sampling and rate limiting for noisy log call sites.
+
+``RateLimitFilter`` is a handler filter that gives every call site
+(``pathname``, ``lineno``) its own token bucket and can additionally keep
+only a fraction of records per level. Call sites live in an LRU of bounded
+size, so a lookup is one dict access and memory stays flat no matter how
+many sites log. Suppressed records are counted per site and reported by a
+periodic "N suppressed" summary record sent to the handler the filter
+guards.
+"""
+
+import logging
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Mapping, Optional, Protocol, Union
+
+_SUMMARY_MSG = "%d records suppressed from %s:%d in the last %.0fs"
+
+
+class _Site:
+    __slots__ = ("tokens", "stamp", "suppressed", "levelno", "name", "since")
+
+    def __init__(self, tokens: float, now: float, name: str) -> None:
+        self.tokens = tokens
+        self.stamp = now
+        self.suppressed = 0
+        self.levelno = logging.NOTSET
+        self.name = name
+        self.since = now
+
+
+def _level(level: Union[int, str]) -> int:
+    if isinstance(level, str):
+        return int(getattr(logging, level.upper(), logging.INFO))
+    return level
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Handler filter combining per-call-site token buckets with per-level
+    probabilistic sampling.
+
+    Each call site may emit ``burst`` records at once and ``rate`` records
+    per second after that (``rate=None`` disables the buckets). With
+    ``sample``, a record is first kept only with the probability given for
+    its level, e.g. ``{"DEBUG": 0.01, "INFO": 0.1}``. Records at or above
+    ``exempt_level`` are never limited.
+
+    Every ``summary_interval`` seconds each site that lost records gets one
+    WARNING-or-higher summary record, handled by ``handler``; with no
+    handler the counts are only available from ``stats()``. At most
+    ``max_sites`` call sites are tracked; the least recently used one is
+    evicted first and its pending count is reported with the next summary.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = 10.0,
+        burst: Optional[float] = None,
+        sample: Optional[Mapping[Union[int, str], float]] = None,
+        exempt_level: Optional[Union[int, str]] = logging.ERROR,
+        max_sites: int = 4096,
+        summary_interval: float = 60.0,
+        handler: Optional[logging.Handler] = None,
+    ) -> None:
+        super().__init__()
+        self.rate = rate
+        self.burst = float(burst if burst is not None else rate or 0.0)
+        self.sample = (
+            {_level(level): p for level, p in sample.items()} if sample else {}
+        )
+        self.exempt_level = (
+            _level(exempt_level) if exempt_level is not None else None
+        )
+        self.max_sites = max(1, max_sites)
+        self.summary_interval = summary_interval
+        self._handler = weakref.ref(handler) if handler is not None else None
+        self._sites: "OrderedDict[tuple[str, int], _Site]" = OrderedDict()
+        self._evicted: list[tuple[tuple[str, int], _Site]] = []
+        self._lock = threading.Lock()
+        self._next_summary = time.monotonic() + summary_interval
+        self.passed = 0
+        self.suppressed = 0
+        if handler is not None and summary_interval > 0:
+            summary_ticker.add(self)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Decide whether a record passes.
+
+        Args:
+            record (logging.LogRecord): The log record.
+
+        Returns:
+            bool: True to handle the record, False to suppress it.
+        """
+        levelno = record.levelno
+        if (
+            self.exempt_level is not None and levelno >= self.exempt_level
+        ) or record.__dict__.get("_himalog_summary"):
+            return True
+        now = time.monotonic()
+        probability = self.sample.get(levelno)
+        keep = probability is None or random.random() < probability
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                site = _Site(self.burst, now, record.name)
+                self._sites[key] = site
+                if len(self._sites) > self.max_sites:
+                    evicted = self._sites.popitem(last=False)
+                    if evicted[1].suppressed:
+                        self._evicted.append(evicted)
+            else:
+                self._sites.move_to_end(key)
+            if keep and self.rate is not None:
+                site.tokens = min(
+                    self.burst, site.tokens + (now - site.stamp) * self.rate
+                )
+                site.stamp = now
+                if site.tokens >= 1.0:
+                    site.tokens -= 1.0
+                else:
+                    keep = False
+            if keep:
+                self.passed += 1
+            else:
+                self.suppressed += 1
+                site.suppressed += 1
+                if levelno > site.levelno:
+                    site.levelno = levelno
+        if now >= self._next_summary:
+            self.flush_summaries(now)
+        return keep
+
+    def flush_summaries(self, now: Optional[float] = None) -> None:
+        """
+        Send a summary record for every site that suppressed records since
+        its last summary, if ``summary_interval`` has elapsed.
+
+        Args:
+            now (Optional[float]): ``time.monotonic()`` value; None forces
+                the summaries out regardless of the interval.
+        """
+        if now is None:
+            now = time.monotonic()
+        elif now < self._next_summary:
+            return
+        with self._lock:
+            self._next_summary = now + self.summary_interval
+            pending = [_summary(key, site, now) for key, site in self._evicted]
+            self._evicted = []
+            for key, site in self._sites.items():
+                if site.suppressed:
+                    pending.append(_summary(key, site, now))
+                    site.suppressed = 0
+                    site.levelno = logging.NOTSET
+                    site.since = now
+        handler = self._handler() if self._handler is not None else None
+        if handler is not None:
+            for record in pending:
+                handler.handle(record)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get counters of records passed and suppressed and of tracked sites.
+
+        Returns:
+            dict[str, int]: Filter counters.
+        """
+        return {
+            "passed": self.passed,
+            "suppressed": self.suppressed,
+            "sites": len(self._sites),
+        }
+
+
+def _summary(
+    key: tuple[str, int], site: _Site, now: float
+) -> logging.LogRecord:
+    pathname, lineno = key
+    record = logging.LogRecord(
+        site.name,
+        max(site.levelno, logging.WARNING),
+        pathname,
+        lineno,
+        _SUMMARY_MSG,
+        (site.suppressed, pathname, lineno, now - site.since),
+        None,
+    )
+    # Marked so the filter passes it; ``suppressed`` is rendered as an
+    # extra field by the JSON and color formatters.
+    record.__dict__.update(_himalog_summary=True, suppressed=site.suppressed)
+    return record
+
+
+class Summarizing(Protocol):
+    def flush_summaries(self, now: Optional[float] = None) -> None: ...
+
+
+class SummaryTicker:
+    """
+    One daemon thread that calls ``flush_summaries(now)`` on registered
+    filters and handlers, so summaries go out even after their sources
+    have gone quiet.
+    """
+
+    def __init__(self, tick: float = 1.0) -> None:
+        self.tick = tick
+        self._filters: "weakref.WeakSet[Summarizing]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, summarizing: Summarizing) -> None:
+        """
+        Register an object whose summaries should be flushed periodically.
+
+        Args:
+            summarizing (Summarizing): Object with ``flush_summaries``; held
+                by weak reference.
+        """
+        with self._lock:
+            self._filters.add(summarizing)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="himalog-sampling", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.tick)
+            now = time.monotonic()
+            for summarizing in list(self._filters):
+                try:
+                    summarizing.flush_summaries(now)
+                except Exception:
+                    pass
+
+
+summary_ticker = SummaryTicker()
+
+
+def add_rate_limit_filter(
+    handler: logging.Handler, **options: Any
+) -> RateLimitFilter:
+    """
+    Attach a ``RateLimitFilter`` to a handler, sending its summary records
+    to that handler.
+
+    Args:
+        handler (logging.Handler): Handler to guard.
+        **options: ``RateLimitFilter`` arguments (rate, burst, sample,
+            exempt_level, max_sites, summary_interval).
+
+    Returns:
+        RateLimitFilter: The attached filter.
+    """
+    rate_filter = RateLimitFilter(handler=handler, **options)
+    handler.addFilter(rate_filter)
+    return rate_filter
@@ -0,0 +1,86 @@
+"""
+Shutdown coordination for himalog background workers.
+
+Every worker thread and queue listener created by himalog registers here.
+``shutdown`` drains them (newest first, so listeners feeding async handlers
+stop before the handlers do) within one bounded deadline, and runs
+automatically at interpreter exit, before the standard library's own
+``logging.shutdown``.
+"""
+
+import atexit
+import threading
+import time
+from typing import Optional, Protocol
+
+from .core import env_or_default
+
+DEFAULT_TIMEOUT: float = env_or_default("HIMALOG_SHUTDOWN_TIMEOUT", 5.0, float)
+
+
+class Stoppable(Protocol):
+    """
+    A background worker that can drain its queue and stop.
+    """
+
+    def stop(self, timeout: Optional[float] = None) -> None: ...
+
+
+_lock = threading.Lock()
+_workers: dict[int, Stoppable] = {}
+
+
+def register(worker: Stoppable) -> None:
+    """
+    Register a worker to be drained on shutdown.
+
+    Args:
+        worker (Stoppable): Worker with a ``stop(timeout)`` method.
+    """
+    with _lock:
+        _workers[id(worker)] = worker
+
+
+def unregister(worker: Stoppable) -> None:
+    """
+    Remove a worker from the shutdown registry.
+
+    Args:
+        worker (Stoppable): A previously registered worker.
+    """
+    with _lock:
+        _workers.pop(id(worker), None)
+
+
+def registered() -> list[Stoppable]:
+    """
+    Get the currently registered workers, oldest first.
+
+    Returns:
+        list[Stoppable]: Registered workers.
+    """
+    with _lock:
+        return list(_workers.values())
+
+
+def shutdown(timeout: Optional[float] = None) -> None:
+    """
+    Drain and stop all registered workers within a bounded deadline.
+
+    Args:
+        timeout (Optional[float]): Total seconds to wait for all workers.
+            Defaults to ``HIMALOG_SHUTDOWN_TIMEOUT`` or 5 seconds.
+    """
+    deadline = time.monotonic() + (
+        DEFAULT_TIMEOUT if timeout is None else timeout
+    )
+    for worker in reversed(registered()):
+        remaining = max(0.0, deadline - time.monotonic())
+        try:
+            worker.stop(remaining)
+        except Exception:
+            pass
+        unregister(worker)
+
+
+atexit.register(shutdown)
@@ -0,0 +1,71 @@
+import logging
+import threading
+from typing import Callable, Iterator, Optional
+
+import pytest
+
+
+class ListHandler(logging.Handler):
+    """
+    Handler that keeps every record it handles and its formatted line.
+    With a ``gate`` it waits for the event (at most 5 s) before each
+    record, to stand in for a slow sink.
+    """
+
+    def __init__(self, gate: Optional[threading.Event] = None) -> None:
+        super().__init__()
+        self.gate = gate
+        self.records: list[logging.LogRecord] = []
+        self.lines: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.records.append(record)
+        self.lines.append(self.format(record))
+
+
+MakeLogger = Callable[..., logging.Logger]
+
+
+@pytest.fixture
+def list_handler() -> ListHandler:
+    """
+    A fresh ListHandler.
+
+    Returns:
+        ListHandler: Handler collecting records and formatted lines.
+    """
+    return ListHandler()
+
+
+@pytest.fixture
+def make_logger() -> Iterator[MakeLogger]:
+    """
+    Factory for a non-propagating logger with one handler attached. The
+    handlers are detached again when the test ends.
+
+    Yields:
+        MakeLogger: ``make_logger(name, handler, level=DEBUG, fmt=None)``;
+        ``fmt`` also sets a plain formatter on the handler.
+    """
+    attached: list[tuple[logging.Logger, logging.Handler]] = []
+
+    def make(
+        name: str,
+        handler: logging.Handler,
+        level: int = logging.DEBUG,
+        fmt: Optional[str] = None,
+    ) -> logging.Logger:
+        logger = logging.getLogger(name)
+        logger.propagate = False
+        logger.setLevel(level)
+        if fmt is not None:
+            handler.setFormatter(logging.Formatter(fmt))
+        logger.addHandler(handler)
+        attached.append((logger, handler))
+        return logger
+
+    yield make
+    for logger, handler in attached:
+        logger.removeHandler(handler)
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import pytest
+
+from himalog.handlers.aio import (
+    AsyncioHandler,
+    AsyncioHTTPHandler,
+    AsyncioTCPHandler,
+)
+from himalog.logger import close_logger, get_logger
+
+
+def _record(msg: str) -> logging.LogRecord:
+    return logging.LogRecord("aio", logging.INFO, "", 0, msg, None, None)
+
+
+def test_asyncio_http_handler_batches_and_drains() -> None:
+    """
+    Test that aclose() delivers every record, including ones emitted from
+    another thread, in batches over pooled keep-alive connections.
+    """
+    payloads: list[Any] = []
+    clients: set[Any] = set()
+
+    class Collector(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            length = int(self.headers["Content-Length"])
+            payloads.append(json.loads(self.rfile.read(length)))
+            clients.add(self.client_address)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Collector)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    async def main() -> AsyncioHTTPHandler:
+        handler = AsyncioHTTPHandler(
+            f"127.0.0.1:{server.server_address[1]}",
+            "/log",
+            batch_size=10,
+            batch_interval=0.01,
+            max_concurrency=2,
+        )
+        for i in range(15):
+            handler.handle(_record(f"loop {i}"))
+        worker = threading.Thread(
+            target=lambda: [
+                handler.handle(_record(f"thread {i}")) for i in range(15)
+            ]
+        )
+        worker.start()
+        await asyncio.to_thread(worker.join)
+        await handler.aclose()
+        return handler
+
+    handler = asyncio.run(main())
+    server.shutdown()
+    messages = [item["message"] for payload in payloads for item in payload]
+    assert sorted(messages) == sorted(
+        [f"loop {i}" for i in range(15)] + [f"thread {i}" for i in range(15)]
+    )
+    assert all(len(payload) <= 10 for payload in payloads)
+    assert len(clients) <= 2
+    assert handler.enqueued == 30 and handler.dropped == 0
+
+
+def test_asyncio_tcp_handler_writes_lines() -> None:
+    """
+    Test that the TCP handler streams formatted records as lines.
+    """
+    received: list[bytes] = []
+
+    async def main() -> None:
+        async def collect(
+            reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        ) -> None:
+            received.extend((await reader.read()).splitlines())
+            writer.close()
+
+        server = await asyncio.start_server(collect, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        handler = AsyncioTCPHandler("127.0.0.1", port, batch_interval=0)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        for i in range(5):
+            handler.handle(_record(f"line {i}"))
+        await handler.aclose()
+        await asyncio.sleep(0.05)
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+    assert received == [f"line {i}".encode() for i in range(5)]
+
+
+def test_asyncio_tcp_handler_from_get_logger() -> None:
+    """
+    Test that get_logger(tcp_handler=...) attaches an AsyncioTCPHandler
+    and that the base class cannot be used without send_batch.
+    """
+    received: list[bytes] = []
+
+    async def main() -> None:
+        async def collect(
+            reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        ) -> None:
+            received.extend((await reader.read()).splitlines())
+            writer.close()
+
+        server = await asyncio.start_server(collect, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        logger = get_logger(
+            name="test_asyncio_tcp_pipeline",
+            console=False,
+            fmt="%(levelname)s %(message)s",
+            tcp_handler={
+                "host": "127.0.0.1",
+                "port": port,
+                "fmt": "%(message)s",
+            },
+        )
+        try:
+            (handler,) = logger.handlers
+            assert isinstance(handler, AsyncioTCPHandler)
+            logger.warning("over tcp")
+            await handler.aclose()
+            await asyncio.sleep(0.05)
+        finally:
+            close_logger("test_asyncio_tcp_pipeline")
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(main())
+    assert received == [b"over tcp"]
+    with pytest.raises(TypeError):
+        AsyncioHandler()  # type: ignore[abstract]
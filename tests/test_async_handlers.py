@@ -1,4 +1,5 @@
 import time
+from typing import Any
 
 import pytest
 
@@ -64,3 +65,125 @@ def test_async_smtp_handler(monkeypatch: pytest.MonkeyPatch) -> None:
             break
         time.sleep(0.1)
     assert any("async smtp test" in msg for msg in emitted)
+
+
+def test_async_http_handler_batches_over_keep_alive() -> None:
+    """
+    Test that batching mode POSTs JSON arrays over a single connection.
+    """
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from typing import Any
+
+    payloads: list[Any] = []
+    clients: set[Any] = set()
+
+    class Collector(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            length = int(self.headers["Content-Length"])
+            payloads.append(json.loads(self.rfile.read(length)))
+            clients.add(self.client_address)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Collector)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger = get_logger(
+        name="test_async_http_handler_batches",
+        console=False,
+        http_handler={
+            "host": f"127.0.0.1:{server.server_address[1]}",
+            "url": "/log",
+            "async": True,
+            "batch_size": 3,
+            "batch_interval": 0.05,
+        },
+    )
+    for i in range(7):
+        logger.info("batched %d", i)
+    for _ in range(50):
+        if sum(len(p) for p in payloads) == 7:
+            break
+        time.sleep(0.05)
+    server.shutdown()
+    messages = [item["message"] for payload in payloads for item in payload]
+    assert messages == [f"batched {i}" for i in range(7)]
+    assert all(len(payload) <= 3 for payload in payloads)
+    assert len(clients) == 1
+
+
+def test_async_smtp_digest_reuses_one_connection() -> None:
+    """
+    Test that digest mode sends batches as single emails over one SMTP
+    connection to a local stand-in server.
+    """
+    import socketserver
+    import threading
+    from email import message_from_bytes
+
+    messages: list[bytes] = []
+    connections: list[Any] = []
+
+    class StandIn(socketserver.StreamRequestHandler):
+        def reply(self, line: bytes) -> None:
+            self.wfile.write(line + b"\r\n")
+
+        def handle(self) -> None:
+            connections.append(self.client_address)
+            self.reply(b"220 stand-in ESMTP")
+            while True:
+                command = self.rfile.readline()[:4].upper()
+                if not command or command == b"QUIT":
+                    self.reply(b"221 bye")
+                    return
+                if command == b"DATA":
+                    self.reply(b"354 end with .")
+                    lines = []
+                    for line in iter(self.rfile.readline, b".\r\n"):
+                        lines.append(line)
+                    messages.append(b"".join(lines))
+                self.reply(b"250 ok")
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), StandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger = get_logger(
+        name="test_async_smtp_digest",
+        console=False,
+        smtp_handler={
+            "mailhost": ("127.0.0.1", server.server_address[1]),
+            "fromaddr": "from@example.com",
+            "toaddrs": ["to@example.com"],
+            "subject": "Incident",
+            "async": True,
+            "batch_size": 4,
+            "batch_interval": 0.05,
+        },
+    )
+    for i in range(10):
+        logger.error("failure %d", i)
+    handler = logger.handlers[0]
+    handler.close()
+    logger.removeHandler(handler)
+    server.shutdown()
+    server.server_close()
+    bodies = [message_from_bytes(m) for m in messages]
+    lines = [
+        line
+        for body in bodies
+        for line in body.get_payload().splitlines()  # type: ignore[union-attr]
+    ]
+    assert [line.rsplit(": ", 1)[1] for line in lines] == [
+        f"failure {i}" for i in range(10)
+    ]
+    assert 3 <= len(bodies) <= 10
+    assert bodies[0]["Subject"].startswith("Incident")
+    assert len(connections) == 1
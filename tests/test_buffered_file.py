@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pytest
+
+from himalog.handlers.buffered import (
+    BufferedFileHandler,
+    BufferedRotatingFileHandler,
+)
+from himalog.logger import get_logger
+
+from .conftest import MakeLogger
+
+
+@pytest.mark.parametrize("use_writev", [False, True])
+def test_buffered_file_flushes_on_error_and_close(
+    tmp_path: Path, use_writev: bool, make_logger: MakeLogger
+) -> None:
+    """
+    Test that lines are held until an ERROR record or close.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        use_writev (bool): Whether to write with os.writev.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    log_file = tmp_path / "buffered.log"
+    handler = BufferedFileHandler(
+        str(log_file), flush_interval=60, use_writev=use_writev
+    )
+    logger = make_logger(
+        f"test_buffered_file_{use_writev}", handler, fmt="%(message)s"
+    )
+    for i in range(5):
+        logger.info("line %d", i)
+    assert log_file.read_text() == ""
+    logger.error("boom")
+    assert log_file.read_text().splitlines() == [
+        "line 0",
+        "line 1",
+        "line 2",
+        "line 3",
+        "line 4",
+        "boom",
+    ]
+    logger.info("tail")
+    handler.close()
+    assert log_file.read_text().endswith("boom\ntail\n")
+
+
+def test_buffered_file_flushes_at_byte_threshold(
+    tmp_path: Path, make_logger: MakeLogger
+) -> None:
+    """
+    Test that reaching buffer_size triggers a write.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    log_file = tmp_path / "threshold.log"
+    handler = BufferedFileHandler(
+        str(log_file), buffer_size=20, flush_interval=60
+    )
+    logger = make_logger(
+        "test_buffered_file_threshold", handler, fmt="%(message)s"
+    )
+    logger.info("0123456789")
+    assert log_file.read_text() == ""
+    logger.info("0123456789")
+    assert log_file.read_text().count("0123456789") == 2
+    handler.close()
+
+
+def test_buffered_rotating_file_rotates(
+    tmp_path: Path, make_logger: MakeLogger
+) -> None:
+    """
+    Test that buffered rotation respects max_bytes and keeps every line.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    log_file = tmp_path / "rot.log"
+    handler = BufferedRotatingFileHandler(
+        str(log_file), maxBytes=50, backupCount=5, flush_interval=60
+    )
+    logger = make_logger(
+        "test_buffered_rotating_file", handler, fmt="%(message)s"
+    )
+    for i in range(10):
+        logger.info("message %d", i)
+    handler.close()
+    files = sorted(tmp_path.iterdir())
+    assert len(files) > 1
+    assert all(f.stat().st_size <= 50 for f in files)
+    lines = [line for f in files for line in f.read_text().splitlines()]
+    assert sorted(lines) == sorted(f"message {i}" for i in range(10))
+
+
+def test_get_logger_file_buffer(tmp_path: Path) -> None:
+    """
+    Test that get_logger(file_buffer=...) installs a buffered handler.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    log_file = tmp_path / "app.log"
+    logger = get_logger(
+        name="test_get_logger_file_buffer",
+        console=False,
+        file=str(log_file),
+        file_buffer={"flush_interval": 60},
+    )
+    assert any(isinstance(h, BufferedFileHandler) for h in logger.handlers)
+    logger.critical("now")
+    assert "now" in log_file.read_text()
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from himalog.context import (
+    ContextFilter,
+    bind,
+    get_context,
+    log_context,
+    reset,
+    with_context,
+)
+from himalog.formatters import JsonFormatter
+from himalog.logger import close_logger, get_logger
+
+
+def _filtered() -> logging.LogRecord:
+    record = logging.LogRecord("ctx", logging.INFO, "", 0, "msg", None, None)
+    ContextFilter({"service": "api"}).filter(record)
+    return record
+
+
+def test_log_context_merges_static_and_bound_fields() -> None:
+    """
+    Test that bound fields are merged over static fields and unbound on exit.
+    """
+    with log_context(request_id="abc", service="worker"):
+        record = _filtered()
+    assert dict(getattr(record, "context")) == {
+        "request_id": "abc",
+        "service": "worker",
+    }
+    assert dict(getattr(_filtered(), "context")) == {"service": "api"}
+    data = json.loads(JsonFormatter().format(record))
+    assert data["request_id"] == "abc"
+    assert "context" not in data
+
+
+def test_context_filter_reuses_merged_mapping() -> None:
+    """
+    Test that the merged mapping is computed once per context change.
+    """
+    context_filter = ContextFilter({"service": "api"})
+    records = [
+        logging.LogRecord("ctx", logging.INFO, "", 0, "msg", None, None)
+        for _ in range(3)
+    ]
+    token = bind(user="alice")
+    try:
+        for record in records:
+            context_filter.filter(record)
+    finally:
+        reset(token)
+    contexts = [getattr(record, "context") for record in records]
+    assert contexts[0] is contexts[1] is contexts[2]
+
+
+def test_context_is_isolated_between_asyncio_tasks() -> None:
+    """
+    Test that each asyncio task sees only the context it bound.
+    """
+
+    async def handle(request_id: str) -> Any:
+        with log_context(request_id=request_id):
+            await asyncio.sleep(0)
+            return get_context()["request_id"]
+
+    async def main() -> list[Any]:
+        return await asyncio.gather(*(handle(f"r{i}") for i in range(5)))
+
+    assert asyncio.run(main()) == [f"r{i}" for i in range(5)]
+    assert dict(get_context()) == {}
+
+
+def test_with_context_propagates_to_thread_pool() -> None:
+    """
+    Test that with_context carries the caller's context into a worker.
+    """
+    with log_context(job="nightly"):
+        task = with_context(lambda: dict(get_context()))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(task).result() == {"job": "nightly"}
+        assert pool.submit(lambda: dict(get_context())).result() == {}
+
+
+def test_context_fields_usable_in_format_string(tmp_path: Path) -> None:
+    """
+    Test that context fields are set as record attributes, so %-style
+    format strings can reference them, without overriding attributes the
+    record already has.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    path = tmp_path / "app.log"
+    logger = get_logger(
+        name="test_context_format_string",
+        console=False,
+        file=str(path),
+        fmt="%(request_id)s %(name)s %(message)s",
+        context={"request_id": "req-1", "name": "ignored"},
+    )
+    try:
+        logger.info("handled")
+        with log_context(request_id="req-2"):
+            logger.info("bound")
+    finally:
+        close_logger("test_context_format_string")
+    assert path.read_text().splitlines() == [
+        "req-1 test_context_format_string handled",
+        "req-2 test_context_format_string bound",
+    ]
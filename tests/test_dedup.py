@@ -0,0 +1,81 @@
+import logging
+
+from himalog.handlers.dedup import DedupHandler
+from himalog.logger import get_logger
+
+from .conftest import ListHandler, MakeLogger
+
+
+def test_dedup_collapses_repeats(
+    list_handler: ListHandler, make_logger: MakeLogger
+) -> None:
+    """
+    Test that repeats of one template within the window become a single
+    record with a repeat count, sent when the handler is flushed.
+
+    Args:
+        list_handler (ListHandler): Handler collecting the records.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    handler = DedupHandler(list_handler, window=3600)
+    logger = make_logger("test_dedup_collapse", handler)
+    for i in range(50):
+        logger.error("disk %s full", f"/dev/sd{i}")
+    logger.warning("disk %s full", "/dev/sda")
+    assert [r.getMessage() for r in list_handler.records] == [
+        "disk /dev/sd0 full",
+        "disk /dev/sda full",
+    ]
+    handler.flush()
+    summary = list_handler.records[-1]
+    assert summary.levelno == logging.ERROR
+    assert summary.__dict__["repeat_count"] == 49
+    assert summary.getMessage().startswith("disk /dev/sd49 full (repeated 49")
+    assert handler.stats() == {
+        "hits": 49,
+        "misses": 2,
+        "evictions": 0,
+        "size": 0,
+    }
+
+
+def test_dedup_window_and_eviction(
+    list_handler: ListHandler, make_logger: MakeLogger
+) -> None:
+    """
+    Test that a repeat after the window passes through, and that the LRU
+    evicts the oldest fingerprint and reports its pending repeats.
+
+    Args:
+        list_handler (ListHandler): Handler collecting the records.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    handler = DedupHandler(list_handler, window=0.0, max_entries=1)
+    logger = make_logger("test_dedup_window", handler)
+    logger.info("a")
+    logger.info("a")
+    assert len(list_handler.records) == 2
+
+    list_handler.records.clear()
+    handler.window = 3600
+    logger.info("b")
+    logger.info("b")
+    logger.info("c")
+    assert [r.getMessage() for r in list_handler.records] == [
+        "b",
+        "b (repeated 1 times in 0s)",
+        "c",
+    ]
+    assert handler.stats()["evictions"] >= 1
+
+
+def test_get_logger_dedup_option() -> None:
+    """
+    Test that get_logger wraps its handlers when dedup is set.
+    """
+    logger = get_logger(name="test_dedup_option", dedup={"window": 10})
+    assert logger.handlers
+    assert all(isinstance(h, DedupHandler) for h in logger.handlers)
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
@@ -0,0 +1,214 @@
+import datetime
+import json
+import logging
+import time
+from types import MappingProxyType
+
+import pytest
+
+from himalog.formatters import (
+    ColorFormatter,
+    HimaFormatter,
+    JsonFormatter,
+    get_timestamp_cache,
+)
+
+
+def _record(**extra: object) -> logging.LogRecord:
+    record = logging.LogRecord(
+        "fmt", logging.WARNING, __file__, 10, "hello %s", ("world",), None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.mark.parametrize("backend", ["json", None])
+def test_json_formatter_includes_extra_fields(backend: str) -> None:
+    """
+    Test that extra and context fields are serialized with the record.
+
+    Args:
+        backend (str): JSON backend, or None for the fastest installed.
+    """
+    formatter = JsonFormatter(backend=backend)
+    data = json.loads(formatter.format(_record(request_id="abc")))
+    assert data["message"] == "hello world"
+    assert data["level"] == "WARNING"
+    assert data["name"] == "fmt"
+    assert data["request_id"] == "abc"
+
+
+def test_json_formatter_configured_fields() -> None:
+    """
+    Test that a configured field mapping controls keys and sources.
+    """
+    formatter = JsonFormatter(
+        fields={"msg": "message", "line": "lineno"}, include_extra=False
+    )
+    data = json.loads(formatter.format(_record(request_id="abc")))
+    assert data == {"msg": "hello world", "line": 10}
+
+
+def test_json_formatter_configured_context_field() -> None:
+    """
+    Test that a configured "context" source stays nested instead of being
+    flattened (or removed) with extra fields.
+    """
+    context = MappingProxyType({"request_id": "abc"})
+    record = _record(context=context)
+    data = json.loads(JsonFormatter(fields={"ctx": "context"}).format(record))
+    assert data == {"ctx": {"request_id": "abc"}}
+    formatter = JsonFormatter(fields=["message", "context"])
+    data = json.loads(formatter.format(record))
+    assert data == {"message": "hello world", "context": {"request_id": "abc"}}
+
+
+def test_context_never_overwrites_record_fields() -> None:
+    """
+    Test that context keys clashing with core or extra fields stay nested
+    under "context" in JSON and colored output.
+    """
+    context = MappingProxyType(
+        {"name": "svc", "level": "x", "user": "ctx", "region": "eu"}
+    )
+    record = _record(context=context, user="alice")
+    data = json.loads(JsonFormatter().format(record))
+    assert data == {
+        "time": data["time"],
+        "level": "WARNING",
+        "name": "fmt",
+        "message": "hello world",
+        "user": "alice",
+        "region": "eu",
+        "context": {"name": "svc", "level": "x", "user": "ctx"},
+    }
+    line = ColorFormatter(colorize=False).format(record)
+    assert line.endswith(
+        "[WARNING ] fmt            : hello world"
+        " context={'name': 'svc', 'level': 'x', 'user': 'ctx'}"
+        " region=eu user=alice"
+    )
+
+
+def test_json_formatter_cached_time_matches_stdlib() -> None:
+    """
+    Test that the cached timestamp matches logging.Formatter.formatTime.
+    """
+    record = _record()
+    expected = logging.Formatter().formatTime(record)
+    formatter = JsonFormatter()
+    assert formatter.formatTime(record) == expected
+    assert formatter.formatTime(record) == expected
+
+
+@pytest.mark.parametrize("datefmt", [None, "%H:%M:%S"])
+def test_hima_formatter_time_matches_stdlib(datefmt: str) -> None:
+    """
+    Test that the shared cache matches logging.Formatter across seconds,
+    for the default format and a strftime datefmt.
+
+    Args:
+        datefmt (str): Date format, or None for the default.
+    """
+    formatter = HimaFormatter(datefmt=datefmt)
+    stdlib = logging.Formatter(datefmt=datefmt)
+    record = _record()
+    for offset in (0.0, 0.25, 1.5, 3600.0):
+        record.created = 1700000000.0 + offset
+        record.msecs = int(offset % 1 * 1000) + 0.0
+        assert formatter.format(record) == stdlib.format(record)
+
+
+def test_timestamp_cache_is_shared() -> None:
+    """
+    Test that formatters with the same time settings share one cache and
+    follow a reassigned converter.
+    """
+    record = _record()
+    formatters = [
+        HimaFormatter(datefmt="iso8601"),
+        JsonFormatter(datefmt="iso8601"),
+        ColorFormatter(datefmt="iso8601"),
+    ]
+    for formatter in formatters:
+        formatter.formatTime(record, "iso8601")
+    assert {id(formatter._timestamps) for formatter in formatters} == {
+        id(get_timestamp_cache("iso8601"))
+    }
+    formatter = formatters[0]
+    formatter.converter = time.gmtime
+    assert formatter.formatTime(record, "iso8601").endswith("+00:00")
+    assert formatter._timestamps is get_timestamp_cache("iso8601", time.gmtime)
+
+
+@pytest.mark.parametrize(
+    "datefmt, expected",
+    [
+        ("iso8601", "2023-11-14T22:13:20.250+00:00"),
+        ("rfc3339", "2023-11-14T22:13:20.250Z"),
+        ("epoch_ns", "1700000000250000000"),
+    ],
+)
+def test_machine_time_formats(datefmt: str, expected: str) -> None:
+    """
+    Test the ISO-8601, RFC 3339 and epoch-nanosecond time formats.
+
+    Args:
+        datefmt (str): Time format name.
+        expected (str): Expected timestamp in UTC.
+    """
+    formatter = JsonFormatter(datefmt=datefmt, fields=["time"])
+    formatter.converter = time.gmtime
+    record = _record()
+    record.created = 1700000000.25
+    record.msecs = 250.0
+    assert json.loads(formatter.format(record)) == {"time": expected}
+
+
+def test_iso8601_local_offset() -> None:
+    """
+    Test that a local ISO-8601 timestamp carries the local UTC offset.
+    """
+    record = _record()
+    expected = (
+        datetime.datetime.fromtimestamp(record.created)
+        .astimezone()
+        .isoformat(timespec="milliseconds")
+    )
+    assert HimaFormatter().formatTime(record, "iso8601") == expected
+
+
+def test_json_formatter_unknown_backend() -> None:
+    """
+    Test that an unknown backend name raises ValueError.
+    """
+    with pytest.raises(ValueError):
+        JsonFormatter(backend="yaml")
+
+
+def test_color_formatter_layout_and_context() -> None:
+    """
+    Test the colorized line layout and the sorted context fields.
+    """
+    from himalog.formatters import ColorFormatter
+
+    formatter = ColorFormatter()
+    record = _record(user="alice", request_id="abc")
+    line = formatter.format(record)
+    assert line.startswith(ColorFormatter.COLORS["WARNING"])
+    assert line.endswith(
+        "[WARNING ] fmt            : hello world request_id=abc user=alice"
+        + ColorFormatter.RESET
+    )
+
+
+def test_color_formatter_skips_colors_off_tty() -> None:
+    """
+    Test that colorize=None disables ANSI codes for a non-TTY stream.
+    """
+    import io
+
+    from himalog.formatters import ColorFormatter
+
+    formatter = ColorFormatter(colorize=None, stream=io.StringIO())
+    assert "\033[" not in formatter.format(_record())
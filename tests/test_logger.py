@@ -116,3 +116,71 @@ def test_contextual_logging(caplog: LogCaptureFixture) -> None:
     with caplog.at_level(logging.INFO):
         logger.info("context test")
     assert any("context test" in m for m in caplog.messages)
+
+
+def test_disabled_level_fast_path() -> None:
+    """
+    Test that levels below every handler's level are rejected up front and
+    that the cached threshold follows handler and level changes.
+    """
+    from himalog.core import HimaLog
+
+    hima_log = HimaLog("test_disabled_level_fast_path", level="DEBUG")
+    logger = hima_log.get_logger()
+    logger.propagate = False
+    warning_handler = logging.NullHandler()
+    warning_handler.setLevel(logging.WARNING)
+    logger.addHandler(warning_handler)
+    assert not logger.isEnabledFor(logging.DEBUG)
+    assert logger.isEnabledFor(logging.WARNING)
+
+    debug_handler = logging.NullHandler()
+    logger.addHandler(debug_handler)
+    assert logger.isEnabledFor(logging.DEBUG)
+
+    logger.removeHandler(debug_handler)
+    assert not logger.isEnabledFor(logging.DEBUG)
+
+    hima_log.set_level("ERROR")
+    assert not logger.isEnabledFor(logging.WARNING)
+
+
+def test_disabled_level_follows_ancestor_handlers() -> None:
+    """
+    Test that a rejection depending on a plain ancestor (here the root
+    logger) is cached, that a handler added there (as basicConfig or
+    caplog would) is seen without refreshing the cache, and that the root
+    logger keeps its class.
+    """
+    from himalog.core import HimaLog, HimaLogger
+
+    root = logging.getLogger()
+    logger = HimaLog("test_ancestor_handlers", level="DEBUG").get_logger()
+    info_handler = logging.NullHandler()
+    info_handler.setLevel(logging.INFO)
+    logger.addHandler(info_handler)
+    saved, saved_level = root.handlers[:], root.level
+    root.handlers = []
+    try:
+        assert type(HimaLog(None).get_logger()) is not HimaLogger
+        assert not logger.isEnabledFor(logging.DEBUG)
+        cache = logger._cache  # type: ignore[attr-defined]
+        assert cache[logging.DEBUG] is False
+        received: list[logging.LogRecord] = []
+
+        class DebugHandler(logging.Handler):
+            def emit(self, record: logging.LogRecord) -> None:
+                received.append(record)
+
+        root.addHandler(DebugHandler())
+        logger.debug("reaches root")
+        assert [record.getMessage() for record in received] == ["reaches root"]
+
+        logger.propagate = False
+        assert not logger.isEnabledFor(logging.DEBUG)
+        logger.propagate = True
+        assert logger.isEnabledFor(logging.DEBUG)
+    finally:
+        root.handlers = saved
+        root.setLevel(saved_level)
+        logger.removeHandler(info_handler)
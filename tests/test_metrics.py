@@ -0,0 +1,161 @@
+import logging
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from himalog.handlers.multiprocess import SocketShipperHandler
+from himalog.logger import close_logger, get_logger
+from himalog.metrics import (
+    MetricsRegistry,
+    PrometheusExporter,
+    instrument,
+    record_batch,
+    registry,
+)
+
+
+class _FailingHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            raise OSError("sink down")
+        except OSError:
+            self.handleError(record)
+
+
+def _entry(logger: str, handler: str) -> dict[str, object]:
+    for entry in registry.snapshot():
+        if entry["logger"] == logger and entry["handler"] == handler:
+            return entry
+    raise KeyError(handler)
+
+
+def test_get_logger_metrics_snapshot_and_prometheus(tmp_path: Path) -> None:
+    """
+    Test that get_logger(metrics=True) reports queue counters and per-sink
+    emit latency, in snapshots and in the Prometheus text format.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    logger = get_logger(
+        name="test_metrics_pipeline",
+        console=False,
+        file=str(tmp_path / "app.log"),
+        use_queue=True,
+        metrics=True,
+    )
+    try:
+        for i in range(10):
+            logger.info("record %d", i)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            emitted = _entry("test_metrics_pipeline", "file")["emit_seconds"]
+            if emitted["count"] == 10:  # type: ignore[index]
+                break
+            time.sleep(0.01)
+        queue = _entry("test_metrics_pipeline", "queue")
+        assert queue["enqueued"] == 10
+        assert queue["dropped"] == 0
+        assert queue["emit_seconds"]["count"] == 10  # type: ignore[index]
+        text = registry.render_prometheus()
+        labels = 'logger="test_metrics_pipeline",handler="queue"'
+        assert f"himalog_enqueued_total{{{labels}}} 10" in text
+        assert "# TYPE himalog_emit_seconds histogram" in text
+        assert (
+            'himalog_emit_seconds_count{logger="test_metrics_pipeline",'
+            'handler="file"} 10' in text
+        )
+    finally:
+        close_logger("test_metrics_pipeline")
+    assert not any(
+        e["logger"] == "test_metrics_pipeline" for e in registry.snapshot()
+    )
+
+
+def test_failures_and_batch_sizes(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that failures reaching handleError are counted and batch sizes
+    land in their buckets.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Pytest monkeypatch fixture.
+    """
+    monkeypatch.setattr(logging, "raiseExceptions", False)
+    handler = _FailingHandler()
+    metrics = instrument(handler, "test_metrics", "failing")
+    try:
+        handler.handle(logging.makeLogRecord({"msg": "lost"}))
+        record_batch(handler, 3)
+        record_batch(handler, 700)
+        assert metrics.failed == 1
+        batches = metrics.batch_size.snapshot()
+        assert batches["count"] == 2
+        assert batches["buckets"]["5"] == 1
+        assert batches["buckets"]["1000"] == 2
+        assert 'himalog_failed_total{logger="test_metrics",' in (
+            registry.render_prometheus()
+        )
+    finally:
+        registry.remove(handler)
+
+
+def test_lost_records_count_as_failures(tmp_path: Path) -> None:
+    """
+    Test that records a shipper gives up on are counted as failures and
+    that its sent/lost stats are exported as counters.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    handler = SocketShipperHandler(str(tmp_path / "missing.sock"))
+
+    def encode(batch: list[logging.LogRecord]) -> bytes:
+        raise TypeError("unencodable")
+
+    setattr(handler, "encode", encode)
+    metrics = instrument(handler, "test_metrics_lost", "shipper")
+    try:
+        for i in range(3):
+            handler.handle(logging.makeLogRecord({"msg": f"lost {i}"}))
+        deadline = time.monotonic() + 5
+        while handler.lost < 3 or metrics.failed < 3:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert (handler.lost, metrics.failed) == (3, 3)
+        text = registry.render_prometheus()
+        assert "# TYPE himalog_lost_total counter" in text
+        assert "# TYPE himalog_sent_total counter" in text
+    finally:
+        registry.remove(handler)
+        handler.close()
+
+
+def test_prometheus_exporter_port_and_file(tmp_path: Path) -> None:
+    """
+    Test that the exporter serves /metrics on a local port and writes the
+    same text to a file.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    metrics = MetricsRegistry()
+    handler = logging.NullHandler()
+    metrics.add(instrument(handler, "test_exporter", "null"))
+    registry.remove(handler)
+    handler.handle(logging.makeLogRecord({"msg": "x"}))
+
+    served = PrometheusExporter(port=0, metrics=metrics).start()
+    try:
+        url = f"http://127.0.0.1:{served.port}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode("utf-8")
+    finally:
+        served.stop(5)
+    assert 'himalog_emit_seconds_count{logger="test_exporter"' in body
+
+    path = tmp_path / "himalog.prom"
+    written = PrometheusExporter(path=str(path), metrics=metrics).start()
+    written.stop(5)
+    assert path.read_text() == metrics.render_prometheus()
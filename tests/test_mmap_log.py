@@ -0,0 +1,114 @@
+import json
+import logging
+from pathlib import Path
+
+import pytest
+
+from himalog.handlers.mmap_log import (
+    MmapLogHandler,
+    read_json,
+    read_records,
+    segment_indexes,
+)
+
+from .conftest import MakeLogger
+
+
+def test_mmap_log_round_trip(tmp_path: Path, make_logger: MakeLogger) -> None:
+    """
+    Test that records decode with their templates, args and exception text.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    prefix = str(tmp_path / "audit")
+    handler = MmapLogHandler(prefix, segment_size=4096)
+    logger = make_logger("test_mmap_round_trip", handler)
+    logger.info("user %s did %d things (%.1f)", "alice", 3, 2.5)
+    logger.warning("mapping %(k)s", {"k": [1, (2, None)]})
+    logger.debug("big %d", 2**80)
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logger.exception("failed")
+    handler.close()
+    records = list(read_records(prefix))
+    assert [r.getMessage() for r in records] == [
+        "user alice did 3 things (2.5)",
+        "mapping [1, (2, None)]",
+        f"big {2**80}",
+        "failed",
+    ]
+    assert records[1].levelname == "WARNING"
+    assert records[0].name == "test_mmap_round_trip"
+    assert "RuntimeError: boom" in (records[3].exc_text or "")
+    line = json.loads(next(read_json(prefix)))
+    assert line["message"] == "user alice did 3 things (2.5)"
+
+
+def test_mmap_log_rolls_segments(
+    tmp_path: Path, make_logger: MakeLogger
+) -> None:
+    """
+    Test that a full segment rolls over and every segment decodes alone.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    prefix = str(tmp_path / "roll")
+    handler = MmapLogHandler(prefix, segment_size=512)
+    logger = make_logger("test_mmap_roll", handler)
+    for i in range(100):
+        logger.info("event %d", i)
+    logger.info("x" * 2000)
+    handler.close()
+    assert len(segment_indexes(prefix)) > 2
+    messages = [r.getMessage() for r in read_records(prefix)]
+    assert messages == [f"event {i}" for i in range(100)] + ["x" * 2000]
+    # A new handler continues after the last segment.
+    handler = MmapLogHandler(prefix, segment_size=512)
+    make_logger("test_mmap_roll", handler).info("again")
+    handler.close()
+    assert list(read_records(prefix))[-1].getMessage() == "again"
+
+
+class _Unprintable:
+    def __str__(self) -> str:
+        raise ValueError("no text")
+
+
+def test_mmap_log_failed_encode_defines_no_strings(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, make_logger: MakeLogger
+) -> None:
+    """
+    Test that a record whose args fail to encode does not leave interned
+    ids that later records reference without a definition.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        monkeypatch (pytest.MonkeyPatch): Pytest monkeypatch fixture.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    monkeypatch.setattr(logging, "raiseExceptions", False)
+    prefix = str(tmp_path / "partial")
+    handler = MmapLogHandler(prefix, segment_size=4096)
+    logger = make_logger("test_mmap_failed_encode", handler)
+    logger.info("first")
+    logger.info("value %s", _Unprintable())
+    logger.info("value %s", "ok")
+    handler.close()
+    records = list(read_records(prefix))
+    assert [r.getMessage() for r in records] == ["first", "value ok"]
+
+    # A record referencing an id that was never defined marks the segment
+    # as corrupt.
+    handler = MmapLogHandler(prefix, segment_size=4096)
+    logger = make_logger("test_mmap_undefined_id", handler)
+    logger.info("defined")
+    handler._strings["never written"] = len(handler._strings)
+    logger.info("never written")
+    handler.close()
+    with pytest.raises(ValueError, match="Undefined string id 2"):
+        list(read_records(prefix))
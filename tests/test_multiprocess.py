@@ -0,0 +1,110 @@
+import logging
+import multiprocessing
+import os
+import stat
+import time
+from pathlib import Path
+from typing import Callable
+
+from himalog.handlers.multiprocess import LogAggregator, SocketShipperHandler
+
+from .conftest import ListHandler
+
+
+def _produce(path: str, worker: int, count: int) -> None:
+    handler = SocketShipperHandler(path, batch_size=16)
+    logger = logging.getLogger(f"test_multiprocess_worker_{worker}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    for i in range(count):
+        logger.info("worker %d record %d", worker, i)
+    handler.close()
+
+
+def _wait_for(predicate: Callable[[], bool], timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_aggregator_receives_from_processes(tmp_path: Path) -> None:
+    """
+    Test that records from several processes reach the aggregator's handler.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    path = str(tmp_path / "agg.sock")
+    sink = ListHandler()
+    aggregator = LogAggregator(path, sink)
+    aggregator.start()
+    ctx = multiprocessing.get_context("fork")
+    procs = [
+        ctx.Process(target=_produce, args=(path, w, 50)) for w in range(3)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(10)
+    _wait_for(lambda: aggregator.received == 150)
+    aggregator.stop(5)
+    messages = {r.getMessage() for r in sink.records}
+    assert len(messages) == 150
+    assert "worker 2 record 49" in messages
+
+
+def test_shipper_reconnects_when_aggregator_starts_late(
+    tmp_path: Path,
+) -> None:
+    """
+    Test that records logged before the aggregator is up are delivered.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    path = str(tmp_path / "late.sock")
+    handler = SocketShipperHandler(path, batch_size=4, max_backoff=0.05)
+    record = logging.makeLogRecord(
+        {
+            "msg": "early %s",
+            "args": ("bird",),
+            "levelno": logging.INFO,
+            "context": {"k": "v"},
+        }
+    )
+    handler.handle(record)
+    time.sleep(0.1)
+    sink = ListHandler()
+    aggregator = LogAggregator(path, sink)
+    aggregator.start()
+    _wait_for(lambda: aggregator.received == 1)
+    handler.close()
+    aggregator.stop(5)
+    assert sink.records[0].getMessage() == "early bird"
+    assert getattr(sink.records[0], "context") == {"k": "v"}
+    assert handler.stats()["sent"] == 1
+
+
+def test_aggregator_socket_is_private_without_touching_umask(
+    tmp_path: Path,
+) -> None:
+    """
+    Test that the socket is created with mode 0600 and the process umask
+    is left alone.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    path = str(tmp_path / "private.sock")
+    previous = os.umask(0o022)
+    try:
+        aggregator = LogAggregator(path)
+        aggregator.bind()
+        try:
+            assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+            assert os.umask(0o022) == 0o022
+        finally:
+            aggregator.stop(5)
+    finally:
+        os.umask(previous)
@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from himalog import config as config_module
+from himalog.config import load_config
+from himalog.logger import close_logger, get_logger
+from himalog.pipeline import compile_pipeline, config_watcher
+
+
+def _write_config(path: Path, data: dict[str, object], mtime: int) -> None:
+    path.write_text(json.dumps(data))
+    # Distinct mtimes, so the change is seen even within one clock tick.
+    os.utime(path, (mtime, mtime))
+
+
+def test_get_logger_leaves_no_helper_loggers(tmp_path: Path) -> None:
+    """
+    Test that building handlers does not register helper loggers.
+    """
+    logger = get_logger(
+        name="test_pipeline_helpers", file=str(tmp_path / "app.log")
+    )
+    names = logging.Logger.manager.loggerDict
+    assert "test_pipeline_helpers-console" not in names
+    assert "test_pipeline_helpers-file" not in names
+    assert len(logger.handlers) == 2
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_load_config_parses_once_per_change(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Test that load_config reuses the parsed file until it changes, and
+    that callers get independent copies.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        monkeypatch (pytest.MonkeyPatch): Pytest monkeypatch fixture.
+    """
+    parses = []
+    parse = config_module._parse_config
+
+    def counting_parse(path: str) -> object:
+        parses.append(path)
+        return parse(path)
+
+    monkeypatch.setattr(config_module, "_parse_config", counting_parse)
+    path = tmp_path / "logging.json"
+    _write_config(path, {"context": {"a": 1}}, 1_000_000)
+    first = load_config(str(path))
+    first["context"]["a"] = 2
+    assert load_config(str(path)) == {"context": {"a": 1}}
+    assert len(parses) == 1
+    _write_config(path, {"context": {"a": 3}}, 1_000_100)
+    assert load_config(str(path)) == {"context": {"a": 3}}
+    assert len(parses) == 2
+
+
+def test_hot_reload_swaps_pipeline(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Test that a changed config file swaps in a new pipeline and closes the
+    old one after the grace period.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        monkeypatch (pytest.MonkeyPatch): Pytest monkeypatch fixture.
+    """
+    monkeypatch.setattr(config_watcher, "grace", 0.0)
+    first, second = tmp_path / "first.log", tmp_path / "second.log"
+    path = tmp_path / "logging.json"
+    _write_config(
+        path,
+        {"console": False, "file": str(first), "fmt": "%(message)s"},
+        1_000_000,
+    )
+    logger = get_logger(
+        name="test_pipeline_reload", config_path=str(path), reload_config=True
+    )
+    try:
+        logger.warning("before")
+        old_handler = logger.handlers[0]
+        _write_config(
+            path,
+            {"console": False, "file": str(second), "fmt": "%(message)s"},
+            1_000_100,
+        )
+        config_watcher.check()
+        logger.warning("after")
+        assert logger.handlers[0] is not old_handler
+        assert len(logger.handlers) == 1
+        assert len(logger.filters) == 1
+        config_watcher.check()
+        assert first.read_text() == "before\n"
+        assert second.read_text() == "after\n"
+    finally:
+        close_logger("test_pipeline_reload")
+
+
+def test_hot_reload_drops_sink_removed_from_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Test that a sink removed from the config file is detached on reload,
+    falling back to the caller's arguments rather than the file's old
+    values.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        monkeypatch (pytest.MonkeyPatch): Pytest monkeypatch fixture.
+    """
+    monkeypatch.setattr(config_watcher, "grace", 0.0)
+    path = tmp_path / "logging.json"
+    _write_config(
+        path, {"console": False, "file": str(tmp_path / "a.log")}, 1_000_000
+    )
+    logger = get_logger(
+        name="test_pipeline_reload_removed",
+        config_path=str(path),
+        reload_config=True,
+    )
+    try:
+        assert [type(h) for h in logger.handlers] == [logging.FileHandler]
+        _write_config(path, {"console": True}, 1_000_100)
+        config_watcher.check()
+        assert not any(
+            isinstance(h, logging.FileHandler) for h in logger.handlers
+        )
+        assert len(logger.handlers) == 1
+    finally:
+        close_logger("test_pipeline_reload_removed")
+
+
+def test_compile_pipeline_queue_mode_stops_cleanly(tmp_path: Path) -> None:
+    """
+    Test that a queue-mode pipeline drains into its sinks on stop.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    log_file = tmp_path / "queued.log"
+    pipeline = compile_pipeline(
+        {"console": False, "file": str(log_file), "use_queue": True}
+    )
+    logger = logging.Logger("test_pipeline_queue")
+    pipeline.attach(logger)
+    logger.warning("queued")
+    pipeline.stop()
+    assert "queued" in log_file.read_text()
+
+
+def test_get_logger_is_idempotent(tmp_path: Path) -> None:
+    """
+    Test that repeated calls with one configuration reuse the pipeline, and
+    that a changed configuration replaces it and stops its workers.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    options = {
+        "name": "test_pipeline_registry",
+        "console": False,
+        "file": str(tmp_path / "app.log"),
+        "use_queue": True,
+        "context": {"service": "api"},
+    }
+    try:
+        logger = get_logger(**options)  # type: ignore[arg-type]
+        handlers, threads = list(logger.handlers), threading.active_count()
+        for _ in range(5):
+            assert get_logger(**options) is logger  # type: ignore[arg-type]
+        assert logger.handlers == handlers
+        assert len(logger.filters) == 1
+        assert threading.active_count() == threads
+
+        options["file"] = str(tmp_path / "other.log")
+        get_logger(**options)  # type: ignore[arg-type]
+        assert len(logger.handlers) == 1
+        assert logger.handlers[0] is not handlers[0]
+        assert len(logger.filters) == 1
+        assert threading.active_count() == threads
+    finally:
+        close_logger("test_pipeline_registry")
+    assert logger.handlers == []
+    assert logger.filters == []
+
+
+def test_handler_and_parser_imports_are_deferred() -> None:
+    """
+    Test that importing himalog.logger and building a console logger do not
+    import the handler and config parser modules a configuration does not
+    use.
+    """
+    code = (
+        "import sys\n"
+        "from himalog.logger import get_logger\n"
+        "get_logger(name='lazy')\n"
+        "deferred = ['logging.handlers', 'smtplib', 'http.client', 'yaml',"
+        " 'toml']\n"
+        "print(','.join(m for m in deferred if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
@@ -0,0 +1,243 @@
+import logging
+import threading
+
+import pytest
+
+from himalog.formatters import HimaFormatter
+from himalog.handlers.dedup import DedupHandler
+from himalog.handlers.queueing import (
+    FanoutQueueListener,
+    OverflowQueue,
+    OverflowQueueHandler,
+)
+
+from .conftest import ListHandler
+
+
+def _record(msg: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 0, msg, None, None)
+
+
+def test_drop_newest_counts_without_raising() -> None:
+    """
+    Test that a full drop_newest queue keeps the oldest records.
+    """
+    q = OverflowQueue(2, policy="drop_newest")
+    results = [q.offer(_record(f"m{i}")) for i in range(4)]
+    assert results == [True, True, False, False]
+    assert [q.get_nowait().msg for _ in range(2)] == ["m0", "m1"]
+    assert q.stats() == {"enqueued": 2, "dropped": 2, "depth": 0}
+
+
+def test_drop_oldest_acts_as_ring_buffer() -> None:
+    """
+    Test that drop_oldest evicts the oldest queued records.
+    """
+    q = OverflowQueue(2, policy="drop_oldest")
+    for i in range(4):
+        assert q.offer(_record(f"m{i}"))
+    assert [q.get_nowait().msg for _ in range(2)] == ["m2", "m3"]
+    assert q.stats()["dropped"] == 2
+
+
+def test_sample_never_drops_errors() -> None:
+    """
+    Test that sample policy drops low-level records but keeps errors.
+    """
+    q = OverflowQueue(2, policy="sample")
+    q.offer(_record("info-1"))
+    q.offer(_record("info-2"))
+    assert not q.offer(_record("info-3"))
+    assert q.offer(_record("error", logging.ERROR))
+    assert [q.get_nowait().msg for _ in range(2)] == ["info-2", "error"]
+
+
+def test_sample_evicts_below_sample_level_only() -> None:
+    """
+    Test that an error at a full sample queue evicts the oldest record
+    below sample_level, and overflows maxsize rather than evict an error.
+    """
+    q = OverflowQueue(2, policy="sample")
+    q.offer(_record("error-1", logging.ERROR))
+    q.offer(_record("info"))
+    assert q.offer(_record("error-2", logging.ERROR))
+    assert q.offer(_record("error-3", logging.CRITICAL))
+    assert q.stats() == {"enqueued": 4, "dropped": 1, "depth": 3}
+    assert [q.get_nowait().msg for _ in range(3)] == [
+        "error-1",
+        "error-2",
+        "error-3",
+    ]
+
+
+def test_block_times_out_and_drops() -> None:
+    """
+    Test that block policy gives up after block_timeout.
+    """
+    q = OverflowQueue(1, policy="block", block_timeout=0.01)
+    assert q.offer(_record("first"))
+    assert not q.offer(_record("second"))
+    assert q.stats()["dropped"] == 1
+
+
+def test_unknown_policy_is_rejected() -> None:
+    """
+    Test that an unsupported overflow policy raises ValueError.
+    """
+    with pytest.raises(ValueError):
+        OverflowQueue(1, policy="explode")
+
+
+class _CountingFormatter(logging.Formatter):
+    calls = 0
+
+    def format(self, record: logging.LogRecord) -> str:
+        type(self).calls += 1
+        return super().format(record)
+
+
+def test_fanout_slow_sink_does_not_stall_others() -> None:
+    """
+    Test that a blocked sink only fills its own queue, each formatter runs
+    once per record, and per-sink stats are reported.
+    """
+    gate = threading.Event()
+    fast, slow = ListHandler(), ListHandler(gate)
+    formatter = _CountingFormatter("%(levelname)s %(message)s")
+    fast.setFormatter(formatter)
+    slow.setFormatter(formatter)
+    q = OverflowQueue(100)
+    listener = FanoutQueueListener(q, fast, slow, sink_queue_size=20)
+    handler = OverflowQueueHandler(q, listener=listener)
+    logger = logging.getLogger("test_fanout_slow_sink")
+    logger.propagate = False
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        for i in range(10):
+            logger.warning("m%d", i)
+        for _ in range(100):
+            if len(fast.lines) == 10:
+                break
+            threading.Event().wait(0.01)
+        assert fast.lines == [f"WARNING m{i}" for i in range(10)]
+        assert slow.lines == []
+        sinks = handler.stats()["sinks"]
+        slow_stats = [
+            v for k, v in sinks.items() if k.endswith(f"{id(slow):x}")
+        ]
+        assert slow_stats[0]["handled"] == 0
+        assert slow_stats[0]["depth"] > 0
+    finally:
+        gate.set()
+        handler.close()
+        logger.removeHandler(handler)
+    assert _CountingFormatter.calls == 10
+    assert slow.lines == fast.lines
+    assert all(s["latency_max"] >= 0 for s in listener.stats().values())
+
+
+def test_fanout_groups_by_class() -> None:
+    """
+    Test that group='class' puts handlers of one class in a single sink.
+    """
+    a, b = ListHandler(), ListHandler()
+    wrapped = DedupHandler(ListHandler())
+    listener = FanoutQueueListener(
+        OverflowQueue(), a, b, wrapped, group="class"
+    )
+    assert list(listener.stats()) == ["ListHandler"]
+    with pytest.raises(ValueError):
+        FanoutQueueListener(OverflowQueue(), a, group="nope")
+
+
+def test_fanout_shares_equivalent_plain_formatters() -> None:
+    """
+    Test that handlers with equal HimaFormatter format strings share one
+    formatter, as plain logging.Formatter ones do.
+    """
+    a, b = ListHandler(), ListHandler()
+    a.setFormatter(HimaFormatter("%(message)s"))
+    b.setFormatter(HimaFormatter("%(message)s"))
+    FanoutQueueListener(OverflowQueue(), a, b)
+    assert a.formatter is b.formatter
+
+
+def test_fanout_cache_stays_off_the_record() -> None:
+    """
+    Test that text pre-formatted by the dispatcher is reused by the sinks
+    without being stored on the record handlers see.
+    """
+    handler = ListHandler()
+    handler.setFormatter(_CountingFormatter("%(message)s"))
+    _CountingFormatter.calls = 0
+    q = OverflowQueue(10)
+    listener = FanoutQueueListener(q, handler)
+    queue_handler = OverflowQueueHandler(q, listener=listener)
+    listener.start()
+    queue_handler.handle(_record("cached"))
+    queue_handler.close()
+    assert handler.lines == ["cached"]
+    assert _CountingFormatter.calls == 1
+    attributes = handler.records[0].__dict__
+    assert not any(key.startswith("_himalog") for key in attributes)
+
+
+class _ThreadRecordingFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("%(message)s")
+        self.threads: list[str] = []
+
+    def format(self, record: logging.LogRecord) -> str:
+        self.threads.append(threading.current_thread().name)
+        return super().format(record)
+
+
+class _Mutable:
+    def __init__(self) -> None:
+        self.value = "before"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+def test_defer_format_formats_on_consumer_with_snapshots() -> None:
+    """
+    Test that deferred records are formatted on the listener thread and
+    that later mutation of arguments does not change the message.
+    """
+    sink = ListHandler()
+    formatter = _ThreadRecordingFormatter()
+    sink.setFormatter(formatter)
+    q = OverflowQueue(100)
+    listener = FanoutQueueListener(q, sink)
+    handler = OverflowQueueHandler(q, listener=listener, defer_format=True)
+    logger = logging.getLogger("test_defer_format")
+    logger.propagate = False
+    logger.addHandler(handler)
+    items = [1, 2]
+    obj = _Mutable()
+    logger.warning("items=%s obj=%s n=%d", items, obj, 3)
+    logger.warning("plain %(k)s", {"k": items})
+    items.append(3)
+    obj.value = "after"
+    listener.start()
+    handler.close()
+    logger.removeHandler(handler)
+    assert sink.lines == ["items=[1, 2] obj=before n=3", "plain [1, 2]"]
+    assert formatter.threads == ["himalog-fanout", "himalog-fanout"]
+
+
+def test_defer_format_keeps_immutable_records() -> None:
+    """
+    Test that records with only immutable args are enqueued without a copy.
+    """
+    q = OverflowQueue(10)
+    handler = OverflowQueueHandler(q, defer_format=True)
+    record = _record("n=%d s=%s")
+    record.args = (1, ("a", None))
+    assert handler.prepare(record) is record
+    record.args = ([1],)
+    prepared = handler.prepare(record)
+    assert prepared is not record
+    assert prepared.args == ([1],) and prepared.args[0] is not record.args[0]
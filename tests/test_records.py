@@ -0,0 +1,79 @@
+import logging
+import sys
+
+import pytest
+
+from himalog import records
+from himalog.handlers.memory import CompactMemoryHandler
+from himalog.records import CompactRecord, compact, expand
+
+
+def _make_record() -> logging.LogRecord:
+    logger = logging.getLogger("test_records")
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        exc_info = sys.exc_info()
+    return logger.makeRecord(
+        "test_records",
+        logging.WARNING,
+        __file__,
+        12,
+        "value %s",
+        ("x",),
+        exc_info,
+        func="fn",
+        extra={"request_id": "r1"},
+    )
+
+
+def test_compact_round_trip_preserves_attributes() -> None:
+    """
+    Test that a compact record converts back to an equivalent LogRecord.
+    """
+    record = _make_record()
+    record.context = {"user": "u1"}
+    restored = expand(compact(record))
+    assert isinstance(restored, logging.LogRecord)
+    assert vars(restored) == vars(record)
+    assert restored.getMessage() == "value x"
+    assert not hasattr(compact(record), "__dict__")
+    assert expand(None) is None
+
+
+def test_shared_ids_are_capped(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that thread ids stop being interned once the cache is full, while
+    the ids of compacted records stay correct.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Pytest monkeypatch fixture.
+    """
+    monkeypatch.setattr(records, "_ids", {})
+    for thread in range(1, records._CACHE_LIMIT + 100):
+        record = _make_record()
+        record.thread = thread
+        assert compact(record).thread == thread
+    assert len(records._ids) == records._CACHE_LIMIT
+
+
+def test_compact_memory_handler_flushes_records() -> None:
+    """
+    Test that the memory handler buffers compact records and flushes
+    rebuilt LogRecords to its target.
+    """
+    received: list[logging.LogRecord] = []
+
+    class _Target(logging.Handler):
+        def emit(self, record: logging.LogRecord) -> None:
+            received.append(record)
+
+    handler = CompactMemoryHandler(
+        10, flushLevel=logging.ERROR, target=_Target()
+    )
+    handler.handle(_make_record())
+    assert isinstance(handler.buffer[0], CompactRecord)
+    assert not received
+    handler.flush()
+    assert received[0].request_id == "r1"
+    assert received[0].levelname == "WARNING"
@@ -0,0 +1,138 @@
+import gzip
+import os
+from pathlib import Path
+
+import pytest
+
+from himalog.handlers.rotation import (
+    CompressingRotatingFileHandler,
+    CompressingTimedRotatingFileHandler,
+    compressor,
+)
+
+from .conftest import MakeLogger
+
+
+def test_size_rotation_compresses_and_keeps_backup_count(
+    tmp_path: Path, make_logger: MakeLogger
+) -> None:
+    """
+    Test that rotated segments are gzipped in the background and pruned to
+    backup_count.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    log_file = tmp_path / "app.log"
+    handler = CompressingRotatingFileHandler(
+        str(log_file), maxBytes=100, backupCount=2, compress="gzip"
+    )
+    logger = make_logger("test_rotation_gzip", handler, fmt="%(message)s")
+    for i in range(30):
+        logger.info("message number %02d", i)
+    compressor.wait()
+    handler.close()
+    segments = handler.segments()
+    assert len(segments) == 2
+    assert all(s.endswith(".gz") for s in segments)
+    newest = gzip.decompress(Path(segments[0]).read_bytes()).decode()
+    last_rotated = newest.splitlines()[-1]
+    assert log_file.read_text().splitlines()[0] == (
+        f"message number {int(last_rotated[-2:]) + 1:02d}"
+    )
+
+
+def test_retention_by_total_bytes(
+    tmp_path: Path, make_logger: MakeLogger
+) -> None:
+    """
+    Test that max_total_bytes caps the size of kept segments.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    log_file = tmp_path / "bytes.log"
+    handler = CompressingRotatingFileHandler(
+        str(log_file), maxBytes=100, max_total_bytes=250
+    )
+    logger = make_logger("test_rotation_bytes", handler, fmt="%(message)s")
+    for i in range(50):
+        logger.info("message number %02d", i)
+    compressor.wait()
+    handler.close()
+    segments = handler.segments()
+    assert segments
+    assert sum(os.path.getsize(s) for s in segments) <= 250
+
+
+def test_timed_rotation_prunes_by_age(
+    tmp_path: Path, make_logger: MakeLogger
+) -> None:
+    """
+    Test that timed rotation hands off segments and max_age drops old ones.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    log_file = tmp_path / "timed.log"
+    stale = tmp_path / "timed.log.2000-01-01.gz"
+    stale.write_bytes(b"")
+    os.utime(stale, (0, 0))
+    handler = CompressingTimedRotatingFileHandler(
+        str(log_file), when="midnight", max_age=3600, compress="gzip"
+    )
+    logger = make_logger("test_rotation_timed", handler, fmt="%(message)s")
+    logger.info("before")
+    handler.rolloverAt = 0
+    logger.info("after")
+    compressor.wait()
+    handler.close()
+    segments = handler.segments()
+    assert not stale.exists()
+    assert len(segments) == 1
+    assert gzip.decompress(Path(segments[0]).read_bytes()) == b"before\n"
+    assert log_file.read_text() == "after\n"
+
+
+def test_retention_keeps_sibling_files(
+    tmp_path: Path, make_logger: MakeLogger
+) -> None:
+    """
+    Test that retention only prunes segments the handler names itself and
+    leaves other files sharing the log file's prefix alone.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    log_file = tmp_path / "app.log"
+    siblings = [tmp_path / "app.log.err", tmp_path / "app.log.pid"]
+    stale = tmp_path / "app.log.1"
+    for path in (*siblings, stale):
+        path.write_text("x")
+        os.utime(path, (0, 0))
+    handler = CompressingRotatingFileHandler(
+        str(log_file), maxBytes=100, backupCount=1, max_age=3600
+    )
+    logger = make_logger("test_rotation_siblings", handler, fmt="%(message)s")
+    for i in range(30):
+        logger.info("message number %02d", i)
+    compressor.wait()
+    handler.close()
+    assert all(path.exists() for path in siblings)
+    assert not stale.exists()
+    assert len(handler.segments()) == 1
+
+
+def test_unknown_compression_is_rejected(tmp_path: Path) -> None:
+    """
+    Test that an unsupported compression name raises ValueError.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    with pytest.raises(ValueError):
+        CompressingRotatingFileHandler(str(tmp_path / "x.log"), compress="lz9")
@@ -0,0 +1,90 @@
+import logging
+
+from himalog.handlers.console import add_console_handler
+from himalog.sampling import RateLimitFilter, add_rate_limit_filter
+
+from .conftest import ListHandler, MakeLogger
+
+
+def test_rate_limit_per_call_site_and_summary(
+    list_handler: ListHandler, make_logger: MakeLogger
+) -> None:
+    """
+    Test that each call site gets its own bucket, errors are exempt and a
+    summary reports the suppressed count.
+
+    Args:
+        list_handler (ListHandler): Handler collecting the records.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    rate_filter = add_rate_limit_filter(
+        list_handler, rate=0.001, burst=3, summary_interval=3600
+    )
+    logger = make_logger("test_rate_limit_site", list_handler)
+    for i in range(100):
+        logger.warning("noisy %d", i)
+        logger.info("other %d", i)
+    logger.error("still logged")
+    assert len(list_handler.records) == 3 + 3 + 1
+    assert rate_filter.stats() == {"passed": 6, "suppressed": 194, "sites": 2}
+    rate_filter.flush_summaries()
+    summaries = list_handler.records[7:]
+    assert sorted(r.__dict__["suppressed"] for r in summaries) == [97, 97]
+    assert {r.levelno for r in summaries} == {logging.WARNING}
+    assert "97 records suppressed from" in summaries[0].getMessage()
+    rate_filter.flush_summaries()
+    assert len(list_handler.records) == 9
+
+
+def test_sampling_by_level(
+    list_handler: ListHandler, make_logger: MakeLogger
+) -> None:
+    """
+    Test that a level with probability 0 is dropped and others pass.
+
+    Args:
+        list_handler (ListHandler): Handler collecting the records.
+        make_logger (MakeLogger): Logger factory fixture.
+    """
+    list_handler.addFilter(RateLimitFilter(rate=None, sample={"DEBUG": 0.0}))
+    logger = make_logger("test_rate_limit_sample", list_handler)
+    for i in range(10):
+        logger.debug("dropped %d", i)
+        logger.info("kept %d", i)
+    assert [r.levelno for r in list_handler.records] == [logging.INFO] * 10
+
+
+def test_call_sites_bounded_by_lru(list_handler: ListHandler) -> None:
+    """
+    Test that the site table never exceeds max_sites and evicted counts
+    are still summarized.
+
+    Args:
+        list_handler (ListHandler): Handler collecting the records.
+    """
+    rate_filter = add_rate_limit_filter(
+        list_handler, rate=0.001, burst=1, max_sites=2, summary_interval=3600
+    )
+    for lineno in range(10):
+        for _ in range(2):
+            list_handler.handle(
+                logging.LogRecord(
+                    "lru", logging.INFO, "site.py", lineno, "x", (), None
+                )
+            )
+    assert rate_filter.stats()["sites"] == 2
+    rate_filter.flush_summaries()
+    assert sum(getattr(r, "suppressed", 0) for r in list_handler.records) == 10
+
+
+def test_add_handler_rate_limit_option() -> None:
+    """
+    Test that the add_* helpers attach the filter after filter_func.
+    """
+    logger = logging.getLogger("test_rate_limit_option")
+    add_console_handler(
+        logger, filter_func=lambda r: True, rate_limit={"rate": 5}
+    )
+    handler = logger.handlers[-1]
+    assert isinstance(handler.filters[-1], RateLimitFilter)
+    logger.removeHandler(handler)
@@ -0,0 +1,54 @@
+import logging
+import time
+from pathlib import Path
+
+import pytest
+
+from himalog import shutdown
+from himalog.handlers.async_http import AsyncHTTPHandler
+from himalog.logger import get_logger
+
+
+def test_close_drains_async_handler(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that closing an async handler delivers every queued record.
+    """
+    emitted: list[str] = []
+
+    def slow_emit(self: object, record: logging.LogRecord) -> None:
+        time.sleep(0.01)
+        emitted.append(record.getMessage())
+
+    monkeypatch.setattr("logging.handlers.HTTPHandler.emit", slow_emit)
+    handler = AsyncHTTPHandler("localhost", "/log")
+    for i in range(10):
+        handler.handle(
+            logging.LogRecord("t", logging.INFO, "", 0, f"m{i}", None, None)
+        )
+    handler.close()
+    assert emitted == [f"m{i}" for i in range(10)]
+    assert not handler._thread.is_alive()
+    assert handler not in shutdown.registered()
+
+
+def test_shutdown_drains_queue_listener(tmp_path: Path) -> None:
+    """
+    Test that shutdown flushes records buffered in the queue listener.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    log_file = tmp_path / "queued.log"
+    logger = get_logger(
+        name="test_shutdown_drains_queue_listener",
+        console=False,
+        file=str(log_file),
+        use_queue=True,
+    )
+    for i in range(100):
+        logger.info("queued %d", i)
+    listener = logger.handlers[-1].listener  # type: ignore[attr-defined]
+    assert listener in shutdown.registered()
+    shutdown.shutdown(timeout=5)
+    assert listener not in shutdown.registered()
+    assert log_file.read_text().count("queued") == 100
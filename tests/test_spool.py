@@ -0,0 +1,219 @@
+import json
+import logging
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from himalog.handlers.async_http import AsyncHTTPHandler
+from himalog.handlers.spool import DiskSpool
+from himalog.logger import close_logger, get_logger
+
+
+def test_disk_spool_read_commit_and_reopen(tmp_path: Path) -> None:
+    """
+    Test that payloads are read back in order, only consumed on commit,
+    and that the cursor survives reopening the spool.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    spool = DiskSpool(str(tmp_path), segment_bytes=64)
+    assert spool.append([b"record %d" % i for i in range(10)]) == 10
+    assert spool.read(3) == [b"record 0", b"record 1", b"record 2"]
+    assert spool.read(3) == [b"record 0", b"record 1", b"record 2"]
+    spool.commit(2)
+    assert spool.pending == 8
+    spool.close()
+
+    spool = DiskSpool(str(tmp_path), segment_bytes=64)
+    assert spool.pending == 8
+    spool.append([b"record 10"])
+    seen = []
+    while True:
+        payloads = spool.read(4)
+        if not payloads:
+            break
+        seen.extend(payloads)
+        spool.commit(len(payloads))
+    assert seen == [b"record %d" % i for i in range(2, 11)]
+    assert spool.pending == 0
+    spool.close()
+
+
+def test_disk_spool_drops_oldest_segments_over_cap(tmp_path: Path) -> None:
+    """
+    Test that exceeding max_bytes drops whole segments from the front.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    spool = DiskSpool(str(tmp_path), max_bytes=200, segment_bytes=50)
+    for i in range(40):
+        spool.append([b"%08d" % i])
+    assert spool.size <= 200
+    assert spool.dropped > 0
+    assert spool.pending + spool.dropped == 40
+    seen = []
+    while True:
+        payloads = spool.read(100)
+        if not payloads:
+            break
+        seen.extend(payloads)
+        spool.commit(len(payloads))
+    assert seen == [b"%08d" % i for i in range(spool.dropped, 40)]
+    spool.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def test_async_http_spools_while_collector_is_down(tmp_path: Path) -> None:
+    """
+    Test that records sent while the collector is unreachable are spooled
+    and replayed in order, ahead of newer records, once it comes back.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    port = _free_port()
+    logger = get_logger(
+        name="test_async_http_spool",
+        console=False,
+        http_handler={
+            "host": f"127.0.0.1:{port}",
+            "url": "/log",
+            "async": True,
+            "batch_size": 4,
+            "batch_interval": 0.01,
+            "spool_dir": str(tmp_path / "spool"),
+            "retry_initial": 0.05,
+            "retry_max": 0.2,
+        },
+    )
+    handler = next(
+        h for h in logger.handlers if isinstance(h, AsyncHTTPHandler)
+    )
+    messages: list[str] = []
+
+    class Collector(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            length = int(self.headers["Content-Length"])
+            payload = json.loads(self.rfile.read(length))
+            messages.extend(item["message"] for item in payload)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = None
+    try:
+        for i in range(10):
+            logger.info("spooled %d", i)
+        deadline = time.monotonic() + 5
+        while handler.stats()["spooled"] < 10:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert handler.stats()["retries"] >= 1
+        assert messages == []
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Collector)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logger.info("spooled 10")
+        deadline = time.monotonic() + 5
+        while len(messages) < 11 or handler.stats()["spool_pending"]:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert messages == [f"spooled {i}" for i in range(11)]
+        stats = handler.stats()
+        assert stats["replayed"] == stats["spooled"]
+    finally:
+        close_logger("test_async_http_spool")
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def test_async_http_skips_batch_the_collector_refuses(tmp_path: Path) -> None:
+    """
+    Test that a spooled batch answered with a non-retryable 4xx is
+    dropped and counted as lost instead of blocking the records behind it.
+
+    Args:
+        tmp_path (Path): Temporary directory fixture.
+    """
+    port = _free_port()
+    handler = AsyncHTTPHandler(
+        f"127.0.0.1:{port}",
+        "/log",
+        spool_dir=str(tmp_path / "spool"),
+        retry_initial=0.05,
+        retry_max=0.2,
+    )
+    logger = logging.getLogger("test_async_http_refused")
+    logger.propagate = False
+    logger.addHandler(handler)
+    messages: list[str] = []
+
+    class Collector(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            length = int(self.headers["Content-Length"])
+            payload = json.loads(self.rfile.read(length))
+            refused = any(item["message"] == "poison" for item in payload)
+            if not refused:
+                messages.extend(item["message"] for item in payload)
+            self.send_response(400 if refused else 200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = None
+    try:
+        for message in ("ok 0", "poison", "ok 1"):
+            logger.warning(message)
+        deadline = time.monotonic() + 5
+        while handler.stats()["spooled"] < 3:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Collector)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        deadline = time.monotonic() + 5
+        while handler.stats()["spool_pending"]:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert messages == ["ok 0", "ok 1"]
+        stats = handler.stats()
+        assert stats["lost"] == 1
+        assert stats["replayed"] == 2
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def test_async_http_batches_require_post() -> None:
+    """
+    Test that batched delivery rejects methods other than POST.
+    """
+    with pytest.raises(ValueError, match="POST"):
+        AsyncHTTPHandler("127.0.0.1:1", "/log", method="GET", batch_size=10)